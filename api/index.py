@@ -3,9 +3,9 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 import sys
 import os
 
@@ -16,25 +16,48 @@ from app.models import Base, User, SearchHistory
 from app.schemas import UserCreate, UserLogin, SearchRequest, ChatRequest, ChatResponse
 from app.retriever import Retriever
 from app.llm import LLM
+from app.lazy import Lazy
 from app.zhipu_ai import ZhipuAI
 from app.config import Config
+from app.database import create_db_engine, create_async_db_engine
+from app import crud
+from app.crud import DBSession
 import jwt
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 
 # 数据库配置 - 使用内存数据库适配Vercel
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./block_trade_dt.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 异步会话（DB_ASYNC=true时启用）
+async_engine = create_async_db_engine(DATABASE_URL) if Config.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
 
-# 初始化智谱AI
-zhipu_ai = ZhipuAI(api_key=Config.get_zhipu_api_key())
+# 智谱AI客户端首次对话时才创建
+get_zhipu_ai = Lazy(lambda: ZhipuAI(api_key=Config.get_zhipu_api_key()), name="zhipu_ai")
 
 app = FastAPI(title="Block Trade DT", description="大宗交易数据检索平台")
 
+# 冷启动时不建表，首次访问数据库时再创建（Serverless环境不一定触发startup事件）
+tables_ready = False
+tables_lock = asyncio.Lock()
+
+async def ensure_tables():
+    global tables_ready
+    if tables_ready:
+        return
+    async with tables_lock:
+        if tables_ready:
+            return
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        if async_engine is not None:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        tables_ready = True
+
 # 静态文件和模板
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -42,19 +65,24 @@ templates = Jinja2Templates(directory="templates")
 # 安全配置
 security = HTTPBearer()
 
-# 初始化检索器和LLM
-retriever = Retriever()
+# 检索器首次搜索时才加载数据
+get_retriever = Lazy(Retriever, name="retriever")
 llm = LLM()
 
 # 依赖项
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_db():
+    await ensure_tables()
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: DBSession = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, Config.get_jwt_secret_key(), algorithms=["HS256"])
         username: str = payload.get("sub")
@@ -63,7 +91,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await crud.get_user_by_username(db, username)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -80,11 +108,12 @@ async def trends_page(request: Request):
 
 # API路由
 @app.post("/api/register")
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: DBSession = Depends(get_db)):
     # 检查用户是否已存在
-    existing_user = db.query(User).filter(
-        (User.username == user_data.username) | (User.email == user_data.email)
-    ).first()
+    existing_user = (
+        await crud.get_user_by_username(db, user_data.username)
+        or await crud.get_user_by_email(db, user_data.email)
+    )
     
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or email already registered")
@@ -95,19 +124,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         email=user_data.email,
         full_name=user_data.full_name
     )
-    user.set_password(user_data.password)
+    await run_in_threadpool(user.set_password, user_data.password)
     
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await crud.create_user(db, user)
     
     return {"message": "User registered successfully", "user_id": user.id}
 
 @app.post("/api/login")
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
+async def login(user_data: UserLogin, db: DBSession = Depends(get_db)):
+    user = await crud.get_user_by_username(db, user_data.username)
     
-    if not user or not user.check_password(user_data.password):
+    if not user or not await run_in_threadpool(user.check_password, user_data.password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     # 生成JWT token
@@ -125,9 +152,10 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
     return {"username": current_user.username, "email": current_user.email, "full_name": current_user.full_name}
 
 @app.post("/api/search")
-async def search(request: SearchRequest, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user)):
+async def search(request: SearchRequest, db: DBSession = Depends(get_db), current_user: Optional[User] = Depends(get_current_user)):
     try:
         # 执行搜索
+        retriever = await get_retriever.aget()
         results = retriever.search(request.query)
         
         # 生成摘要
@@ -140,8 +168,7 @@ async def search(request: SearchRequest, db: Session = Depends(get_db), current_
                 query=request.query,
                 results_count=len(results)
             )
-            db.add(search_history)
-            db.commit()
+            await crud.add_search_history(db, search_history)
         
         return {
             "query": request.query,
@@ -155,6 +182,7 @@ async def search(request: SearchRequest, db: Session = Depends(get_db), current_
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_ai(chat_request: ChatRequest):
     try:
+        zhipu_ai = await get_zhipu_ai.aget()
         response = zhipu_ai.chat(
             user_message=chat_request.message,
             system_prompt=chat_request.system_prompt,
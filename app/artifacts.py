@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 版本化索引目录
+#
+#     artifacts/
+#         CURRENT                 当前版本名（原子替换）
+#         versions/<version>/     embeddings.npy、metadata.jsonl、model_name.txt
+#         embeddings.npy ...      旧版平铺布局（没有CURRENT时使用）
+#
+# 构建脚本先写入新的版本目录，全部写完后再切换CURRENT，读取方任何时候看到的都是一个完整的版本。
+
+POINTER_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.jsonl"
+MODEL_NAME_FILE = "model_name.txt"
+
+
+def versions_root(root: Path) -> Path:
+    return Path(root) / VERSIONS_DIR
+
+
+def new_version_dir(root: Path) -> Path:
+    """创建新的版本目录（按时间命名，同一秒内重复创建时追加序号）"""
+    base = datetime.now().strftime("%Y%m%d%H%M%S")
+    parent = versions_root(root)
+    parent.mkdir(parents=True, exist_ok=True)
+    for i in range(1000):
+        name = base if i == 0 else f"{base}-{i}"
+        path = parent / name
+        try:
+            path.mkdir()
+            return path
+        except FileExistsError:
+            continue
+    raise RuntimeError("cannot allocate a new version directory")
+
+
+def list_versions(root: Path) -> List[str]:
+    parent = versions_root(root)
+    if not parent.is_dir():
+        return []
+    return sorted(p.name for p in parent.iterdir() if p.is_dir())
+
+
+def current_version(root: Path) -> Optional[str]:
+    """CURRENT指向的版本名；没有指针文件时返回None（旧版平铺布局）"""
+    try:
+        name = (Path(root) / POINTER_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def version_dir(root: Path, version: Optional[str] = None) -> Path:
+    """版本对应的目录；version为None时取CURRENT，仍为None时返回根目录（平铺布局）"""
+    version = version or current_version(root)
+    if version is None:
+        return Path(root)
+    path = versions_root(root) / version
+    if not path.is_dir():
+        raise FileNotFoundError(f"index version not found: {version}")
+    return path
+
+
+def publish(root: Path, version: str) -> None:
+    """把CURRENT切换到指定版本（写临时文件后os.replace，读取方不会看到半个文件）"""
+    if not (versions_root(root) / version).is_dir():
+        raise FileNotFoundError(f"index version not found: {version}")
+    pointer = Path(root) / POINTER_FILE
+    tmp = pointer.with_name(f".{POINTER_FILE}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+
+
+def prune(root: Path, keep: int = 3) -> List[str]:
+    """删除较旧的版本目录，保留最近keep个以及当前版本"""
+    current = current_version(root)
+    versions = list_versions(root)
+    removed: List[str] = []
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name == current:
+            continue
+        shutil.rmtree(versions_root(root) / name, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def index_files(directory: Path) -> Tuple[Path, Path, Path]:
+    """(embeddings, metadata, model_name) 三个文件路径"""
+    directory = Path(directory)
+    return directory / EMBEDDINGS_FILE, directory / METADATA_FILE, directory / MODEL_NAME_FILE
+
+
+def signature(root: Path, extra: Optional[List[Path]] = None) -> Tuple:
+    """用于检测变化的签名：当前版本名 + 相关文件的修改时间与大小"""
+    version = current_version(root)
+    parts: List[Tuple[str, float, int]] = []
+    paths = list(index_files(versions_root(root) / version)) if version else []
+    for path in paths + list(extra or []):
+        try:
+            st = os.stat(path)
+            parts.append((str(path), st.st_mtime, st.st_size))
+        except OSError:
+            parts.append((str(path), 0.0, -1))
+    return (version, tuple(parts))
+
+
+def describe(root: Path) -> Dict[str, object]:
+    return {
+        "root": str(root),
+        "current": current_version(root),
+        "versions": list_versions(root),
+    }
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.metrics import REGISTRY, observe_stage
+
+BATCH_SIZE = REGISTRY.histogram(
+    "blocktrade_embed_batch_size",
+    "Queries embedded and scored together by the micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+class EmbeddingBatcher:
+    """
+    查询嵌入微批处理
+
+    并发请求各自提交查询后阻塞等待；后台线程收到第一条查询后最多再等 window_ms 毫秒
+    或凑满 max_batch 条，整批调用 store.search_batch（一次批量嵌入 + 一次矩阵乘法），
+    再把结果分别交给各请求的Future。空闲超过 idle_seconds 后后台线程退出，下次提交时重新启动，
+    因此索引热更新后旧实例不会因为线程引用而无法回收。
+    """
+
+    def __init__(self, store: Any, window_ms: float = 3.0, max_batch: int = 32, idle_seconds: float = 5.0):
+        """
+        Args:
+            store: 提供 search_batch(queries, top_ks) 的向量索引（如 VectorStore）
+            window_ms: 凑批等待窗口，0表示只合并已经在排队的查询
+            max_batch: 单批最多查询数
+        """
+        self.store = store
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.idle_seconds = idle_seconds
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, int, Future, float]] = []
+        self._worker: Optional[threading.Thread] = None
+        self.batches = 0
+        self.queries = 0
+
+    def submit(self, query: str, top_k: int = 10) -> "Future[List[Dict[str, Any]]]":
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((query, top_k, future, time.perf_counter()))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return future
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """与 VectorStore.search 相同的同步接口，可直接替换检索器"""
+        if top_k <= 0:
+            return []
+        return self.submit(query, top_k).result()
+
+    def _take(self) -> Optional[List[Tuple[str, int, Future, float]]]:
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(self.idle_seconds)
+                if not self._pending:
+                    self._worker = None
+                    return None
+            deadline = time.perf_counter() + self.window
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            now = time.perf_counter()
+            for _, _, _, submitted in batch:
+                observe_stage("batch_wait", now - submitted)
+            BATCH_SIZE.observe(len(batch))
+            self.batches += 1
+            self.queries += len(batch)
+            try:
+                results = self.store.search_batch([q for q, _, _, _ in batch], [k for _, k, _, _ in batch])
+            except BaseException as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional, Set
+
+from app.snapshot import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: bytes, event_id: Optional[str] = None) -> bytes:
+    """构造一条SSE消息（data为单行JSON）"""
+    head = f"event: {event}\n"
+    if event_id:
+        head += f"id: {event_id}\n"
+    return head.encode("utf-8") + b"data: " + data + b"\n\n"
+
+
+class Subscriber:
+    """单个客户端的有界发送缓冲区"""
+
+    def __init__(self, buffer_size: int):
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = asyncio.Event()
+
+
+class Broadcaster:
+    """
+    市场数据推送
+
+    单个生产者定期读取快照，内容变化时只序列化一次SSE消息，再分发给所有订阅者；
+    每个订阅者有独立的有界缓冲区，缓冲区写满（消费过慢）的订阅者会被断开，
+    由浏览器EventSource自动重连，不会拖慢其他客户端。
+    """
+
+    def __init__(
+        self,
+        producer: Callable[[], Snapshot],
+        event: str = "trends",
+        interval: float = 5.0,
+        buffer_size: int = 8,
+        heartbeat: float = 15.0,
+    ):
+        self.producer = producer
+        self.event = event
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.subscribers: Set[Subscriber] = set()
+        self.last_frame: Optional[bytes] = None
+        self.last_etag: Optional[str] = None
+        self.published = 0
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _poll(self) -> None:
+        # 生产者会读文件并重建快照，放到线程中执行，不阻塞事件循环
+        snapshot = await asyncio.to_thread(self.producer)
+        if snapshot.etag != self.last_etag:
+            self.last_etag = snapshot.etag
+            self.last_frame = format_sse(self.event, snapshot.body, snapshot.etag.strip('"'))
+            self.publish(self.last_frame)
+
+    def publish(self, frame: bytes) -> None:
+        self.published += 1
+        for sub in list(self.subscribers):
+            try:
+                sub.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                sub.dropped.set()
+                self.subscribers.discard(sub)
+
+    async def _run(self) -> None:
+        try:
+            while self.subscribers:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self._poll()
+                except Exception:
+                    # 数据文件缺失或写到一半时保留上一帧，下个周期重试
+                    logger.exception("市场数据推送生产者失败")
+        finally:
+            self._task = None
+
+    async def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.buffer_size)
+        if self.last_frame is None:
+            try:
+                await self._poll()
+            except Exception:
+                # 首帧暂时取不到时照常订阅，由后台轮询补发
+                logger.exception("市场数据推送生产者失败")
+        if self.last_frame is not None:
+            sub.queue.put_nowait(self.last_frame)
+        self.subscribers.add(sub)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+
+    async def stream(self, sub: Subscriber, is_disconnected: Callable) -> AsyncIterator[bytes]:
+        """订阅者的SSE字节流，空闲时发送心跳注释保持连接"""
+        try:
+            yield b"retry: 5000\n\n"
+            while not sub.dropped.is_set():
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    frame = b": ping\n\n"
+                yield frame
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
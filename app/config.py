@@ -4,8 +4,24 @@ from typing import Optional
 class Config:
     """应用配置类"""
     
-    # 数据库配置 - 优先使用环境变量
-    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///:memory:')
+    # 数据库配置 - 优先使用环境变量（默认文件SQLite，多个worker共享同一个库）
+    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./block_trade_dt.db')
+
+    # SQLite PRAGMA配置（仅对文件SQLite生效）
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    # 连接池配置（服务器数据库与文件SQLite）
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+    # 是否使用异步数据库会话（AsyncSession），关闭时同步Session在线程池中执行
+    DB_ASYNC = os.getenv('DB_ASYNC', 'False').lower() == 'true'
     
     # JWT配置
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'block-trade-dt-super-secret-key-2024')
@@ -14,6 +30,93 @@ class Config:
     
     # 智谱AI配置
     ZHIPU_API_KEY = os.getenv('ZHIPU_API_KEY', '7aee1f12feb24b5f8c298d445ddc6923.IphCkMRMDt0l0aAV')
+    ZHIPU_BASE_URL = os.getenv('ZHIPU_BASE_URL', 'https://open.bigmodel.cn/api/paas/v4/chat/completions')
+    ZHIPU_TIMEOUT = float(os.getenv('ZHIPU_TIMEOUT', 30))
+    
+    # 上游保护：每个进程的并发上限、排队等待秒数、熔断阈值与冷却秒数
+    ZHIPU_MAX_CONCURRENCY = int(os.getenv('ZHIPU_MAX_CONCURRENCY', 8))
+    ZHIPU_ACQUIRE_TIMEOUT = float(os.getenv('ZHIPU_ACQUIRE_TIMEOUT', 2))
+    ZHIPU_BREAKER_THRESHOLD = int(os.getenv('ZHIPU_BREAKER_THRESHOLD', 5))
+    ZHIPU_BREAKER_RESET_SECONDS = float(os.getenv('ZHIPU_BREAKER_RESET_SECONDS', 30))
+    
+    # 趋势数据配置（成交记录支持JSONL/CSV，追加写入后自动增量导入）
+    TRADES_DATA_FILE = os.getenv('TRADES_DATA_FILE', 'data/sample_block_trades.jsonl')
+    INDEX_DATA_FILE = os.getenv('INDEX_DATA_FILE', 'data/sample_index_daily.csv')
+    TRENDS_DAYS = int(os.getenv('TRENDS_DAYS', 30))
+    TRENDS_REFRESH_SECONDS = float(os.getenv('TRENDS_REFRESH_SECONDS', 30))
+    
+    # 推送配置（SSE）：检查快照间隔、每个客户端的缓冲消息数
+    TRENDS_PUSH_INTERVAL = float(os.getenv('TRENDS_PUSH_INTERVAL', 5))
+    TRENDS_PUSH_BUFFER = int(os.getenv('TRENDS_PUSH_BUFFER', 8))
+    
+    # 检索增强对话配置
+    RAG_TOP_K = int(os.getenv('RAG_TOP_K', 5))
+    RAG_TOKEN_BUDGET = int(os.getenv('RAG_TOKEN_BUDGET', 800))
+    RAG_DESCRIPTION_CHARS = int(os.getenv('RAG_DESCRIPTION_CHARS', 60))
+    RAG_CACHE_SIZE = int(os.getenv('RAG_CACHE_SIZE', 256))
+    
+    # 对话历史配置（服务端按会话保存，超出预算的早期轮次压缩为摘要）
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', 1500))
+    CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', 300))
+    CHAT_MAX_CONVERSATIONS = int(os.getenv('CHAT_MAX_CONVERSATIONS', 1000))
+    CHAT_CONVERSATION_TTL = int(os.getenv('CHAT_CONVERSATION_TTL', 3600))
+    
+    # 请求剖析：请求头强制触发，或开启后按采样率抽样并只保存超过阈值的请求
+    PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'False').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.01))
+    PROFILE_THRESHOLD_MS = float(os.getenv('PROFILE_THRESHOLD_MS', 500))
+    PROFILE_MAX_PER_MINUTE = int(os.getenv('PROFILE_MAX_PER_MINUTE', 6))
+    PROFILE_BUFFER_SIZE = int(os.getenv('PROFILE_BUFFER_SIZE', 20))
+    PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile')
+    
+    # 日志配置：JSON或文本格式，队列写出；访问日志按采样率记录（5xx与慢请求总是记录）
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_REQUEST_SAMPLE_RATE = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', 0.01))
+    LOG_SLOW_REQUEST_MS = float(os.getenv('LOG_SLOW_REQUEST_MS', 1000))
+    
+    # 检索索引：版本化目录（artifacts/versions/<版本>，CURRENT指向当前版本），轮询间隔为0时不监视
+    ARTIFACTS_DIR = os.getenv('ARTIFACTS_DIR', 'artifacts')
+    LISTINGS_DATA_FILE = os.getenv('LISTINGS_DATA_FILE', 'data/sample_listings.jsonl')
+    INDEX_WATCH_INTERVAL = float(os.getenv('INDEX_WATCH_INTERVAL', 0))
+    
+    # 同义词表（商品名、中英文、简称），检索前展开为等价写法
+    SYNONYMS_FILE = os.getenv('SYNONYMS_FILE', 'data/synonyms.json')
+    
+    # 关键词检索无结果时的错别字/拼音容错兜底（拼音需安装pypinyin）
+    FUZZY_SEARCH = os.getenv('FUZZY_SEARCH', 'True').lower() == 'true'
+    
+    # 输入提示：挂牌词条与搜索历史热度，按周期重建
+    SUGGEST_REFRESH_SECONDS = float(os.getenv('SUGGEST_REFRESH_SECONDS', 300))
+    SUGGEST_HISTORY_LIMIT = int(os.getenv('SUGGEST_HISTORY_LIMIT', 5000))
+    SUGGEST_HISTORY_WEIGHT = float(os.getenv('SUGGEST_HISTORY_WEIGHT', 3))
+    
+    # 检索后端：keyword（关键词，默认）或 vector（向量索引，需先运行构建脚本）
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'keyword')
+    VECTOR_MODE = os.getenv('VECTOR_MODE', 'float')
+    VECTOR_RERANK = int(os.getenv('VECTOR_RERANK', 0))
+    # 向量分片进程数（见 app/sharding.py），0表示单进程检索
+    VECTOR_SHARDS = int(os.getenv('VECTOR_SHARDS', 0))
+    # 二阶段重排：只对前RERANK_CANDIDATES条结果打分，超出时间预算时保持一阶段顺序
+    # RERANK_MODEL 为空时使用线性打分器（RERANK_WEIGHTS_FILE 可加载拟合好的权重），否则加载本地交叉编码器
+    RERANK_ENABLED = os.getenv('RERANK_ENABLED', 'False').lower() == 'true'
+    RERANK_MODEL = os.getenv('RERANK_MODEL', '')
+    RERANK_WEIGHTS_FILE = os.getenv('RERANK_WEIGHTS_FILE', '')
+    RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', 50))
+    RERANK_BATCH_SIZE = int(os.getenv('RERANK_BATCH_SIZE', 16))
+    RERANK_BUDGET_MS = float(os.getenv('RERANK_BUDGET_MS', 50))
+    # 结果多样化（MMR + 卖方/类别上限），请求中的 diversity / max_per_seller / max_per_category 可覆盖
+    DIVERSITY = float(os.getenv('DIVERSITY', 0))
+    DIVERSITY_CANDIDATES = int(os.getenv('DIVERSITY_CANDIDATES', 50))
+    MAX_PER_SELLER = int(os.getenv('MAX_PER_SELLER', 0))
+    MAX_PER_CATEGORY = int(os.getenv('MAX_PER_CATEGORY', 0))
+    # 向量检索的查询微批处理：等待窗口（毫秒）与单批上限，上限为1时不合并
+    EMBED_BATCH_WINDOW_MS = float(os.getenv('EMBED_BATCH_WINDOW_MS', 3))
+    EMBED_BATCH_MAX_SIZE = int(os.getenv('EMBED_BATCH_MAX_SIZE', 32))
+    
+    # 启动配置：数据与模型均在首次使用时加载；开启后在服务启动时后台预热
+    WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'False').lower() == 'true'
     
     # 服务器配置
     HOST = os.getenv('HOST', '0.0.0.0')
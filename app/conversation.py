@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.tokens import estimate_messages_tokens, estimate_tokens, truncate_to_tokens
+
+SUMMARY_PREFIX = "早前对话摘要（较早的轮次已压缩）：\n"
+
+
+def _summarize_turn(message: Dict[str, str], chars: int) -> str:
+    role = "用户" if message.get("role") == "user" else "助手"
+    content = " ".join(message.get("content", "").split())
+    if len(content) > chars:
+        content = content[:chars] + "…"
+    return f"{role}：{content}"
+
+
+def _fold_summary(summary: str, dropped: List[Dict[str, str]], budget: int, chars: int) -> str:
+    """把被移出窗口的轮次追加到滚动摘要中，超出预算时丢弃最早的摘要行"""
+    lines = [line for line in summary.split("\n") if line]
+    lines.extend(_summarize_turn(m, chars) for m in dropped)
+    while lines and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), budget)
+
+
+def compact_history(
+    history: List[Dict[str, str]],
+    token_budget: int,
+    summary: str = "",
+    summary_budget: int = 300,
+    summary_chars: int = 60,
+) -> Tuple[List[Dict[str, str]], str]:
+    """
+    压缩对话历史：从最新的轮次开始保留，直到达到token预算，更早的轮次折叠进摘要
+
+    Args:
+        history: 对话历史（按时间顺序）
+        token_budget: 历史（含摘要）的token上限
+        summary: 已有的滚动摘要
+        summary_budget: 摘要的token上限
+        summary_chars: 每条被折叠消息保留的字符数
+
+    Returns:
+        (可直接发送的消息列表, 更新后的摘要)
+    """
+    window_budget = token_budget - (summary_budget if summary or history else 0)
+    kept: List[Dict[str, str]] = []
+    used = 0
+    split = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        cost = estimate_messages_tokens([history[i]])
+        if used + cost > window_budget:
+            break
+        kept.append(history[i])
+        used += cost
+        split = i
+    kept.reverse()
+
+    dropped = history[:split]
+    if dropped:
+        summary = _fold_summary(summary, dropped, summary_budget, summary_chars)
+
+    messages: List[Dict[str, str]] = []
+    if summary:
+        messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+    messages.extend(kept)
+    return messages, summary
+
+
+class _Conversation:
+    __slots__ = ("turns", "summary", "updated_at")
+
+    def __init__(self) -> None:
+        self.turns: List[Dict[str, str]] = []
+        self.summary = ""
+        self.updated_at = time.time()
+
+
+class ConversationStore:
+    """
+    服务端对话历史
+
+    按conversation_id保存最近的轮次与滚动摘要，每次请求发送给上游的历史
+    都不超过token预算，与对话长度无关；长时间不活跃或超出数量上限的会话会被淘汰。
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        summary_budget: int = 300,
+        max_conversations: int = 1000,
+        ttl: float = 3600.0,
+    ):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def _evict(self, now: float) -> None:
+        while self._conversations:
+            oldest_id, oldest = next(iter(self._conversations.items()))
+            if len(self._conversations) > self.max_conversations or now - oldest.updated_at > self.ttl:
+                self._conversations.pop(oldest_id)
+            else:
+                break
+
+    def history(self, conversation_id: str, seed: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """
+        获取压缩后的对话历史
+
+        Args:
+            conversation_id: 会话ID
+            seed: 服务端没有该会话时，用客户端传来的历史初始化
+
+        Returns:
+            发送给上游的历史消息
+        """
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            conv = self._conversations.get(conversation_id)
+            if conv is None:
+                conv = _Conversation()
+                if seed:
+                    conv.turns = [m for m in seed if m.get("role") in ("user", "assistant")]
+                self._conversations[conversation_id] = conv
+            self._conversations.move_to_end(conversation_id)
+            conv.updated_at = now
+
+            messages, conv.summary = compact_history(conv.turns, self.token_budget, conv.summary, self.summary_budget)
+            # 已折叠进摘要的轮次不再保留原文
+            kept = len(messages) - (1 if conv.summary else 0)
+            conv.turns = conv.turns[len(conv.turns) - kept:] if kept else []
+            return messages
+
+    def append(self, conversation_id: str, user_message: str, assistant_message: str) -> None:
+        """记录一轮问答"""
+        with self._lock:
+            conv = self._conversations.get(conversation_id)
+            if conv is None:
+                conv = self._conversations[conversation_id] = _Conversation()
+            conv.turns.append({"role": "user", "content": user_message})
+            conv.turns.append({"role": "assistant", "content": assistant_message})
+            conv.updated_at = time.time()
+            self._conversations.move_to_end(conversation_id)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.metrics import stage
+from app.models import SearchHistory, User
+
+DBSession = Union[Session, AsyncSession]
+
+
+async def _run(db: DBSession, method: str, *args: Any) -> Any:
+    """
+    执行会话方法：AsyncSession直接await，同步Session放到线程池执行，
+    两种模式下都不会阻塞事件循环
+    """
+    fn: Callable[..., Any] = getattr(db, method)
+    if isinstance(db, AsyncSession):
+        return await fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+
+async def _commit(db: DBSession) -> None:
+    with stage("db_commit"):
+        await _run(db, "commit")
+
+
+async def _scalar(db: DBSession, stmt) -> Any:
+    result = await _run(db, "execute", stmt)
+    return result.scalars().first()
+
+
+async def get_user_by_username(db: DBSession, username: str) -> Optional[User]:
+    """按用户名查询用户"""
+    return await _scalar(db, select(User).where(User.username == username))
+
+
+async def get_user_by_email(db: DBSession, email: str) -> Optional[User]:
+    """按邮箱查询用户"""
+    return await _scalar(db, select(User).where(User.email == email))
+
+
+async def create_user(db: DBSession, user: User) -> User:
+    """保存新用户并刷新主键"""
+    db.add(user)
+    await _commit(db)
+    await _run(db, "refresh", user)
+    return user
+
+
+async def add_search_history(db: DBSession, item: SearchHistory) -> None:
+    """记录一条搜索历史"""
+    db.add(item)
+    await _commit(db)
+
+
+async def list_search_history(db: DBSession, user_id: int, limit: int = 20) -> List[SearchHistory]:
+    """查询用户最近的搜索历史"""
+    stmt = (
+        select(SearchHistory)
+        .where(SearchHistory.user_id == user_id)
+        .order_by(SearchHistory.search_time.desc())
+        .limit(limit)
+    )
+    result = await _run(db, "execute", stmt)
+    return list(result.scalars().all())
+
+
+async def search_query_counts(db: DBSession, limit: int = 5000) -> List[Tuple[str, int]]:
+    """有结果的历史查询及其次数（按次数降序），用于输入提示的热度"""
+    count = func.count(SearchHistory.id)
+    stmt = (
+        select(SearchHistory.query, count)
+        .where(SearchHistory.results_count > 0)
+        .group_by(SearchHistory.query)
+        .order_by(count.desc())
+        .limit(limit)
+    )
+    result = await _run(db, "execute", stmt)
+    return [(query, int(n)) for query, n in result.all()]
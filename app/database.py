@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from app.config import Config
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(database_url: str) -> URL:
+    """将同步数据库URL转换为对应的异步驱动URL"""
+    url = make_url(database_url)
+    if url.get_dialect().is_async:
+        return url
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"不支持异步访问的数据库: {url.get_backend_name()}")
+    return url.set(drivername=driver)
+
+
+def _apply_sqlite_pragmas(engine: Engine) -> None:
+    """在每个新连接上设置SQLite PRAGMA（WAL、同步级别、mmap、忙等待）"""
+    journal_mode = Config.SQLITE_JOURNAL_MODE
+    synchronous = Config.SQLITE_SYNCHRONOUS
+    mmap_size = Config.SQLITE_MMAP_SIZE
+    busy_timeout = Config.SQLITE_BUSY_TIMEOUT_MS
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+            cursor.execute("PRAGMA foreign_keys=ON")
+        finally:
+            cursor.close()
+
+
+def create_db_engine(database_url: Optional[str] = None, **overrides: Any) -> Engine:
+    """
+    根据数据库URL创建引擎
+
+    - 内存SQLite：使用StaticPool，所有线程共享同一个连接（否则每个线程看到的是空库）
+    - 文件SQLite：连接池 + WAL等PRAGMA，读写可并发、写入不再频繁锁库
+    - 服务器数据库（PostgreSQL/MySQL等）：使用可配置的连接池参数
+
+    Args:
+        database_url: 数据库URL，默认读取Config
+        overrides: 透传给create_engine的额外参数
+
+    Returns:
+        SQLAlchemy引擎
+    """
+    url = make_url(database_url or Config.get_database_url())
+    kwargs = _engine_kwargs(url)
+    kwargs.update(overrides)
+    engine = create_engine(url, **kwargs)
+
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        _apply_sqlite_pragmas(engine)
+    return engine
+
+
+def create_async_db_engine(database_url: Optional[str] = None, **overrides: Any) -> AsyncEngine:
+    """
+    创建异步引擎（AsyncSession使用），连接池与PRAGMA配置与同步引擎一致
+
+    Args:
+        database_url: 数据库URL（同步或异步驱动均可），默认读取Config
+        overrides: 透传给create_async_engine的额外参数
+
+    Returns:
+        SQLAlchemy异步引擎
+    """
+    url = to_async_url(database_url or Config.get_database_url())
+    kwargs = _engine_kwargs(url)
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        # aiosqlite默认使用NullPool，显式启用连接池以复用连接
+        kwargs["poolclass"] = AsyncAdaptedQueuePool
+    kwargs.update(overrides)
+    engine = create_async_engine(url, **kwargs)
+
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        _apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+def _engine_kwargs(url: URL) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+
+    if url.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": Config.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        }
+        if _is_memory_sqlite(url):
+            kwargs["poolclass"] = StaticPool
+        else:
+            kwargs["pool_size"] = Config.DB_POOL_SIZE
+            kwargs["max_overflow"] = Config.DB_MAX_OVERFLOW
+            kwargs["pool_pre_ping"] = Config.DB_POOL_PRE_PING
+    else:
+        kwargs["pool_size"] = Config.DB_POOL_SIZE
+        kwargs["max_overflow"] = Config.DB_MAX_OVERFLOW
+        kwargs["pool_timeout"] = Config.DB_POOL_TIMEOUT
+        kwargs["pool_recycle"] = Config.DB_POOL_RECYCLE
+        kwargs["pool_pre_ping"] = Config.DB_POOL_PRE_PING
+    return kwargs
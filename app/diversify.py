@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from app.metrics import observe_stage
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def vectors_of(retriever: Any, results: Sequence[Dict[str, Any]]) -> Optional["np.ndarray"]:
+    """
+    取结果对应的归一化向量：沿重排/批处理包装找到向量索引后按挂牌id查行；
+    关键词检索器没有向量，返回None
+    """
+    while retriever is not None:
+        lookup = getattr(type(retriever), "vectors_for", None)
+        if lookup is not None:
+            return lookup(retriever, [r["listing"] for r in results])
+        retriever = getattr(retriever, "retriever", None) or getattr(retriever, "store", None)
+    return None
+
+
+class Diversifier:
+    """
+    结果多样化：最大边际相关（MMR）+ 卖方/类别数量上限
+
+    从一阶段（或重排后）的前 candidates 条结果中贪心挑选：每步选 λ·相关度 − (1−λ)·与已选结果的最大相似度
+    最高、且没有超出卖方/类别上限的一条。相似度用候选向量（embeddings_norm 的对应行）一次矩阵乘法算出
+    两两余弦；没有向量时（关键词检索）只按相关度顺序应用上限。上限是硬约束，候选不足时返回的条数可能少于top_k。
+    """
+
+    def __init__(self, diversity: float = 0.0, candidates: int = 50,
+                 max_per_seller: int = 0, max_per_category: int = 0):
+        """
+        Args:
+            diversity: 多样性权重 1−λ，0 表示不做MMR，1 表示只看与已选结果的差异
+            candidates: 参与挑选的候选数
+            max_per_seller / max_per_category: 每个卖方/类别最多返回的条数，0 表示不限
+        """
+        self.diversity = min(1.0, max(0.0, diversity))
+        self.candidates = max(1, candidates)
+        self.max_per_seller = max(0, max_per_seller)
+        self.max_per_category = max(0, max_per_category)
+
+    @property
+    def active(self) -> bool:
+        return self.diversity > 0 or self.max_per_seller > 0 or self.max_per_category > 0
+
+    def fetch_size(self, top_k: int) -> int:
+        """检索时应取的结果数"""
+        return max(top_k, self.candidates) if self.active else top_k
+
+    def diversify(self, results: List[Dict[str, Any]], top_k: int,
+                  vectors: Optional["np.ndarray"] = None) -> List[Dict[str, Any]]:
+        """
+        Args:
+            results: 按相关度降序的候选结果
+            vectors: 与results一一对应的归一化向量 (len(results), 维度)，None 时不做MMR
+        """
+        if not self.active or top_k <= 0:
+            return results[:top_k]
+        import numpy as np
+
+        start = time.perf_counter()
+        head = results[:self.candidates]
+        m = len(head)
+        relevance = np.asarray([float(r["score"]) for r in head], dtype=np.float64)
+        span = relevance.max() - relevance.min() if m else 0.0
+        # 相关度缩放到[0, 1]，与余弦相似度可比（重排分数的量纲不固定）
+        relevance = (relevance - relevance.min()) / span if span > 0 else np.ones(m)
+
+        use_mmr = self.diversity > 0 and vectors is not None and len(vectors) >= m
+        if use_mmr:
+            rows = np.asarray(vectors[:m], dtype=np.float32)
+            similarity = rows @ rows.T
+            max_similarity = np.zeros(m)
+        blocked = np.zeros(m, dtype=bool)
+        caps = []
+        for field, limit in (("seller", self.max_per_seller), ("category", self.max_per_category)):
+            if limit:
+                codes: Dict[Any, int] = {}
+                keys = np.asarray([codes.setdefault(r["listing"].get(field), len(codes)) for r in head])
+                caps.append((keys, limit, np.zeros(len(codes), dtype=np.int64)))
+
+        chosen: List[int] = []
+        weight = 1.0 - self.diversity
+        while len(chosen) < min(top_k, m):
+            if use_mmr and chosen:
+                objective = weight * relevance - self.diversity * max_similarity
+            else:
+                objective = relevance.copy()
+            objective[blocked] = -np.inf
+            best = int(np.argmax(objective))
+            if objective[best] == -np.inf:
+                break
+            chosen.append(best)
+            blocked[best] = True
+            if use_mmr:
+                np.maximum(max_similarity, similarity[best], out=max_similarity)
+            for keys, limit, counts in caps:
+                key = keys[best]
+                counts[key] += 1
+                if counts[key] >= limit:
+                    blocked |= keys == key
+        observe_stage("diversify", time.perf_counter() - start)
+        return [head[i] for i in chosen]
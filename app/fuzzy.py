@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import importlib.util
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# 可选依赖：未安装时只做错别字容错，不支持拼音检索。
+# 只检查是否安装，真正导入（约250毫秒）推迟到首次计算拼音时，不拖慢 import app.main
+PINYIN_AVAILABLE = importlib.util.find_spec("pypinyin") is not None
+
+_CJK_RE = re.compile(r"[一-鿿]")
+_TOKEN_RE = re.compile(r"[\s,，、;；/|()（）\-]+")
+
+# 标题较短时整体作为词条（更长的标题只取分隔后的词）
+TITLE_TERM_MAX_CHARS = 12
+
+
+def has_cjk(text: str) -> bool:
+    return _CJK_RE.search(text) is not None
+
+
+def max_distance(term: str) -> int:
+    """允许的编辑距离：中文3字以上容错1个字；拼音/英文4个字母以上容错1个，8个以上容错2个"""
+    if has_cjk(term):
+        return 1 if len(term) >= 3 else 0
+    if len(term) >= 8:
+        return 2
+    return 1 if len(term) >= 4 else 0
+
+
+def deletes(term: str, distance: int) -> Set[str]:
+    """删除至多distance个字符得到的全部变体（含原词）"""
+    result = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """带相邻换位的编辑距离；超过limit时提前返回limit+1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def pinyin_keys(term: str) -> List[str]:
+    """中文词条的全拼与首字母（如 螺纹钢 -> luowengang、lwg）"""
+    if not PINYIN_AVAILABLE or not has_cjk(term):
+        return []
+    from pypinyin import Style, lazy_pinyin
+    full = lazy_pinyin(term)
+    initials = lazy_pinyin(term, style=Style.FIRST_LETTER)
+    keys = ["".join(full).lower(), "".join(initials).lower()]
+    return [k for k in dict.fromkeys(keys) if k.isascii() and k.isalnum()]
+
+
+def listing_terms(listing: Dict[str, Any]) -> Set[str]:
+    """挂牌的可检索词条：标签、类别、标题分词（以及较短的完整标题）"""
+    terms: Set[str] = set()
+    for tag in listing.get("tags", []) or []:
+        terms.add(str(tag).lower())
+    category = listing.get("category")
+    if category:
+        terms.add(str(category).lower())
+    title = str(listing.get("title", "")).lower()
+    terms.update(t for t in _TOKEN_RE.split(title) if t)
+    if 0 < len(title) <= TITLE_TERM_MAX_CHARS:
+        terms.add(title)
+    return {t for t in terms if len(t) >= 2 or has_cjk(t)}
+
+
+class FuzzyIndex:
+    """
+    错别字与拼音容错检索（SymSpell删除邻域）
+
+    构建时为每个词条（及其全拼、首字母）预先生成删除变体并建立 变体 -> 词条 的倒排；
+    查询时只需生成查询词的删除变体并查表，再用编辑距离校验候选，不扫描全部挂牌。
+    中文查询同时转成拼音查找，可以命中同音错别字（如 螺文钢 -> 螺纹钢）。
+    """
+
+    def __init__(self, listings: List[Dict[str, Any]]):
+        self.listings = listings
+        # 词条（中文原词或拼音）-> 挂牌下标
+        self._postings: Dict[str, Set[int]] = {}
+        # 删除变体 -> 词条
+        self._deletes: Dict[str, Set[str]] = {}
+        for i, listing in enumerate(listings):
+            for term in listing_terms(listing):
+                self._postings.setdefault(term, set()).add(i)
+        # 拼音按不同词条各算一次（同一词条在大量挂牌中重复出现）
+        for term, ids in list(self._postings.items()):
+            for key in pinyin_keys(term):
+                self._postings.setdefault(key, set()).update(ids)
+        for term in self._postings:
+            for variant in deletes(term, max_distance(term)):
+                self._deletes.setdefault(variant, set()).add(term)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def lookup(self, token: str) -> List[Tuple[str, int]]:
+        """查找与token相近的词条，返回 [(词条, 编辑距离)]，按距离升序"""
+        token = token.lower().strip()
+        if not token:
+            return []
+        if has_cjk(token):
+            # 中文查询再按全拼查找（同音错别字）；首字母过短、歧义大，不参与
+            keys = [token] + pinyin_keys(token)[:1]
+        else:
+            keys = [token.replace(" ", "")]
+        best: Dict[str, int] = {}
+        for key in keys:
+            limit = max_distance(key)
+            candidates: Set[str] = set()
+            for variant in deletes(key, limit):
+                candidates |= self._deletes.get(variant, set())
+            for term in candidates:
+                d = edit_distance(key, term, limit)
+                if d <= limit and d < best.get(term, limit + 1):
+                    best[term] = d
+        return sorted(best.items(), key=lambda x: (x[1], x[0]))
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        模糊检索
+
+        每个查询词取命中词条的最小编辑距离计分（精确命中1分，每差一个字符扣0.3分），
+        多个查询词的得分相加。分数低于关键词检索，只作为兜底结果。
+        """
+        scores: Dict[int, float] = {}
+        query = query.lower().strip()
+        if has_cjk(query):
+            tokens: Iterable[str] = [t for t in _TOKEN_RE.split(query) if t]
+        else:
+            # 拼音输入可能按音节带空格（如 "luo wen gang"），整体作为一个词
+            tokens = [query]
+        for token in tokens:
+            per_token: Dict[int, float] = {}
+            for term, distance in self.lookup(token):
+                weight = 1.0 - 0.3 * distance
+                for i in self._postings.get(term, ()):
+                    if weight > per_token.get(i, 0.0):
+                        per_token[i] = weight
+            for i, weight in per_token.items():
+                scores[i] = scores.get(i, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:top_k]
+        return [{"score": round(score, 3), "listing": self.listings[i]} for i, score in ranked]
+
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+from app import artifacts
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class IndexManager(Generic[T]):
+    """
+    检索索引热更新
+
+    新索引在后台线程中构建并预热，完成后一次引用赋值完成切换；
+    查询开始时取一次current()，进行中的查询继续使用旧索引，旧索引在最后一个引用释放后回收。
+    同一时间最多一个构建任务，构建失败时保留旧索引。
+    """
+
+    def __init__(self, loader: Callable[[Path, Optional[str]], T], root: Path,
+                 warm: Optional[Callable[[T], Any]] = None, watch_files: Optional[List[Path]] = None,
+                 retire: Optional[Callable[[T], Any]] = None, retire_delay: float = 30.0):
+        """
+        Args:
+            loader: loader(目录, 版本名) 构造索引；版本名为None表示旧版平铺布局
+            root: 索引根目录（见 app/artifacts.py）
+            warm: 切换前对新索引执行的预热函数（如一次查询）
+            watch_files: 平铺布局下额外监视的文件（如挂牌数据文件）
+            retire: 切换后释放旧索引持有的外部资源（如分片工作进程），为None时只依赖引用计数回收
+            retire_delay: 切换后等待多少秒再调用retire，留给切换前取到旧索引的查询完成
+        """
+        self.loader = loader
+        self.root = Path(root)
+        self.warm = warm
+        self.watch_files = [Path(p) for p in (watch_files or [])]
+        self.retire = retire
+        self.retire_delay = retire_delay
+        self._index: Optional[T] = None
+        self._version: Optional[str] = None
+        self._signature: Any = None
+        # 最近一次构建失败时的文件签名；文件再次变化前监视器不再重试
+        self._failed_signature: Any = None
+        self._attempted_signature: Any = None
+        self._load_lock = threading.Lock()
+        self._building = threading.Lock()
+        self._listeners: List[Callable[[T], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.generation = 0
+        self.loaded_at: Optional[str] = None
+        self.last_build_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    def add_listener(self, fn: Callable[[T], None]) -> None:
+        """切换完成后回调（如清空依赖旧索引的缓存）"""
+        self._listeners.append(fn)
+
+    def _build(self, version: Optional[str]) -> tuple:
+        self._attempted_signature = None
+        version = version or artifacts.current_version(self.root)
+        signature = artifacts.signature(self.root, self.watch_files)
+        self._attempted_signature = signature
+        start = time.perf_counter()
+        index = self.loader(artifacts.version_dir(self.root, version), version)
+        if self.warm is not None:
+            self.warm(index)
+        return index, version, signature, time.perf_counter() - start
+
+    def _swap(self, index: T, version: Optional[str], signature: Any, seconds: float) -> None:
+        self._index = index
+        self._version = version
+        self._signature = signature
+        self._failed_signature = None
+        self.generation += 1
+        self.loaded_at = datetime.now().isoformat()
+        self.last_build_seconds = seconds
+        self.last_error = None
+        for fn in self._listeners:
+            try:
+                fn(index)
+            except Exception:
+                logger.exception("索引切换回调失败")
+
+    def _schedule_retire(self, index: T) -> None:
+        def run() -> None:
+            try:
+                self.retire(index)  # type: ignore[misc]
+            except Exception:
+                logger.exception("旧索引资源释放失败")
+
+        timer = threading.Timer(self.retire_delay, run)
+        timer.name = "index-retire"
+        timer.daemon = True
+        timer.start()
+
+    def close(self) -> None:
+        """停止监视并释放当前索引（服务关闭时调用）"""
+        self.stop_watcher()
+        index, self._index = self._index, None
+        if index is not None and self.retire is not None:
+            self.retire(index)
+
+    def current(self) -> T:
+        """当前索引；首次调用时同步加载"""
+        index = self._index
+        if index is not None:
+            return index
+        with self._load_lock:
+            if self._index is None:
+                self._swap(*self._build(None))
+            return self._index  # type: ignore[return-value]
+
+    def peek(self) -> Optional[T]:
+        return self._index
+
+    def reload(self, version: Optional[str] = None, wait: bool = False) -> bool:
+        """
+        重新加载索引
+
+        Args:
+            version: 指定版本，默认读取CURRENT
+            wait: 是否等待构建完成（默认在后台线程构建）
+
+        Returns:
+            是否启动了构建；已有构建在进行时返回False
+        """
+        if not self._building.acquire(blocking=False):
+            return False
+
+        def run() -> None:
+            try:
+                built = self._build(version)
+                old = self._index
+                with self._load_lock:
+                    self._swap(*built)
+                logger.info("索引已切换", extra={
+                    "version": self._version, "generation": self.generation,
+                    "build_seconds": round(built[3], 3),
+                })
+                if old is not None and self.retire is not None:
+                    self._schedule_retire(old)
+                # 释放旧索引的最后一个管理者引用；仍在执行的查询持有自己的引用，
+                # 它们结束后旧索引由引用计数回收（不做全堆gc，避免在持有GIL时卡住请求线程）
+                del old, built
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._failed_signature = self._attempted_signature
+                logger.exception("索引重建失败，继续使用旧索引")
+            finally:
+                self._building.release()
+
+        if wait:
+            run()
+        else:
+            threading.Thread(target=run, name="index-reload", daemon=True).start()
+        return True
+
+    def check(self) -> bool:
+        """索引文件或CURRENT发生变化时触发重建"""
+        if self._index is None:
+            return False
+        try:
+            signature = artifacts.signature(self.root, self.watch_files)
+        except OSError:
+            return False
+        if signature == self._signature or signature == self._failed_signature:
+            return False
+        return self.reload()
+
+    def start_watcher(self, interval: float) -> None:
+        """轮询监视CURRENT与索引文件（interval<=0时不启动）"""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    logger.exception("索引监视检查失败")
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=loop, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    @property
+    def building(self) -> bool:
+        return self._building.locked()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **artifacts.describe(self.root),
+            "loaded_version": self._version,
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+            "building": self.building,
+            "last_build_seconds": round(self.last_build_seconds, 3),
+            "last_error": self.last_error,
+            "watching": self._watcher is not None,
+        }
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    首次使用时才构造的单例（线程安全）
+
+    冷启动时不再为当前请求用不到的组件付出构造开销；
+    构造失败不会缓存异常，下次调用会重试。
+    """
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        self._factory = factory
+        self.name = name or getattr(factory, "__name__", "lazy")
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __call__(self) -> T:
+        if self._loaded:
+            return self._value  # type: ignore[return-value]
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.load_seconds = time.perf_counter() - start
+                self._loaded = True
+        return self._value  # type: ignore[return-value]
+
+    async def aget(self) -> T:
+        """异步环境中获取：首次构造放到线程池执行，避免阻塞事件循环"""
+        if self._loaded:
+            return self._value  # type: ignore[return-value]
+        return await run_in_threadpool(self)
+
+    def peek(self) -> Optional[T]:
+        """已构造时返回实例，否则返回None（不会触发构造）"""
+        return self._value if self._loaded else None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 挂牌的固定字段（与 data/sample_listings.jsonl 一致），其余字段放在 extra 中
+FIELDS = ("id", "title", "category", "region", "price", "unit", "description", "tags", "seller", "date")
+_FIELD_SET = frozenset(FIELDS)
+
+
+# 类别、地区、单位、卖方、日期与标签取值集合很小、在挂牌间大量重复，加载时驻留为同一个字符串对象
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class Listing(Mapping):
+    """
+    紧凑的只读挂牌记录
+
+    固定字段存放在 __slots__ 中，没有每条记录一份的字典与键字符串；类别、地区、单位、卖方、日期与标签
+    驻留为共享的字符串对象，标签存为元组。兼容 dict 的只读接口（get、[]、in、遍历、dict(listing)），
+    原有按 listing.get(...) 读取的代码与JSON序列化不需要改动；热点循环可直接读属性。
+    缺失的字段存为 None：遍历、序列化与 [] 总是包含全部固定字段（值为null），get() 对 None 返回默认值。
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, id: Any = None, title: Optional[str] = None, category: Optional[str] = None,
+                 region: Optional[str] = None, price: Any = None, unit: Optional[str] = None,
+                 description: Optional[str] = None, tags: Optional[Tuple[str, ...]] = None,
+                 seller: Optional[str] = None, date: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.title = title
+        self.category = category
+        self.region = region
+        self.price = price
+        self.unit = unit
+        self.description = description
+        self.tags = tags
+        self.seller = seller
+        self.date = date
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Listing":
+        # 加载热点：跳过 __init__ 直接给槽位赋值，驻留也内联展开，减少每条记录的函数调用
+        self = object.__new__(cls)
+        get = data.get
+        intern = sys.intern
+        self.id = get("id")
+        self.title = get("title")
+        value = get("category")
+        self.category = intern(value) if type(value) is str else value
+        value = get("region")
+        self.region = intern(value) if type(value) is str else value
+        self.price = get("price")
+        value = get("unit")
+        self.unit = intern(value) if type(value) is str else value
+        self.description = get("description")
+        tags = get("tags")
+        if type(tags) is list:
+            try:
+                tags = tuple(map(intern, tags))
+            except TypeError:
+                tags = tuple([_intern(t) for t in tags])
+        self.tags = tags
+        value = get("seller")
+        self.seller = intern(value) if type(value) is str else value
+        value = get("date")
+        self.date = intern(value) if type(value) is str else value
+        self.extra = None if _FIELD_SET.issuperset(data) else {k: v for k, v in data.items() if k not in _FIELD_SET}
+        return self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return True
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self) -> Iterator[str]:
+        yield from FIELDS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(FIELDS) + (len(self.extra) if self.extra is not None else 0)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {key: getattr(self, key) for key in FIELDS}
+        if self.tags is not None:
+            data["tags"] = list(self.tags)
+        if self.extra is not None:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"Listing({self.to_dict()!r})"
+
+
+def load_listings(path: str) -> List[Listing]:
+    """逐行读取挂牌JSONL，空行跳过"""
+    listings: List[Listing] = []
+    from_dict = Listing.from_dict
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                listings.append(from_dict(json.loads(line)))
+    return listings
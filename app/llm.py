@@ -30,6 +30,34 @@ class LLM:
         
         summary = "；".join(parts)
         return f"为您找到以下相关记录：{summary}。这些数据来源于大宗交易市场，仅供参考。"
-
-
-
+    
+    def generate_chat_fallback(self, query: str, results: List[Dict[str, Any]]) -> str:
+        """AI服务不可用时的对话降级回答"""
+        if not results:
+            return "AI服务当前繁忙，暂时无法回答您的问题，请稍后重试。"
+        return f"AI服务当前繁忙，以下是本地检索到的相关信息。{self.generate_summary(query, results)}"
+    
+    def generate_market_summary(self, market_data: Dict[str, Any]) -> str:
+        """AI服务不可用时的市场数据模板分析"""
+        total = market_data.get("total_volume") or 0
+        premium = market_data.get("premium_volume") or 0
+        discount = market_data.get("discount_volume") or 0
+        change = market_data.get("shanghai_change") or 0
+        
+        trend = "上涨" if change > 0 else "下跌" if change < 0 else "持平"
+        parts = [f"上证指数{market_data.get('shanghai_index', 'N/A')}，{trend}{abs(change)}%。"]
+        if total:
+            parts.append(
+                f"大宗交易总成交{total}万，其中溢价成交{premium}万（占{premium / total * 100:.2f}%），"
+                f"折价成交{discount}万（占{discount / total * 100:.2f}%）。"
+            )
+        parts.append("以上为系统根据数据自动生成的简要概况（AI分析服务当前繁忙），仅供参考。")
+        return "".join(parts)
+    
+    def generate_advice_fallback(self, query: str) -> str:
+        """AI服务不可用时的投资建议降级回答"""
+        return (
+            "AI投资顾问当前繁忙，暂时无法针对您的问题给出分析。"
+            "一般而言，参与大宗交易需关注折溢价水平、成交对手方与解禁减持节奏，并注意控制仓位与风险。"
+            "以上内容仅供参考，不构成投资建议。"
+        )
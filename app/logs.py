@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# 当前请求ID（通过contextvars传递，线程池中执行的代码同样可见）
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id", "sample"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，extra中的字段原样附加"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """本地开发用的单行文本格式"""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        text = super().format(record)
+        fields = {k: v for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith("_")}
+        if fields:
+            text += " " + json.dumps(fields, ensure_ascii=False, default=str)
+        return text
+
+
+class ContextFilter(logging.Filter):
+    """
+    在调用线程中补充请求ID并执行采样
+
+    采样：extra={"sample": 0.01} 的日志只保留约1%，保留的记录带上采样率便于还原总量。
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample", None)
+        if rate is not None:
+            if random.random() >= rate:
+                return False
+            record.sample_rate = rate
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    队列满时直接丢弃并计数，调用方永远不会因为日志输出而阻塞
+
+    序列化与写出由QueueListener线程完成，调用线程只做字符串插值与入队。
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在调用线程中完成参数插值与异常格式化，保留extra字段供JSON输出
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000,
+                  stream: Any = None) -> logging.Logger:
+    """
+    配置 app.* 日志：调用线程只入队，后台线程格式化写出（重复调用只生效一次）
+
+    Args:
+        level: 日志级别
+        fmt: json 或 text
+        queue_size: 队列长度，写出跟不上时丢弃新日志
+        stream: 输出流，默认stdout
+    """
+    global _listener, _queue_handler
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(ContextFilter())
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return logger
+
+
+def shutdown_logging() -> None:
+    """停止后台线程并写出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class RequestContextMiddleware:
+    """
+    ASGI中间件：为每个请求分配请求ID（优先沿用 X-Request-ID），写入响应头，
+    并按采样率记录访问日志；5xx与慢请求总是记录。
+    """
+
+    def __init__(self, app: Any, sample_rate: float = 0.01, slow_ms: float = 1000.0,
+                 header: str = "x-request-id"):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.header = header.lower().encode("latin-1")
+        self.logger = logging.getLogger("app.access")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(self.header)
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+            fields = {
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status": status[0],
+                "elapsed_ms": elapsed_ms,
+            }
+            if status[0] >= 500:
+                self.logger.error("request failed", extra=fields)
+            elif elapsed_ms >= self.slow_ms:
+                self.logger.warning("slow request", extra=fields)
+            elif self.sample_rate > 0:
+                self.logger.info("request", extra={**fields, "sample": self.sample_rate})
+            request_id_var.reset(token)
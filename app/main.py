@@ -1,28 +1,56 @@
 from fastapi import FastAPI, Request, HTTPException, Depends, status
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.models import Base, User, SearchHistory
-from app.schemas import UserCreate, UserLogin, SearchRequest, ChatRequest, ChatResponse
-from app.retriever import Retriever
+from app.schemas import UserCreate, UserLogin, SearchRequest, ChatRequest, ChatResponse, IndexReloadRequest
+from app.retriever import Retriever, VectorStore
+from app.sharding import ShardedVectorStore
+from app.batching import EmbeddingBatcher
+from app.rerank import Reranker, RerankingRetriever, create_scorer
+from app.diversify import Diversifier, vectors_of
 from app.llm import LLM
-from app.zhipu_ai import ZhipuAI
+from app.lazy import Lazy
+from app.index_manager import IndexManager
+from app import artifacts
+from app.snapshot import SnapshotCache
+from app.broadcast import Broadcaster
+from app.zhipu_ai import ZhipuAI, DEFAULT_SYSTEM_PROMPT
+from app.rag import ContextBuilder
+from app.suggest import PrefixSuggester, listings_of
+from app.conversation import ConversationStore
+from app.singleflight import SingleFlight, make_key
+from app.profiling import Profiler
+from app.logs import RequestContextMiddleware, setup_logging
+from app.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware, register_cache, register_upstream, stage
 from app.config import Config
+from app.database import create_db_engine, create_async_db_engine
+from app import crud
+from app.crud import DBSession
+import asyncio
 import jwt
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
 
+setup_logging(Config.LOG_LEVEL, Config.LOG_FORMAT, Config.LOG_QUEUE_SIZE)
+logger = logging.getLogger(__name__)
+
 # 数据库配置
-engine = create_engine(Config.get_database_url(), connect_args={"check_same_thread": False})
+engine = create_db_engine(Config.get_database_url())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 异步会话（DB_ASYNC=true时启用，SQLite测试可保持同步模式）
+async_engine = create_async_db_engine(Config.get_database_url()) if Config.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
 
 # 初始化智谱AI（延迟初始化以避免启动时错误）
 zhipu_ai = None
@@ -33,11 +61,46 @@ def get_zhipu_ai():
         try:
             zhipu_ai = ZhipuAI(api_key=Config.get_zhipu_api_key())
         except Exception as e:
-            print(f"智谱AI初始化失败: {e}")
+            logger.warning("智谱AI初始化失败", extra={"error": str(e)})
             zhipu_ai = None
     return zhipu_ai
 
 app = FastAPI(title="Block Trade DT", description="大宗交易数据检索平台")
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    RequestContextMiddleware,
+    sample_rate=Config.LOG_REQUEST_SAMPLE_RATE,
+    slow_ms=Config.LOG_SLOW_REQUEST_MS,
+)
+
+# 数据库表在首次访问数据库时创建，不需要数据库的请求（静态页、趋势数据）冷启动时不再等待建表
+tables_ready = False
+tables_lock = asyncio.Lock()
+
+async def ensure_tables():
+    global tables_ready
+    if tables_ready:
+        return
+    async with tables_lock:
+        if tables_ready:
+            return
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        # 内存SQLite下异步引擎是独立的库，需要单独建表
+        if async_engine is not None:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        tables_ready = True
+
+@app.on_event("startup")
+async def on_startup():
+    if Config.WARMUP_ON_STARTUP:
+        # 后台预热，不阻塞服务开始监听
+        asyncio.get_running_loop().create_task(warmup_components())
+    index_manager.start_watcher(Config.INDEX_WATCH_INTERVAL)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await run_in_threadpool(index_manager.close)
 
 # 静态文件和模板
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -45,18 +108,181 @@ templates = Jinja2Templates(directory="templates")
 
 # 安全配置
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# 检索器首次使用时才加载数据，之后可热更新；LLM摘要为轻量对象直接创建
+def load_first_stage(directory, version):
+    if Config.SEARCH_BACKEND == "vector":
+        # numpy/fastembed 在此处才导入；并发查询经微批处理合并为一次嵌入与一次矩阵乘法
+        if Config.VECTOR_SHARDS > 0:
+            # 分片工作进程在索引切换后由close_retriever关闭
+            store = ShardedVectorStore.from_directory(
+                directory, shards=Config.VECTOR_SHARDS, mode=Config.VECTOR_MODE, rerank=Config.VECTOR_RERANK
+            )
+        else:
+            store = VectorStore.from_directory(directory, mode=Config.VECTOR_MODE, rerank=Config.VECTOR_RERANK)
+        if Config.EMBED_BATCH_MAX_SIZE > 1:
+            return EmbeddingBatcher(store, Config.EMBED_BATCH_WINDOW_MS, Config.EMBED_BATCH_MAX_SIZE)
+        return store
+    # 版本目录中的metadata.jsonl与挂牌数据同构；旧版平铺布局沿用挂牌数据文件
+    if version is not None:
+        data_file = str(artifacts.index_files(directory)[1])
+    else:
+        data_file = Config.LISTINGS_DATA_FILE
+    return Retriever(data_file, fuzzy=Config.FUZZY_SEARCH, synonyms_file=Config.SYNONYMS_FILE)
+
+def load_retriever(directory, version):
+    retriever = load_first_stage(directory, version)
+    if not Config.RERANK_ENABLED:
+        return retriever
+    reranker = Reranker(
+        create_scorer(Config.RERANK_MODEL, Config.RERANK_WEIGHTS_FILE),
+        candidates=Config.RERANK_CANDIDATES,
+        batch_size=Config.RERANK_BATCH_SIZE,
+        budget_ms=Config.RERANK_BUDGET_MS,
+    )
+    return RerankingRetriever(retriever, reranker)
+
+def close_retriever(retriever):
+    # 沿重排/批处理包装找到持有外部资源的检索器（分片向量索引）并关闭
+    while retriever is not None:
+        close = getattr(type(retriever), "close", None)
+        if close is not None:
+            close(retriever)
+            return
+        retriever = getattr(retriever, "retriever", None) or getattr(retriever, "store", None)
 
-# 初始化检索器和LLM
-retriever = Retriever()
+index_manager = IndexManager(
+    load_retriever,
+    Path(Config.ARTIFACTS_DIR),
+    warm=lambda r: r.search("钢材", 1),
+    watch_files=[Path(Config.LISTINGS_DATA_FILE), Path(Config.SYNONYMS_FILE)],
+    retire=close_retriever,
+)
 llm = LLM()
 
+# 检索增强对话的上下文构造
+get_context_builder = Lazy(lambda: ContextBuilder(
+    index_manager.current(),
+    token_budget=Config.RAG_TOKEN_BUDGET,
+    top_k=Config.RAG_TOP_K,
+    description_chars=Config.RAG_DESCRIPTION_CHARS,
+    cache_size=Config.RAG_CACHE_SIZE,
+), name="context_builder")
+
+# 合并并发的相同检索/上游请求
+flight = SingleFlight()
+
+# 服务端对话历史
+conversation_store = ConversationStore(
+    token_budget=Config.CHAT_HISTORY_TOKEN_BUDGET,
+    summary_budget=Config.CHAT_SUMMARY_TOKEN_BUDGET,
+    max_conversations=Config.CHAT_MAX_CONVERSATIONS,
+    ttl=Config.CHAT_CONVERSATION_TTL,
+)
+
+# 大宗交易日度聚合（app.trends依赖numpy，首次请求趋势数据时才导入）
+def create_trends_store():
+    from app.trends import TrendsStore
+    return TrendsStore(Config.TRADES_DATA_FILE, Config.INDEX_DATA_FILE)
+
+get_trends_store = Lazy(create_trends_store, name="trends_store")
+
+def build_trends_payload():
+    from app.trends import mock_payload
+    # 增量导入新追加的成交记录，直接读取预先计算好的日度聚合
+    trends_store = get_trends_store()
+    trends_store.refresh()
+    if len(trends_store) == 0:
+        # 未配置成交数据时返回模拟数据
+        return mock_payload(Config.TRENDS_DAYS)
+    return trends_store.payload(Config.TRENDS_DAYS)
+
+# 每个刷新周期只计算、序列化一次，所有轮询请求共享
+trends_snapshot = SnapshotCache(build_trends_payload, ttl=Config.TRENDS_REFRESH_SECONDS)
+
+# 市场数据推送（替代前端30秒轮询）
+trends_broadcaster = Broadcaster(
+    trends_snapshot.get,
+    event="trends",
+    interval=Config.TRENDS_PUSH_INTERVAL,
+    buffer_size=Config.TRENDS_PUSH_BUFFER,
+)
+
+# 慢请求剖析（/api/search、/api/chat）
+profiler = Profiler(
+    enabled=Config.PROFILE_ENABLED,
+    sample_rate=Config.PROFILE_SAMPLE_RATE,
+    threshold_ms=Config.PROFILE_THRESHOLD_MS,
+    max_per_minute=Config.PROFILE_MAX_PER_MINUTE,
+    buffer_size=Config.PROFILE_BUFFER_SIZE,
+    header=Config.PROFILE_HEADER or None,
+)
+
+async def run_shared(profile, key, fn, *args):
+    # 相同请求合并执行；被剖析的请求单独执行，保证调用栈完整记录在本次会话中
+    if profile is None:
+        return await flight.do(key, run_in_threadpool, fn, *args)
+    return await run_in_threadpool(profile.run, fn, *args)
+
+# 缓存命中统计（/metrics）
+def rag_cache_stats():
+    builder = get_context_builder.peek()
+    return (builder.hits, builder.misses) if builder is not None else (0, 0)
+
+register_cache("rag_context", rag_cache_stats)
+
+def on_index_swap(retriever):
+    # 索引切换后上下文构造改用新检索器，并丢弃旧索引的缓存
+    builder = get_context_builder.peek()
+    if builder is not None:
+        builder.set_retriever(retriever)
+
+index_manager.add_listener(on_index_swap)
+register_cache("trends_snapshot", lambda: (trends_snapshot.hits, trends_snapshot.misses))
+register_cache("singleflight", lambda: (flight.coalesced, flight.executions))
+# 熔断器状态与上游调用计数（客户端首次使用时才创建，之前不输出）
+register_upstream("zhipu", lambda: zhipu_ai.stats() if zhipu_ai is not None else None)
+
+# 输入提示索引：过期或索引切换后由一个请求重建，其他请求继续使用旧索引
+suggest_state = {"suggester": None, "built_at": 0.0, "generation": -1}
+suggest_lock = asyncio.Lock()
+
+async def get_suggester() -> PrefixSuggester:
+    suggester = suggest_state["suggester"]
+    if suggester is not None and (
+        suggest_lock.locked()
+        or (suggest_state["generation"] == index_manager.generation
+            and time.time() - suggest_state["built_at"] < Config.SUGGEST_REFRESH_SECONDS)
+    ):
+        return suggester
+    async with suggest_lock:
+        if suggest_state["suggester"] is not suggester:
+            return suggest_state["suggester"]
+        # 只有重建时才打开数据库会话，逐键输入的请求不访问数据库
+        async with open_db() as db:
+            history = await crud.search_query_counts(db, Config.SUGGEST_HISTORY_LIMIT)
+        retriever = await run_in_threadpool(index_manager.current)
+        suggester = await run_in_threadpool(
+            PrefixSuggester.build, listings_of(retriever), history, Config.SUGGEST_HISTORY_WEIGHT
+        )
+        suggest_state.update(suggester=suggester, built_at=time.time(), generation=index_manager.generation)
+    return suggester
+
 # 依赖项
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_db():
+    await ensure_tables()
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+open_db = asynccontextmanager(get_db)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -68,7 +294,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, Config.get_jwt_secret_key(), algorithm=Config.ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: DBSession = Depends(get_db)):
     try:
         payload = jwt.decode(credentials.credentials, Config.get_jwt_secret_key(), algorithms=[Config.ALGORITHM])
         username: str = payload.get("sub")
@@ -77,11 +303,29 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="无效的认证凭据")
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await crud.get_user_by_username(db, username)
     if user is None:
         raise HTTPException(status_code=401, detail="用户不存在")
     return user
 
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[User]:
+    # 匿名接口中识别已登录用户（如管理员强制剖析），凭据缺失或无效时返回None；
+    # 只有带凭据的请求才打开数据库会话，匿名请求不访问数据库
+    if credentials is None:
+        return None
+    try:
+        async with open_db() as db:
+            return await get_current_user(credentials, db)
+    except HTTPException:
+        return None
+
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="需要管理员权限")
+    return current_user
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -91,14 +335,14 @@ async def read_trends(request: Request):
     return templates.TemplateResponse("trends.html", {"request": request})
 
 @app.post("/api/register")
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: DBSession = Depends(get_db)):
     # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await crud.get_user_by_username(db, user_data.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="用户名已存在")
     
     # 检查邮箱是否已存在
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = await crud.get_user_by_email(db, user_data.email)
     if existing_email:
         raise HTTPException(status_code=400, detail="邮箱已被注册")
     
@@ -108,18 +352,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         email=user_data.email,
         full_name=user_data.full_name
     )
-    user.set_password(user_data.password)
+    # bcrypt计算较慢，放到线程池避免阻塞事件循环
+    await run_in_threadpool(user.set_password, user_data.password)
     
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await crud.create_user(db, user)
     
     return {"message": "注册成功"}
 
 @app.post("/api/login")
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
-    if not user or not user.check_password(user_data.password):
+async def login(user_data: UserLogin, db: DBSession = Depends(get_db)):
+    user = await crud.get_user_by_username(db, user_data.username)
+    if not user or not await run_in_threadpool(user.check_password, user_data.password):
         raise HTTPException(status_code=401, detail="用户名或密码错误")
     
     access_token_expires = timedelta(minutes=Config.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -147,19 +390,56 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
         "full_name": current_user.full_name
     }
 
+def get_diversifier(search_request: SearchRequest) -> Diversifier:
+    def pick(value, default):
+        return default if value is None else value
+
+    return Diversifier(
+        diversity=pick(search_request.diversity, Config.DIVERSITY),
+        candidates=Config.DIVERSITY_CANDIDATES,
+        max_per_seller=pick(search_request.max_per_seller, Config.MAX_PER_SELLER),
+        max_per_category=pick(search_request.max_per_category, Config.MAX_PER_CATEGORY),
+    )
+
+def run_search(query: str, top_k: int, use_llm: bool, diversifier: Optional[Diversifier] = None):
+    retriever = index_manager.current()
+    if diversifier is not None and diversifier.active:
+        # 多取候选，再用MMR与卖方/类别上限挑出top_k条
+        results = retriever.search(query, diversifier.fetch_size(top_k))
+        results = diversifier.diversify(results, top_k, vectors_of(retriever, results))
+    else:
+        results = retriever.search(query, top_k)
+    summary = None
+    if use_llm and results:
+        with stage("summary"):
+            summary = llm.generate_summary(query, results)
+    return results, summary
+
 @app.post("/api/search")
 async def search(
     search_request: SearchRequest,
+    request: Request,
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_db)
 ):
-    # 执行搜索
-    results = retriever.search(search_request.query, search_request.top_k)
-    
-    # 生成AI摘要
-    summary = None
-    if search_request.use_llm and results:
-        summary = llm.generate_summary(search_request.query, results)
+    # 执行搜索并生成AI摘要，相同的并发查询只计算一次
+    profile = profiler.start(
+        "/api/search", request.headers, {"query": search_request.query[:100]},
+        allow_forced=bool(current_user and current_user.is_admin),
+    )
+    diversifier = get_diversifier(search_request)
+    try:
+        results, summary = await run_shared(
+            profile,
+            make_key("search", search_request.query, search_request.top_k, search_request.use_llm, vars(diversifier)),
+            run_search,
+            search_request.query,
+            search_request.top_k,
+            search_request.use_llm,
+            diversifier
+        )
+    finally:
+        profiler.finish(profile)
     
     # 记录搜索历史（如果用户已登录）
     if current_user:
@@ -169,8 +449,7 @@ async def search(
             results_count=len(results),
             use_llm=search_request.use_llm
         )
-        db.add(search_history)
-        db.commit()
+        await crud.add_search_history(db, search_history)
     
     return {
         "results": results,
@@ -181,11 +460,9 @@ async def search(
 @app.get("/api/search/history")
 async def get_search_history(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_db)
 ):
-    history = db.query(SearchHistory).filter(
-        SearchHistory.user_id == current_user.id
-    ).order_by(SearchHistory.search_time.desc()).limit(20).all()
+    history = await crud.list_search_history(db, current_user.id, limit=20)
     
     return [
         {
@@ -198,46 +475,48 @@ async def get_search_history(
         for item in history
     ]
 
+@app.get("/api/suggest")
+async def suggest(q: str = "", limit: int = 8):
+    """
+    输入提示：按前缀（或拼音前缀）返回热门的标题、标签、类别、卖方与历史查询
+    """
+    suggester = await get_suggester()
+    return {"query": q, "suggestions": suggester.suggest(q, limit)}
+
 @app.get("/api/trends/data")
-async def get_trends_data():
-    # 模拟实时市场数据
-    import random
-    from datetime import datetime, timedelta
-    
-    # 生成模拟的市场数据
-    market_data = {
-        "shanghai_index": round(3600 + random.uniform(-100, 100), 2),
-        "shanghai_change": round(random.uniform(-2, 2), 2),
-        "total_volume": round(random.uniform(50000, 80000), 2),
-        "premium_volume": round(random.uniform(200, 500), 2),
-        "discount_volume": round(random.uniform(45000, 75000), 2)
-    }
-    
-    # 生成模拟的每日统计数据
-    daily_stats = []
-    for i in range(30):
-        date = datetime.now() - timedelta(days=29-i)
-        daily_stats.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "index": round(3600 + random.uniform(-150, 150), 2),
-            "change": round(random.uniform(-3, 3), 2),
-            "total_volume": round(random.uniform(40000, 90000), 2),
-            "premium_volume": round(random.uniform(100, 800), 2),
-            "premium_ratio": round(random.uniform(0.5, 2.5), 2),
-            "discount_volume": round(random.uniform(35000, 85000), 2),
-            "discount_ratio": round(random.uniform(97.5, 99.5), 2)
-        })
-    
-    return {
-        "market_data": market_data,
-        "daily_stats": daily_stats
-    }
+async def get_trends_data(request: Request):
+    # 缓存未命中时读文件、聚合并序列化，放到线程池中执行，不阻塞事件循环
+    snapshot = await run_in_threadpool(trends_snapshot.get)
+    headers = snapshot.headers()
+    if snapshot.not_modified(request.headers):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@app.get("/api/trends/stream")
+async def stream_trends_data(request: Request):
+    """
+    市场数据推送（Server-Sent Events）
+    """
+    subscriber = await trends_broadcaster.subscribe()
+    return StreamingResponse(
+        trends_broadcaster.stream(subscriber, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_with_ai(chat_request: ChatRequest):
+async def chat_with_ai(
+    chat_request: ChatRequest,
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user)
+):
     """
     与智谱AI进行对话
     """
+    profile = profiler.start(
+        "/api/chat", request.headers, {"message": chat_request.message[:100]},
+        allow_forced=bool(current_user and current_user.is_admin),
+    )
     try:
         # 调用智谱AI
         ai_client = get_zhipu_ai()
@@ -248,16 +527,53 @@ async def chat_with_ai(chat_request: ChatRequest):
                 success=False
             )
         
-        response = ai_client.chat(
-            user_message=chat_request.message,
-            system_prompt=chat_request.system_prompt,
-            conversation_history=chat_request.conversation_history
+        context_builder = await get_context_builder.aget()
+        system_prompt = chat_request.system_prompt
+        sources = None
+        if chat_request.use_context:
+            # 检索相关挂牌信息，按token预算装入系统提示词（检索在线程池中执行，不阻塞事件循环）
+            if profile is None:
+                context, used = await run_in_threadpool(
+                    context_builder.build, chat_request.message, chat_request.context_top_k
+                )
+            else:
+                context, used = await run_in_threadpool(
+                    profile.run, context_builder.build, chat_request.message, chat_request.context_top_k
+                )
+            if context:
+                system_prompt = f"{system_prompt or DEFAULT_SYSTEM_PROMPT}\n\n{context}"
+                sources = [str(r["listing"].get("id", "")) for r in used]
+        
+        # 历史由服务端按会话维护并压缩，客户端传来的历史仅用于初始化新会话
+        conversation_id = chat_request.conversation_id or conversation_store.new_id()
+        history = conversation_store.history(conversation_id, seed=chat_request.conversation_history)
+        
+        # 上游不可用时返回本地检索摘要
+        def fallback():
+            return llm.generate_chat_fallback(
+                chat_request.message,
+                context_builder.build(chat_request.message, chat_request.context_top_k)[1]
+            )
+        
+        response, upstream_ok = await run_shared(
+            profile,
+            make_key("chat", system_prompt, chat_request.message, history),
+            ai_client.chat_with_status,
+            chat_request.message,
+            system_prompt,
+            history,
+            fallback
         )
+        if upstream_ok:
+            conversation_store.append(conversation_id, chat_request.message, response)
         
         return ChatResponse(
             response=response,
             timestamp=datetime.now().isoformat(),
-            success=True
+            success=True,
+            sources=sources,
+            conversation_id=conversation_id,
+            fallback=not upstream_ok
         )
     except Exception as e:
         return ChatResponse(
@@ -265,6 +581,8 @@ async def chat_with_ai(chat_request: ChatRequest):
             timestamp=datetime.now().isoformat(),
             success=False
         )
+    finally:
+        profiler.finish(profile)
 
 @app.post("/api/chat/analyze")
 async def analyze_market_with_ai():
@@ -273,11 +591,21 @@ async def analyze_market_with_ai():
     """
     try:
         # 获取当前市场数据
-        trends_data = await get_trends_data()
-        market_data = trends_data["market_data"]
+        snapshot = await run_in_threadpool(trends_snapshot.get)
+        market_data = snapshot.data["market_data"]
         
-        # 使用智谱AI分析
-        analysis = zhipu_ai.analyze_market_data(market_data)
+        # 使用智谱AI分析（上游不可用时返回模板分析）
+        ai_client = get_zhipu_ai()
+        if ai_client is None:
+            analysis = llm.generate_market_summary(market_data)
+        else:
+            analysis = await flight.do(
+                make_key("analyze", snapshot.etag),
+                run_in_threadpool,
+                ai_client.analyze_market_data,
+                market_data,
+                lambda: llm.generate_market_summary(market_data)
+            )
         
         return {
             "analysis": analysis,
@@ -298,7 +626,18 @@ async def get_investment_advice(chat_request: ChatRequest):
     获取投资建议
     """
     try:
-        advice = zhipu_ai.get_investment_advice(chat_request.message)
+        ai_client = get_zhipu_ai()
+        fallback = lambda: llm.generate_advice_fallback(chat_request.message)
+        if ai_client is None:
+            advice = fallback()
+        else:
+            advice = await flight.do(
+                make_key("advice", chat_request.message),
+                run_in_threadpool,
+                ai_client.get_investment_advice,
+                chat_request.message,
+                fallback
+            )
         
         return {
             "advice": advice,
@@ -312,6 +651,111 @@ async def get_investment_advice(chat_request: ChatRequest):
             "success": False
         }
 
+@app.get("/api/status")
+async def get_status():
+    """
+    服务运行状态（上游熔断器、并发限制、降级次数、请求合并）
+    """
+    ai_client = get_zhipu_ai()
+    return {
+        "upstream": ai_client.stats() if ai_client is not None else None,
+        "singleflight": flight.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def warmup_components():
+    """
+    依次构造延迟加载的组件并执行一次检索，返回各步骤耗时（毫秒）
+    """
+    timings = {}
+
+    async def step(name, fn, *args):
+        start = time.perf_counter()
+        await fn(*args)
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    await step("database", ensure_tables)
+    await step("retriever", run_in_threadpool, index_manager.current)
+    await step("context_builder", get_context_builder.aget)
+    await step("trends", run_in_threadpool, trends_snapshot.get)
+    await step("zhipu_client", run_in_threadpool, get_zhipu_ai)
+    await step("search", run_in_threadpool, run_search, "钢材", 5, True)
+    return timings
+
+@app.get("/api/warmup")
+async def warmup():
+    """
+    预热：冷启动后由平台探活或部署脚本调用，提前加载检索数据、趋势数据等
+    """
+    start = time.perf_counter()
+    timings = await warmup_components()
+    return {
+        "status": "ok",
+        "timings_ms": timings,
+        "total_ms": round((time.perf_counter() - start) * 1000, 3),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/api/admin/index")
+async def get_index_status(admin: User = Depends(get_admin_user)):
+    """
+    检索索引版本与热更新状态（管理员）
+    """
+    return index_manager.stats()
+
+@app.post("/api/admin/index/reload")
+async def reload_index(reload_request: IndexReloadRequest, admin: User = Depends(get_admin_user)):
+    """
+    热更新检索索引：后台构建新索引后原子切换，进行中的查询不受影响。
+    指定version时先把CURRENT切换到该版本，其他worker由文件监视跟进。
+    """
+    if reload_request.version:
+        try:
+            await run_in_threadpool(artifacts.publish, index_manager.root, reload_request.version)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    if reload_request.wait:
+        started = await run_in_threadpool(index_manager.reload, reload_request.version, True)
+    else:
+        started = index_manager.reload(reload_request.version)
+    return {
+        "started": started,
+        "status": index_manager.stats()
+    }
+
+@app.get("/api/admin/profiles")
+async def list_profiles(admin: User = Depends(get_admin_user)):
+    """
+    最近保存的请求剖析（管理员）
+    """
+    return {
+        "profiles": [record.info() for record in profiler.records()],
+        "stats": profiler.stats()
+    }
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "prof", admin: User = Depends(get_admin_user)):
+    """
+    下载剖析结果：format=prof 为pstats二进制（可用snakeviz等工具打开），format=text 为文本报告
+    """
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="剖析记录不存在或已被淘汰")
+    if format == "text":
+        return PlainTextResponse(await run_in_threadpool(record.text))
+    return Response(
+        content=record.data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{record.id}.prof"'}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus指标：各路由请求数与延迟、内部阶段耗时、缓存命中率
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
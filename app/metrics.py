@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# 秒级延迟桶，覆盖 0.1ms ~ 10s
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Sharded:
+    """
+    按线程分片的存储
+
+    每个线程只写自己的分片（普通dict），热路径上没有锁；
+    只有线程第一次写入时登记分片需要加锁，读取时汇总所有分片。
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[LabelValues, Any] = {}
+            with self._register_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[LabelValues, Any]]:
+        with self._register_lock:
+            shards = list(self._shards)
+        return [s.copy() for s in shards]
+
+
+class Counter(_Sharded):
+    """单调递增计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        total: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for labels, v in shard.items():
+                total[labels] = total.get(labels, 0.0) + v
+        return total
+
+    def collect(self) -> Iterable[str]:
+        for labels, v in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+
+
+class Gauge(Counter):
+    """可增可减的数值（各线程分片之和）"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0, labels: LabelValues = ()) -> None:
+        self.inc(-amount, labels)
+
+
+class Histogram(_Sharded):
+    """固定分桶直方图，分片内保存 [各桶计数..., 总和, 总数]"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._width = len(self.buckets) + 1
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = [0] * self._width + [0.0, 0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def time(self, labels: LabelValues = ()) -> "Timer":
+        return Timer(self, labels)
+
+    def values(self) -> Dict[LabelValues, List[float]]:
+        total: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, row in shard.items():
+                acc = total.get(labels)
+                if acc is None:
+                    total[labels] = list(row)
+                else:
+                    for i, v in enumerate(row):
+                        acc[i] += v
+        return total
+
+    def collect(self) -> Iterable[str]:
+        for labels, row in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:self._width]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(row[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {int(row[-1])}"
+
+
+class Timer:
+    """with语句计时，退出时写入直方图（比contextmanager生成器开销更低）"""
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, self._labels)
+
+
+class CallbackMetric:
+    """采集时回调取值的指标，用于暴露已有组件自带的统计（缓存命中等）"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]], type: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.type = type
+
+    def collect(self) -> Iterable[str]:
+        for labels, v in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Any) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric '{metric.name}' already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]], type: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, type))
+
+    def render(self) -> str:
+        """Prometheus文本格式（text/plain; version=0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                lines.append(f"# collect failed: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    "blocktrade_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "blocktrade_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+IN_FLIGHT = REGISTRY.gauge("blocktrade_http_requests_in_flight", "HTTP requests currently being served")
+STAGE_LATENCY = REGISTRY.histogram(
+    "blocktrade_stage_duration_seconds",
+    "Latency of internal stages (embed, scoring, topk, summary, db_commit, upstream)",
+    ("stage",),
+)
+
+
+def stage(name: str) -> Timer:
+    """内部阶段计时：with stage("embed"): ..."""
+    return Timer(STAGE_LATENCY, (name,))
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_LATENCY.observe(seconds, (name,))
+
+
+_CACHES: Dict[str, Callable[[], Tuple[float, float]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[float, float]]) -> None:
+    """
+    登记一个缓存的命中统计
+
+    Args:
+        name: 缓存名称（作为cache标签）
+        stats: 返回 (命中数, 未命中数) 的函数
+    """
+    _CACHES[name] = stats
+
+
+def _cache_values(index: Optional[int]) -> Callable[[], Dict[LabelValues, float]]:
+    def collect() -> Dict[LabelValues, float]:
+        values: Dict[LabelValues, float] = {}
+        for name, stats in list(_CACHES.items()):
+            hits, misses = stats()
+            if index is None:
+                total = hits + misses
+                values[(name,)] = round(hits / total, 6) if total else 0.0
+            else:
+                values[(name,)] = (hits, misses)[index]
+        return values
+    return collect
+
+
+REGISTRY.callback("blocktrade_cache_hits_total", "Cache hits", ("cache",), _cache_values(0), "counter")
+REGISTRY.callback("blocktrade_cache_misses_total", "Cache misses", ("cache",), _cache_values(1), "counter")
+REGISTRY.callback("blocktrade_cache_hit_ratio", "Cache hit ratio since start", ("cache",), _cache_values(None))
+
+
+_UPSTREAMS: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+
+# 熔断器状态，各状态一条序列，当前状态取值为1
+_BREAKER_STATES = ("closed", "open", "half_open")
+
+
+def register_upstream(name: str, stats: Callable[[], Optional[Dict[str, Any]]]) -> None:
+    """
+    登记一个上游客户端的调用统计
+
+    Args:
+        name: 上游名称（作为upstream标签）
+        stats: 返回客户端 stats()（breaker、limiter、total_calls、total_fallbacks）的函数，客户端未创建时返回None
+    """
+    _UPSTREAMS[name] = stats
+
+
+def _upstream_values(
+    read: Callable[[Dict[str, Any]], Dict[LabelValues, float]]
+) -> Callable[[], Dict[LabelValues, float]]:
+    def collect() -> Dict[LabelValues, float]:
+        values: Dict[LabelValues, float] = {}
+        for name, stats in list(_UPSTREAMS.items()):
+            current = stats()
+            if current is None:
+                continue
+            for labels, v in read(current).items():
+                values[(name,) + labels] = v
+        return values
+    return collect
+
+
+REGISTRY.callback(
+    "blocktrade_upstream_breaker_state", "Circuit breaker state (1 for the current state)", ("upstream", "state"),
+    _upstream_values(lambda s: {(state,): float(s["breaker"]["state"] == state) for state in _BREAKER_STATES}),
+)
+REGISTRY.callback(
+    "blocktrade_upstream_consecutive_failures", "Consecutive upstream failures counted by the breaker", ("upstream",),
+    _upstream_values(lambda s: {(): s["breaker"]["consecutive_failures"]}),
+)
+REGISTRY.callback(
+    "blocktrade_upstream_calls_total", "Upstream calls actually sent", ("upstream",),
+    _upstream_values(lambda s: {(): s["total_calls"]}), "counter",
+)
+REGISTRY.callback(
+    "blocktrade_upstream_failures_total", "Upstream failures recorded by the breaker", ("upstream",),
+    _upstream_values(lambda s: {(): s["breaker"]["total_failures"]}), "counter",
+)
+REGISTRY.callback(
+    "blocktrade_upstream_rejected_total", "Upstream calls rejected before sending", ("upstream", "reason"),
+    _upstream_values(lambda s: {("breaker_open",): s["breaker"]["total_rejected"],
+                                ("concurrency",): s["limiter"]["total_rejected"]}), "counter",
+)
+REGISTRY.callback(
+    "blocktrade_upstream_breaker_opened_total", "Times the circuit breaker opened", ("upstream",),
+    _upstream_values(lambda s: {(): s["breaker"]["times_opened"]}), "counter",
+)
+REGISTRY.callback(
+    "blocktrade_upstream_fallbacks_total", "Answers served by the local fallback", ("upstream",),
+    _upstream_values(lambda s: {(): s["total_fallbacks"]}), "counter",
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI中间件：按路由模板统计请求数与延迟
+
+    使用匹配到的路由路径（如 /api/search）而非原始URL作为标签，避免标签基数膨胀；
+    流式响应（SSE）的耗时以响应结束为准。
+    """
+
+    def __init__(self, app: Any, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope.get("path") in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        IN_FLIGHT.inc(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec(1)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "GET")
+            REQUESTS.inc(1, (method, path, status[0]))
+            REQUEST_LATENCY.observe(time.perf_counter() - start, (method, path))
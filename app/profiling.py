@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional
+
+
+class _LoadedStats:
+    """让pstats.Stats从marshal数据加载（pstats只接受文件名或带create_stats的对象）"""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class ProfileRecord:
+    """一次被保存的请求剖析结果"""
+
+    def __init__(self, route: str, elapsed_ms: float, forced: bool, meta: Dict[str, Any], data: bytes):
+        self.id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.elapsed_ms = elapsed_ms
+        self.forced = forced
+        self.meta = meta
+        self.data = data
+        self.created_at = datetime.now().isoformat()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "elapsed_ms": self.elapsed_ms,
+            "forced": self.forced,
+            "meta": self.meta,
+            "created_at": self.created_at,
+            "size": len(self.data),
+        }
+
+    def text(self, sort: str = "cumulative", limit: int = 40) -> str:
+        """可读的统计文本（按累计耗时排序）"""
+        stream = io.StringIO()
+        stats = pstats.Stats(_LoadedStats(marshal.loads(self.data)), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class ProfileSession:
+    """
+    单个请求的剖析会话
+
+    cProfile只记录当前线程，因此需要把处理函数放进run()执行（在线程池中同样适用）；
+    同一请求可多次调用run()，结果在结束时合并。
+    """
+
+    def __init__(self, route: str, forced: bool, meta: Dict[str, Any]):
+        self.route = route
+        self.forced = forced
+        self.meta = meta
+        self.started = time.perf_counter()
+        self._profiles: List[cProfile.Profile] = []
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    def dump(self) -> Optional[bytes]:
+        if not self._profiles:
+            return None
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return marshal.dumps(stats.stats)
+
+
+class Profiler:
+    """
+    按需请求剖析
+
+    仅在开启配置后生效：按采样率抽样，只保存耗时超过阈值的请求；管理员请求可用请求头（如 X-Profile: 1）
+    强制剖析并保存。同一时间最多一个剖析会话（非阻塞锁），
+    每分钟会话数受限，最近N条结果保存在环形缓冲中。
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.01, threshold_ms: float = 500.0,
+                 max_per_minute: int = 6, buffer_size: int = 20, header: Optional[str] = "X-Profile"):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.max_per_minute = max_per_minute
+        self.header = header.lower() if header else None
+        self._records: Deque[ProfileRecord] = deque(maxlen=buffer_size)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+        self._started: Deque[float] = deque()
+        self.sessions = 0
+        self.saved = 0
+        self.skipped_busy = 0
+        self.skipped_rate = 0
+
+    def _header_requested(self, headers: Optional[Mapping[str, str]]) -> bool:
+        if not self.header or headers is None:
+            return False
+        value = headers.get(self.header)
+        return bool(value) and value.lower() not in ("0", "false", "no")
+
+    def _within_rate(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._started and now - self._started[0] > 60.0:
+                self._started.popleft()
+            if len(self._started) >= self.max_per_minute:
+                return False
+            self._started.append(now)
+            return True
+
+    def start(self, route: str, headers: Optional[Mapping[str, str]] = None,
+              meta: Optional[Dict[str, Any]] = None, allow_forced: bool = False) -> Optional[ProfileSession]:
+        """
+        判断本次请求是否剖析
+
+        Args:
+            allow_forced: 调用方是否为已认证的管理员；否则忽略强制剖析请求头
+                （强制剖析的请求不参与请求合并，不能交给匿名客户端触发）
+
+        Returns:
+            剖析会话；不剖析时返回None（必须与finish()成对调用）
+        """
+        if not self.enabled:
+            return None
+        forced = allow_forced and self._header_requested(headers)
+        if not forced and random.random() >= self.sample_rate:
+            return None
+        # 已有会话在运行时直接跳过，不等待
+        if not self._active.acquire(blocking=False):
+            self.skipped_busy += 1
+            return None
+        if not self._within_rate():
+            self._active.release()
+            self.skipped_rate += 1
+            return None
+        self.sessions += 1
+        return ProfileSession(route, forced, dict(meta or {}))
+
+    def finish(self, session: Optional[ProfileSession]) -> Optional[ProfileRecord]:
+        if session is None:
+            return None
+        try:
+            elapsed_ms = round((time.perf_counter() - session.started) * 1000, 3)
+            if not session.forced and elapsed_ms < self.threshold_ms:
+                return None
+            data = session.dump()
+            if data is None:
+                return None
+            record = ProfileRecord(session.route, elapsed_ms, session.forced, session.meta, data)
+            with self._lock:
+                self._records.append(record)
+            self.saved += 1
+            return record
+        finally:
+            self._active.release()
+
+    def records(self) -> List[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records))
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        for record in self.records():
+            if record.id == profile_id:
+                return record
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "threshold_ms": self.threshold_ms,
+            "max_per_minute": self.max_per_minute,
+            "buffered": len(self._records),
+            "sessions": self.sessions,
+            "saved": self.saved,
+            "skipped_busy": self.skipped_busy,
+            "skipped_rate": self.skipped_rate,
+        }
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 压缩向量文件（与 embeddings.npy 放在同一个索引目录）
+INT8_CODES_FILE = "embeddings_int8.npy"
+INT8_SCALE_FILE = "int8_scale.npy"
+PQ_CODES_FILE = "pq_codes.npy"
+PQ_CENTROIDS_FILE = "pq_centroids.npy"
+
+MODES = ("float", "int8", "pq")
+
+# 分块处理的行数：打分与编码时临时数组不超过 CHUNK_ROWS × 维度
+CHUNK_ROWS = 65536
+
+
+def _chunks(n: int, size: int = CHUNK_ROWS) -> Iterable[Tuple[int, int]]:
+    for start in range(0, n, size):
+        yield start, min(n, start + size)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """分数最高的k个下标（降序）"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(scores, -k)[-k:]
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+class ScalarQuantizer:
+    """
+    int8标量量化（每维对称缩放）
+
+    x ≈ code * scale，内积 q·x ≈ (q*scale)·code，打分时只需把查询向量乘以scale，
+    int8矩阵按块转为float32参与矩阵乘法，内存为float32的1/4。
+    """
+
+    def __init__(self, scale: np.ndarray):
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+        for start, end in _chunks(len(vectors)):
+            np.maximum(max_abs, np.abs(normalize_rows(vectors[start:end])).max(axis=0), out=max_abs)
+        return cls(np.maximum(max_abs, 1e-8) / 127.0)
+
+    def encode(self, vectors: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = out if out is not None else np.empty(vectors.shape, dtype=np.int8)
+        for start, end in _chunks(len(vectors)):
+            block = normalize_rows(vectors[start:end]) / self.scale
+            codes[start:end] = np.clip(np.rint(block), -127, 127).astype(np.int8)
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        q = (query * self.scale).astype(np.float32)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start, end in _chunks(len(codes)):
+            out[start:end] = codes[start:end].astype(np.float32) @ q
+        return out
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    """内积形式的k-means（argmin ||x-c||² = argmax x·c - ||c||²/2）"""
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=x[:, d], minlength=k) for d in range(x.shape[1])], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # 空簇重新随机取点
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    乘积量化（PQ）+ 非对称距离计算（ADC）
+
+    向量切成m段，每段用256个中心编码为1字节；查询时先算出每段与各中心的内积表(m×256)，
+    每条向量的分数为m次查表之和。384维、m=48时每条向量48字节（float32的1/32）。
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.m, self.k, self.dsub = self.centroids.shape
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, m: int = 48, k: int = 256, iters: int = 20,
+            sample: int = 100_000, seed: int = 0) -> "ProductQuantizer":
+        dim = vectors.shape[1]
+        if dim % m:
+            raise ValueError(f"dimension {dim} is not divisible by m={m}")
+        if k > 256:
+            raise ValueError("k must be <= 256 for uint8 codes")
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), min(sample, len(vectors)), replace=False))
+        train = normalize_rows(vectors[rows])
+        dsub = dim // m
+        # 样本少于k条时中心数随之减少
+        k = min(k, len(train))
+        centroids = np.stack([_kmeans(train[:, j * dsub:(j + 1) * dsub], k, iters, rng) for j in range(m)])
+        return cls(centroids)
+
+    def encode(self, vectors: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = out if out is not None else np.empty((len(vectors), self.m), dtype=np.uint8)
+        half_norms = 0.5 * (self.centroids ** 2).sum(axis=2)
+        for start, end in _chunks(len(vectors)):
+            block = normalize_rows(vectors[start:end])
+            for j in range(self.m):
+                sub = block[:, j * self.dsub:(j + 1) * self.dsub]
+                codes[start:end, j] = np.argmax(sub @ self.centroids[j].T - half_norms[j], axis=1)
+        return codes
+
+    def distance_table(self, query: np.ndarray) -> np.ndarray:
+        """(m, k) 查询各段与各中心的内积"""
+        q = np.asarray(query, dtype=np.float32).reshape(self.m, self.dsub)
+        return np.einsum("jkd,jd->jk", self.centroids, q)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        table = self.distance_table(query)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start, end in _chunks(len(codes)):
+            block = codes[start:end]
+            acc = table[0][block[:, 0]]
+            for j in range(1, self.m):
+                acc += table[j][block[:, j]]
+            out[start:end] = acc
+        return out
+
+
+class CompressedIndex:
+    """
+    压缩向量检索
+
+    先用压缩码近似打分，取前若干候选后可选用原始float向量精确重排；
+    原始向量以内存映射方式打开，只有候选行会被读入内存。
+    """
+
+    def __init__(self, mode: str, quantizer: Any, codes: np.ndarray, vectors: Optional[np.ndarray] = None):
+        if mode not in ("int8", "pq"):
+            raise ValueError(f"unsupported compressed mode: {mode}")
+        self.mode = mode
+        self.quantizer = quantizer
+        self.codes = codes
+        self.vectors = vectors
+
+    @classmethod
+    def load(cls, directory: Path, mode: str, embeddings_file: Optional[Path] = None,
+             mmap_mode: Optional[str] = None) -> "CompressedIndex":
+        """mmap_mode="r" 时压缩码也只做内存映射（如分片进程只读取自己的行）"""
+        directory = Path(directory)
+        if mode == "int8":
+            quantizer: Any = ScalarQuantizer(np.load(directory / INT8_SCALE_FILE))
+            codes = np.load(directory / INT8_CODES_FILE, mmap_mode=mmap_mode)
+        elif mode == "pq":
+            quantizer = ProductQuantizer(np.load(directory / PQ_CENTROIDS_FILE))
+            codes = np.load(directory / PQ_CODES_FILE, mmap_mode=mmap_mode)
+        else:
+            raise ValueError(f"unsupported compressed mode: {mode}")
+        vectors = None
+        if embeddings_file is not None and Path(embeddings_file).exists():
+            vectors = np.load(embeddings_file, mmap_mode="r")
+        return cls(mode, quantizer, codes, vectors)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        extra = self.quantizer.scale.nbytes if self.mode == "int8" else self.quantizer.centroids.nbytes
+        return int(self.codes.nbytes + extra)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        return self.quantizer.scores(self.codes, query)
+
+    def select(self, scores: np.ndarray, query: np.ndarray, top_k: int, rerank: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        从近似分数中选出top_k
+
+        Args:
+            rerank: 大于top_k时先取rerank个候选，用原始向量精确打分后再取top_k
+
+        Returns:
+            (下标, 分数)
+        """
+        if rerank > top_k and self.vectors is not None:
+            candidates = np.sort(top_indices(scores, rerank))
+            exact = normalize_rows(self.vectors[candidates]) @ query
+            order = top_indices(exact, top_k)
+            return candidates[order], exact[order]
+        idx = top_indices(scores, top_k)
+        return idx, scores[idx]
+
+    def search(self, query: np.ndarray, top_k: int, rerank: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        return self.select(self.scores(query), query, top_k, rerank)
+
+
+def build(directory: Path, modes: Iterable[str] = ("int8", "pq"), embeddings_file: Optional[Path] = None,
+          pq_m: int = 48, pq_iters: int = 20, seed: int = 0) -> Dict[str, int]:
+    """
+    为索引目录中的 embeddings.npy 生成压缩文件
+
+    Returns:
+        各文件字节数
+    """
+    directory = Path(directory)
+    embeddings_file = Path(embeddings_file or directory / "embeddings.npy")
+    vectors = np.load(embeddings_file, mmap_mode="r")
+    sizes: Dict[str, int] = {"float32": int(vectors.shape[0] * vectors.shape[1] * 4)}
+    for mode in modes:
+        if mode == "int8":
+            sq = ScalarQuantizer.fit(vectors)
+            np.save(directory / INT8_SCALE_FILE, sq.scale)
+            out = np.lib.format.open_memmap(directory / INT8_CODES_FILE, mode="w+", dtype=np.int8, shape=vectors.shape)
+            sq.encode(vectors, out)
+            out.flush()
+            sizes["int8"] = int(out.nbytes + sq.scale.nbytes)
+            del out
+        elif mode == "pq":
+            pq = ProductQuantizer.fit(vectors, m=pq_m, iters=pq_iters, seed=seed)
+            np.save(directory / PQ_CENTROIDS_FILE, pq.centroids)
+            out = np.lib.format.open_memmap(directory / PQ_CODES_FILE, mode="w+", dtype=np.uint8,
+                                            shape=(len(vectors), pq.m))
+            pq.encode(vectors, out)
+            out.flush()
+            sizes["pq"] = int(out.nbytes + pq.centroids.nbytes)
+            del out
+        else:
+            raise ValueError(f"unsupported compressed mode: {mode}")
+    return sizes
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.tokens import estimate_tokens, truncate_to_tokens
+
+# 按标点/空白拆分问题，得到可以直接用于关键词检索的短语
+_SEGMENT_RE = re.compile(r"[\s，。！？、；：,.!?;:（）()【】\[\]《》“”\"']+")
+
+CONTEXT_HEADER = "以下是与用户问题相关的大宗交易挂牌信息（按相关度排序，仅供参考）："
+
+
+def format_listing(listing: Dict[str, Any], description_chars: int) -> Tuple[str, str]:
+    """
+    将挂牌信息压缩为一行上下文
+
+    Returns:
+        (包含截断描述的完整行, 不含描述的精简行)
+    """
+    price = listing.get("price")
+    fields = [
+        listing.get("title", ""),
+        listing.get("category", ""),
+        listing.get("region", ""),
+        f"{price}{listing.get('unit', '')}" if price is not None else "面议",
+        listing.get("seller", ""),
+        listing.get("date", ""),
+    ]
+    tags = listing.get("tags") or []
+    if tags:
+        fields.append("/".join(tags))
+    short = "- " + "｜".join(str(f) for f in fields if f)
+
+    description = listing.get("description", "")
+    if description and description_chars > 0:
+        if len(description) > description_chars:
+            description = description[:description_chars] + "…"
+        return f"{short}｜{description}", short
+    return short, short
+
+
+def pack_context(
+    results: List[Dict[str, Any]],
+    token_budget: int,
+    description_chars: int = 60,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    按相关度贪心装入上下文：优先放完整行，放不下时退而放精简行，仍放不下则跳过
+
+    Returns:
+        (上下文文本, 实际使用的检索结果)
+    """
+    budget = token_budget - estimate_tokens(CONTEXT_HEADER)
+    lines: List[str] = []
+    used: List[Dict[str, Any]] = []
+    for r in sorted(results, key=lambda x: x["score"], reverse=True):
+        full, short = format_listing(r["listing"], description_chars)
+        for line in (full, short):
+            cost = estimate_tokens(line) + 1
+            if cost <= budget:
+                lines.append(line)
+                used.append(r)
+                budget -= cost
+                break
+        if budget <= 0:
+            break
+    if not lines:
+        return "", []
+    return truncate_to_tokens(CONTEXT_HEADER + "\n" + "\n".join(lines), token_budget), used
+
+
+class ContextBuilder:
+    """
+    检索增强上下文构造器
+
+    对用户问题执行检索，把最相关的挂牌字段装入固定token预算内，
+    结果按（规范化问题, top_k）缓存，重复提问不再重复检索和拼装。
+    """
+
+    def __init__(
+        self,
+        retriever,
+        token_budget: int = 800,
+        top_k: int = 5,
+        description_chars: int = 60,
+        cache_size: int = 256,
+    ):
+        self.retriever = retriever
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.description_chars = description_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[str, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def set_retriever(self, retriever) -> None:
+        """切换检索器（索引热更新后调用），同时清空缓存"""
+        with self._lock:
+            self.retriever = retriever
+            self._generation += 1
+            self._cache.clear()
+
+    def _retrieve(self, retriever, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """整句检索；无结果时改为反向匹配问题中出现的标签/类别，再按短语分别检索，按最高分合并"""
+        results = retriever.search(query, top_k)
+        if results:
+            return results
+        if hasattr(retriever, "search_contained"):
+            results = retriever.search_contained(query, top_k)
+            if results:
+                return results
+
+        merged: Dict[int, Dict[str, Any]] = {}
+        for segment in _SEGMENT_RE.split(query):
+            if len(segment) < 2:
+                continue
+            for r in retriever.search(segment, top_k):
+                key = id(r["listing"])
+                if key not in merged or r["score"] > merged[key]["score"]:
+                    merged[key] = r
+        return sorted(merged.values(), key=lambda x: x["score"], reverse=True)[:top_k]
+
+    def build(self, query: str, top_k: Optional[int] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        构造上下文
+
+        Args:
+            query: 用户问题
+            top_k: 检索条数，默认使用构造时的配置
+
+        Returns:
+            (上下文文本, 使用的检索结果)
+        """
+        top_k = top_k or self.top_k
+        key = (" ".join(query.lower().split()), top_k)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            retriever, generation = self.retriever, self._generation
+
+        results = self._retrieve(retriever, query, top_k)
+        built = pack_context(results, self.token_budget, self.description_chars)
+
+        with self._lock:
+            # 构造期间检索器已切换时不写入缓存，避免旧索引的结果残留
+            if generation != self._generation:
+                return built
+            self._cache[key] = built
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return built
+
+    def clear(self) -> None:
+        """清空缓存（数据更新后调用）"""
+        with self._lock:
+            self._cache.clear()
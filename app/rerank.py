@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.metrics import observe_stage
+from app.synonyms import normalize
+
+_TOKEN_RE = re.compile(r"[\s,，、;；/]+")
+
+# 交叉编码器输入中使用的挂牌字段
+TEXT_FIELDS = ("title", "category", "region", "tags", "description")
+
+
+def listing_text(listing: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for key in TEXT_FIELDS:
+        value = listing.get(key)
+        if not value:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = " ".join(map(str, value))
+        parts.append(str(value))
+    return " ".join(parts)
+
+
+def _bigrams(text: str) -> set:
+    text = text.replace(" ", "")
+    return {text[i:i + 2] for i in range(len(text) - 1)} or ({text} if text else set())
+
+
+class LinearScorer:
+    """
+    轻量打分器：对(查询, 挂牌)提取少量匹配特征后线性加权
+
+    特征：一阶段分数、查询词在标题/标签/描述中的覆盖率、类别与地区命中、标题字二元组重合度。
+    权重可以用带相关度标注的样本通过最小二乘拟合（见 fit），也可以从JSON文件加载。
+    """
+
+    FEATURES = ("first_stage", "title", "tags", "description", "category", "region", "bigram")
+    DEFAULT_WEIGHTS = (0.5, 2.0, 1.0, 0.5, 0.5, 1.0, 1.5)
+
+    def __init__(self, weights: Optional[Sequence[float]] = None):
+        self.weights = list(weights or self.DEFAULT_WEIGHTS)
+        if len(self.weights) != len(self.FEATURES):
+            raise ValueError(f"expected {len(self.FEATURES)} weights, got {len(self.weights)}")
+
+    @classmethod
+    def from_file(cls, path: str) -> "LinearScorer":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls(json.load(f)["weights"])
+
+    def save(self, path: str) -> None:
+        with Path(path).open("w", encoding="utf-8") as f:
+            json.dump({"features": list(self.FEATURES), "weights": self.weights}, f, indent=2)
+
+    def features(self, query: str, result: Dict[str, Any]) -> List[float]:
+        listing = result["listing"]
+        q = normalize(query)
+        tokens = [t for t in _TOKEN_RE.split(q) if t] or [q]
+        title = normalize(str(listing.get("title", "")))
+        tags = [normalize(str(t)) for t in listing.get("tags", []) or []]
+        description = normalize(str(listing.get("description", "")))
+        category = normalize(str(listing.get("category", "")))
+        region = normalize(str(listing.get("region", "")))
+        n = len(tokens)
+        q_bigrams = _bigrams(q)
+        t_bigrams = _bigrams(title)
+        return [
+            float(result.get("score", 0.0)),
+            sum(t in title for t in tokens) / n,
+            sum(any(t in tag or tag in t for tag in tags) for t in tokens) / n,
+            sum(t in description for t in tokens) / n,
+            float(bool(category) and any(t == category for t in tokens)),
+            float(bool(region) and any(t in region for t in tokens)),
+            len(q_bigrams & t_bigrams) / len(q_bigrams | t_bigrams) if q_bigrams else 0.0,
+        ]
+
+    def score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        return [sum(w * x for w, x in zip(self.weights, self.features(query, r))) for r in candidates]
+
+    @classmethod
+    def fit(cls, samples: Sequence[tuple], ridge: float = 1e-3) -> "LinearScorer":
+        """
+        用 (查询, 候选结果, 相关度) 样本做岭回归拟合权重
+
+        Args:
+            samples: [(query, result, relevance)]，result 为一阶段返回的 {"score", "listing"}
+        """
+        import numpy as np
+
+        scorer = cls()
+        x = np.asarray([scorer.features(q, r) for q, r, _ in samples], dtype=np.float64)
+        y = np.asarray([rel for _, _, rel in samples], dtype=np.float64)
+        a = x.T @ x + ridge * np.eye(x.shape[1])
+        return cls(np.linalg.solve(a, x.T @ y).tolist())
+
+
+class CrossEncoderScorer:
+    """本地交叉编码器（fastembed TextCrossEncoder，首次打分时加载模型）"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            from fastembed.rerank.cross_encoder import TextCrossEncoder
+            self._model = TextCrossEncoder(self.model_name)
+        return self._model
+
+    def score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        texts = [listing_text(r["listing"]) for r in candidates]
+        return [float(s) for s in self._load().rerank(query, texts, batch_size=len(texts))]
+
+
+class Reranker:
+    """
+    二阶段重排
+
+    只对一阶段的前 candidates 条结果分批打分；每批开始前检查本次请求的时间预算，
+    预计超出时放弃重排，直接返回一阶段顺序，保证重排只会增加有限的延迟。
+    """
+
+    def __init__(self, scorer: Any, candidates: int = 50, batch_size: int = 16, budget_ms: float = 50.0):
+        self.scorer = scorer
+        self.candidates = max(1, candidates)
+        self.batch_size = max(1, batch_size)
+        self.budget = budget_ms / 1000.0
+        self.reranked = 0
+        self.fallbacks = 0
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        head = results[:self.candidates]
+        if len(head) < 2:
+            return results[:top_k]
+        start = time.perf_counter()
+        scores: List[float] = []
+        last_batch = 0.0
+        for i in range(0, len(head), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if self.budget > 0 and elapsed + last_batch > self.budget:
+                self.fallbacks += 1
+                observe_stage("rerank", time.perf_counter() - start)
+                return results[:top_k]
+            batch_start = time.perf_counter()
+            scores.extend(self.scorer.score(query, head[i:i + self.batch_size]))
+            last_batch = time.perf_counter() - batch_start
+        order = sorted(range(len(head)), key=lambda j: scores[j], reverse=True)
+        self.reranked += 1
+        observe_stage("rerank", time.perf_counter() - start)
+        return [{**head[j], "first_stage_score": head[j]["score"], "score": scores[j]} for j in order][:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "candidates": self.candidates,
+            "batch_size": self.batch_size,
+            "budget_ms": self.budget * 1000,
+            "reranked": self.reranked,
+            "fallbacks": self.fallbacks,
+        }
+
+
+class RerankingRetriever:
+    """给任意检索器加上二阶段重排；其余属性（listings、search_contained 等）转发给内部检索器"""
+
+    def __init__(self, retriever: Any, reranker: Reranker):
+        self.retriever = retriever
+        self.reranker = reranker
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.retriever, name)
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        if top_k <= 0:
+            return []
+        results = self.retriever.search(query, max(top_k, self.reranker.candidates))
+        return self.reranker.rerank(query, results, top_k)
+
+
+def create_scorer(model_name: str = "", weights_file: str = "") -> Any:
+    """model_name 非空时使用交叉编码器，否则使用线性打分器（可选加载拟合好的权重）"""
+    if model_name:
+        return CrossEncoderScorer(model_name)
+    if weights_file and Path(weights_file).exists():
+        return LinearScorer.from_file(weights_file)
+    return LinearScorer()
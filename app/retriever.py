@@ -1,21 +1,35 @@
 from __future__ import annotations
 
-import json
 import os
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
-import numpy as np
-from fastembed import TextEmbedding
+from app.fuzzy import FuzzyIndex
+from app.listing_store import Listing, load_listings
+from app.metrics import observe_stage, stage
+from app.synonyms import SynonymExpander
+
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class VectorStore:
+    # numpy与fastembed（含ONNX Runtime）在构造时才导入，只做关键词检索的进程不承担这部分开销
     def __init__(
         self,
         embeddings_file: str,
         metadata_file: str,
         model_name_file: str,
+        mode: str = "float",
+        rerank: int = 0,
     ) -> None:
+        """
+        Args:
+            mode: float（float32全量矩阵）、int8（标量量化）或 pq（乘积量化），压缩文件由构建脚本 --quantize 生成
+            rerank: 压缩模式下取前rerank个候选用原始float向量精确重排（0表示不重排）
+        """
         self.embeddings_path = Path(embeddings_file)
         self.metadata_path = Path(metadata_file)
         self.model_name_path = Path(model_name_file)
@@ -23,12 +37,28 @@ class VectorStore:
         if not (self.embeddings_path.exists() and self.metadata_path.exists() and self.model_name_path.exists()):
             raise FileNotFoundError("Index artifacts not found. Please run: python scripts/build_index.py")
 
-        self.embeddings: np.ndarray = np.load(self.embeddings_path)
-        self.metadata: List[Dict[str, Any]] = []
-        with self.metadata_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                self.metadata.append(json.loads(line))
+        import numpy as np
+
+        self.mode = mode
+        self.rerank = rerank
+        self.compressed = None
+        if mode == "float":
+            self.embeddings: np.ndarray = np.load(self.embeddings_path)
+        else:
+            # 压缩模式下float矩阵只做内存映射，供重排时读取候选行
+            from app.quantization import CompressedIndex
+            self.compressed = CompressedIndex.load(self.embeddings_path.parent, mode, self.embeddings_path)
+            self.embeddings = self.compressed.vectors
+        self._load_metadata()
+        self._load_embedder()
+        self.embeddings_norm = self._normalize(self.embeddings) if self.compressed is None else None
+
+    def _load_metadata(self) -> None:
+        # 挂牌id -> 行号，首次做结果多样化时构建
+        self._rows: Optional[Dict[str, int]] = None
+        self.metadata: List[Listing] = load_listings(str(self.metadata_path))
 
+    def _load_embedder(self) -> None:
         with self.model_name_path.open("r", encoding="utf-8") as f:
             self.model_name = f.read().strip()
 
@@ -36,15 +66,24 @@ class VectorStore:
         if self.model_name == "mock-embedding-model":
             self.embedder = None
         else:
+            from fastembed import TextEmbedding
             self.embedder = TextEmbedding(self.model_name)
-        self.embeddings_norm = self._normalize(self.embeddings)
+
+    @classmethod
+    def from_directory(cls, directory, mode: str = "float", rerank: int = 0) -> "VectorStore":
+        """从索引目录（平铺布局或 artifacts/versions/<版本>）加载"""
+        from app.artifacts import index_files
+        embeddings, metadata, model_name = index_files(directory)
+        return cls(str(embeddings), str(metadata), str(model_name), mode=mode, rerank=rerank)
 
     @staticmethod
     def _normalize(vectors: np.ndarray) -> np.ndarray:
+        import numpy as np
         norm = np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
         return vectors / norm
 
     def _embed_query(self, text: str) -> np.ndarray:
+        import numpy as np
         if self.embedder is None:
             # Mock embedding for demonstration
             import hashlib
@@ -69,61 +108,165 @@ class VectorStore:
             vec = vec / (np.linalg.norm(vec) + 1e-12)
             return vec
 
-    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        if top_k <= 0:
-            return []
-        vec = self._embed_query(query)
-        scores = self.embeddings_norm @ vec
-        top_k = min(top_k, len(scores))
-        indices = np.argpartition(scores, -top_k)[-top_k:]
-        indices = indices[np.argsort(scores[indices])[::-1]]
+    def _embed_queries(self, texts: List[str]) -> np.ndarray:
+        """批量嵌入，返回 (len(texts), 维度) 的归一化矩阵"""
+        import numpy as np
+        if self.embedder is None:
+            return np.stack([self._embed_query(text) for text in texts])
+        vecs = np.asarray(list(self.embedder.embed(texts)), dtype=np.float32)
+        return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
 
+    def search_vector(self, vec: np.ndarray, top_k: int = 10) -> List[Tuple[int, float]]:
+        """按归一化的查询向量检索，返回 [(行号, 分数)]"""
+        import numpy as np
+        if self.compressed is not None:
+            with stage("scoring"):
+                scores = self.compressed.scores(vec)
+            with stage("topk"):
+                indices, selected = self.compressed.select(scores, vec, top_k, self.rerank)
+        else:
+            with stage("scoring"):
+                scores = self.embeddings_norm @ vec
+            with stage("topk"):
+                top_k = min(top_k, len(scores))
+                indices = np.argpartition(scores, -top_k)[-top_k:]
+                indices = indices[np.argsort(scores[indices])[::-1]]
+                selected = scores[indices]
+        return [(int(i), float(score)) for i, score in zip(indices, selected)]
+
+    def vectors_for(self, listings: Sequence[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        按挂牌id取归一化向量行（结果多样化用）；有挂牌不在索引中时返回None
+
+        float模式直接取 embeddings_norm 的行；压缩/分片模式从内存映射的float矩阵读取候选行后归一化。
+        """
+        import numpy as np
+        if self._rows is None:
+            self._rows = {str(m.get("id")): i for i, m in enumerate(self.metadata)}
+        rows = [self._rows.get(str(listing.get("id"))) for listing in listings]
+        if any(i is None for i in rows):
+            return None
+        if self.embeddings_norm is not None:
+            return self.embeddings_norm[rows]
+        if self.embeddings is None:
+            self.embeddings = np.load(self.embeddings_path, mmap_mode="r")
+        return self._normalize(np.asarray(self.embeddings[rows], dtype=np.float32))
+
+    def _results(self, hits: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
         results: List[Dict[str, Any]] = []
-        for i in indices:
-            item = self.metadata[int(i)].copy()
+        # 挂牌记录只读，结果直接引用，不再逐条复制
+        for i, score in hits:
             results.append({
-                "score": float(scores[int(i)]),
-                "listing": item,
+                "score": score,
+                "listing": self.metadata[i],
             })
         return results
 
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        if top_k <= 0:
+            return []
+        with stage("embed"):
+            vec = self._embed_query(query)
+        return self._results(self.search_vector(vec, top_k))
+
+    def search_batch(self, queries: Sequence[str], top_ks: Sequence[int]) -> List[List[Dict[str, Any]]]:
+        """
+        批量检索：整批查询一次嵌入；float模式下整批只做一次矩阵乘法（GEMM）
+
+        Args:
+            queries: 查询文本
+            top_ks: 与queries一一对应的返回条数
+        """
+        if not queries:
+            return []
+        with stage("embed"):
+            vecs = self._embed_queries(list(queries))
+        if self.embeddings_norm is None:
+            # 压缩/分片模式逐条打分，嵌入仍是批量的
+            return [self._results(self.search_vector(vec, k)) if k > 0 else [] for vec, k in zip(vecs, top_ks)]
+
+        from app.quantization import top_indices
+        with stage("scoring"):
+            # (batch, n)，每个查询的分数在一行内连续存放
+            scores = vecs @ self.embeddings_norm.T
+        with stage("topk"):
+            out: List[List[Dict[str, Any]]] = []
+            for row, k in zip(scores, top_ks):
+                idx = top_indices(row, k)
+                out.append(self._results([(int(i), float(row[i])) for i in idx]))
+        return out
+
 
 class Retriever:
-    def __init__(self):
-        self.data_file = "data/sample_listings.jsonl"
+    def __init__(self, data_file: str = "data/sample_listings.jsonl", fuzzy: bool = True,
+                 synonyms_file: Optional[str] = "data/synonyms.json"):
+        """
+        Args:
+            fuzzy: 关键词无结果时是否用错别字/拼音容错检索兜底（见 app/fuzzy.py）
+            synonyms_file: 同义词表（见 app/synonyms.py），为None或文件不存在时不做展开
+        """
+        self.data_file = data_file
+        self.fuzzy = fuzzy
+        self.synonyms = SynonymExpander.from_file(synonyms_file) if synonyms_file else None
         self.load_data()
     
     def load_data(self):
-        """加载示例数据"""
-        self.listings = []
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        self.listings.append(json.loads(line))
+        """加载示例数据（紧凑的只读挂牌记录，见 app/listing_store.py）"""
+        self.listings: List[Listing] = load_listings(self.data_file) if os.path.exists(self.data_file) else []
+        self.fuzzy_index = FuzzyIndex(self.listings) if self.fuzzy else None
     
     def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        """简单的关键词搜索"""
+        """
+        简单的关键词搜索（同义词展开后的各个写法在同一次遍历中匹配，取最高分）
+
+        多词写法逐词匹配：各词都出现在字段中即算命中，"铜 期货" 可以命中标题中的 "铜期货"。
+        """
         results = []
-        query_lower = query.lower()
+        terms = self.synonyms.expand(query) if self.synonyms is not None else [query.lower()]
+        # 单词写法保持整串判断，多词写法拆成词元组
+        single = [term for term in terms if " " not in term]
+        multi = [tuple(term.split()) for term in terms if " " in term]
+        multi_words = list(dict.fromkeys(w for words in multi for w in words))
         
+        start = time.perf_counter()
         for listing in self.listings:
             score = 0
-            title = listing.get('title', '').lower()
-            description = listing.get('description', '').lower()
-            category = listing.get('category', '').lower()
-            tags = [tag.lower() for tag in listing.get('tags', [])]
+            title = (listing.title or '').lower()
+            description = (listing.description or '').lower()
+            category = (listing.category or '').lower()
+            tags = [tag.lower() for tag in listing.tags or ()]
             
             # 计算相关性分数
-            if query_lower in title:
-                score += 10
-            if query_lower in description:
-                score += 5
-            if query_lower in category:
-                score += 3
-            for tag in tags:
-                if query_lower in tag:
-                    score += 2
+            for term in single:
+                term_score = 0
+                if term in title:
+                    term_score += 10
+                if term in description:
+                    term_score += 5
+                if term in category:
+                    term_score += 3
+                for tag in tags:
+                    if term in tag:
+                        term_score += 2
+                score = max(score, term_score)
+            if multi:
+                # 先在整条挂牌中筛出出现过的词，缺词的写法不再逐字段判断
+                text = "\n".join((title, description, category, *tags))
+                present = {w for w in multi_words if w in text}
+            for words in multi:
+                if not present.issuperset(words):
+                    continue
+                term_score = 0
+                if all(w in title for w in words):
+                    term_score += 10
+                if all(w in description for w in words):
+                    term_score += 5
+                if all(w in category for w in words):
+                    term_score += 3
+                for tag in tags:
+                    if all(w in tag for w in words):
+                        term_score += 2
+                score = max(score, term_score)
             
             if score > 0:
                 results.append({
@@ -131,7 +274,42 @@ class Retriever:
                     "listing": listing
                 })
         
+        observe_stage("scoring", time.perf_counter() - start)
+        
+        # 没有精确命中时（错别字、拼音输入）查预先构建的容错词典，不再扫描全部挂牌
+        if not results and self.fuzzy_index is not None:
+            with stage("fuzzy"):
+                return self.fuzzy_index.search(query, top_k)
+        
         # 按分数排序并返回前top_k个结果
+        with stage("topk"):
+            results.sort(key=lambda x: x["score"], reverse=True)
+            return results[:top_k]
+
+    def search_contained(self, text: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """反向匹配：挂牌的标签、类别、标题词出现在文本中（适用于整句提问）"""
+        results = []
+        text_lower = text.lower()
+        
+        for listing in self.listings:
+            score = 0
+            for word in (listing.title or '').lower().split():
+                if (len(word) >= 2 or not word.isascii()) and word in text_lower:
+                    score += 3
+            category = (listing.category or '').lower()
+            if category and category in text_lower:
+                score += 2
+            for tag in listing.tags or ():
+                tag = tag.lower()
+                if (len(tag) >= 2 or not tag.isascii()) and tag in text_lower:
+                    score += 2
+            
+            if score > 0:
+                results.append({
+                    "score": score,
+                    "listing": listing
+                })
+        
         results.sort(key=lambda x: x["score"], reverse=True)
         return results[:top_k]
 
@@ -21,6 +21,10 @@ class SearchRequest(BaseModel):
     query: str
     top_k: int = 10
     use_llm: bool = True
+    # 结果多样化，未指定时使用服务端配置
+    diversity: Optional[float] = None
+    max_per_seller: Optional[int] = None
+    max_per_category: Optional[int] = None
 
 class SearchResult(BaseModel):
     score: float
@@ -46,11 +50,17 @@ class ChatRequest(BaseModel):
     message: str
     system_prompt: Optional[str] = None
     conversation_history: Optional[List[Dict[str, str]]] = None
+    use_context: bool = False
+    context_top_k: Optional[int] = None
+    conversation_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     timestamp: str
     success: bool
+    sources: Optional[List[str]] = None
+    conversation_id: Optional[str] = None
+    fallback: bool = False
 
 class MarketAnalysisRequest(BaseModel):
     market_data: Optional[Dict[str, Any]] = None
@@ -69,5 +79,6 @@ class InvestmentAdviceResponse(BaseModel):
     timestamp: str
     success: bool
 
-
-
+class IndexReloadRequest(BaseModel):
+    version: Optional[str] = None
+    wait: bool = False
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from app.metrics import stage
+from app.retriever import VectorStore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每个分片进程内的BLAS线程数：多个分片并行时各自单线程，避免线程数超过核数
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+class _Shard:
+    """分片进程内的索引：embeddings.npy 的 [start, end) 行"""
+
+    def __init__(self, directory: Path, embeddings_file: Path, start: int, end: int, mode: str):
+        import numpy as np
+        from app import quantization
+
+        self.start = start
+        vectors = np.load(embeddings_file, mmap_mode="r")[start:end]
+        self.matrix = None
+        self.inv_norms = None
+        self.compressed = None
+        if mode == "float":
+            # 直接在内存映射的行上打分，向量页由操作系统页缓存在各进程间共享，不复制成私有内存；
+            # 只预先算好每行范数的倒数（每行4字节），分数 = (行 @ 查询) / 范数
+            self.matrix = vectors
+            self.inv_norms = np.empty(len(vectors), dtype=np.float32)
+            for i in range(0, len(vectors), quantization.CHUNK_ROWS):
+                j = i + quantization.CHUNK_ROWS
+                rows = np.asarray(vectors[i:j], dtype=np.float32)
+                self.inv_norms[i:j] = 1.0 / (np.linalg.norm(rows, axis=1) + 1e-12)
+        else:
+            full = quantization.CompressedIndex.load(directory, mode, mmap_mode="r")
+            codes = np.array(full.codes[start:end])
+            self.compressed = quantization.CompressedIndex(mode, full.quantizer, codes, vectors)
+
+    def search(self, vec: np.ndarray, top_k: int, rerank: int) -> Tuple[np.ndarray, np.ndarray]:
+        from app.quantization import top_indices
+
+        if self.compressed is not None:
+            idx, scores = self.compressed.search(vec, top_k, rerank)
+        else:
+            scores = (self.matrix @ vec) * self.inv_norms
+            idx = top_indices(scores, top_k)
+            scores = scores[idx]
+        return idx + self.start, scores
+
+
+def _serve_shard(conn, directory: str, embeddings_file: str, start: int, end: int, mode: str, threads: int) -> None:
+    # 必须在导入numpy之前设置
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        shard = _Shard(Path(directory), Path(embeddings_file), start, end, mode)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", end - start))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if msg is None:
+            break
+        request_id, vec, top_k, rerank = msg
+        try:
+            idx, scores = shard.search(vec, top_k, rerank)
+            conn.send(("ok", request_id, idx, scores))
+        except Exception as e:
+            conn.send(("error", request_id, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def merge_topk(parts: List[Tuple[Any, Any]], top_k: int) -> List[Tuple[int, float]]:
+    """合并各分片的降序结果，取全局top_k（堆归并，只读取需要的前top_k项）"""
+    streams = [zip(scores.tolist(), idx.tolist()) for idx, scores in parts]
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+    return [(int(i), float(score)) for score, i in islice(merged, top_k)]
+
+
+class _Pending:
+    """一次查询在各分片上的回复，全部到齐（或分片退出）后唤醒等待的线程"""
+
+    __slots__ = ("waiting", "parts", "errors", "done")
+
+    def __init__(self, shards: int):
+        self.waiting = set(range(shards))
+        self.parts: List[Tuple[Any, Any]] = []
+        self.errors: List[str] = []
+        self.done = threading.Event()
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    分片向量检索（scatter-gather）
+
+    embeddings.npy 按行切成N个分片，每个分片由一个工作进程加载（以内存映射方式打开同一文件，
+    只访问自己的行）；查询向量在主进程计算一次后发给所有分片并行打分，各分片返回本地top-k，
+    主进程用堆归并得到全局top-k。单次矩阵乘法受单核内存带宽限制，分片后延迟随核数下降。
+
+    每个查询带请求号，各分片的回复由该分片的接收线程按请求号分发，并发查询可以同时在分片间流转，
+    不再整体串行。不再使用时需要 close()（索引热更新时由 IndexManager 的 retire 回调关闭旧索引）。
+    """
+
+    def __init__(
+        self,
+        embeddings_file: str,
+        metadata_file: str,
+        model_name_file: str,
+        shards: Optional[int] = None,
+        mode: str = "float",
+        rerank: int = 0,
+        threads_per_shard: int = 1,
+        start_method: str = "spawn",
+    ) -> None:
+        """
+        Args:
+            shards: 分片（工作进程）数，默认CPU核数
+            mode / rerank: 同 VectorStore，压缩模式下各分片加载自己那部分压缩码
+            start_method: 进程启动方式；服务进程中有其他线程时使用spawn更安全
+        """
+        self.embeddings_path = Path(embeddings_file)
+        self.metadata_path = Path(metadata_file)
+        self.model_name_path = Path(model_name_file)
+
+        if not (self.embeddings_path.exists() and self.metadata_path.exists() and self.model_name_path.exists()):
+            raise FileNotFoundError("Index artifacts not found. Please run: python scripts/build_index.py")
+
+        import numpy as np
+
+        self.mode = mode
+        self.rerank = rerank
+        self.compressed = None
+        self.embeddings = None
+        self.embeddings_norm = None
+        self._load_metadata()
+        self._load_embedder()
+
+        total = len(np.load(self.embeddings_path, mmap_mode="r"))
+        count = max(1, min(shards or os.cpu_count() or 1, total or 1))
+        bounds = [round(total * i / count) for i in range(count + 1)]
+        ctx = multiprocessing.get_context(start_method)
+        self._conns = []
+        self._procs = []
+        self._readers: List[threading.Thread] = []
+        # 同一管道的发送需要互斥，接收只由该分片的接收线程进行
+        self._send_locks: List[threading.Lock] = []
+        self._pending: Dict[int, _Pending] = {}
+        self._pending_lock = threading.Condition()
+        self._ids = itertools.count()
+        self._closed = False
+        try:
+            for i in range(count):
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(
+                    target=_serve_shard, name=f"vector-shard-{i}", daemon=True,
+                    args=(child, str(self.embeddings_path.parent), str(self.embeddings_path),
+                          bounds[i], bounds[i + 1], mode, threads_per_shard),
+                )
+                proc.start()
+                child.close()
+                self._conns.append(parent)
+                self._procs.append(proc)
+            for conn in self._conns:
+                status, payload = conn.recv()
+                if status != "ready":
+                    raise RuntimeError(f"vector shard failed to load: {payload}")
+        except BaseException:
+            self.close()
+            raise
+        self.shard_sizes = [bounds[i + 1] - bounds[i] for i in range(count)]
+        for i, conn in enumerate(self._conns):
+            self._send_locks.append(threading.Lock())
+            reader = threading.Thread(target=self._read_replies, args=(i, conn),
+                                      name=f"vector-shard-reader-{i}", daemon=True)
+            reader.start()
+            self._readers.append(reader)
+
+    @classmethod
+    def from_directory(cls, directory, shards: Optional[int] = None, mode: str = "float",
+                       rerank: int = 0) -> "ShardedVectorStore":
+        from app.artifacts import index_files
+        embeddings, metadata, model_name = index_files(directory)
+        return cls(str(embeddings), str(metadata), str(model_name), shards=shards, mode=mode, rerank=rerank)
+
+    @property
+    def shards(self) -> int:
+        return len(self._conns)
+
+    def _read_replies(self, shard: int, conn) -> None:
+        """接收线程：按请求号把分片的回复交给对应的查询；分片进程退出时让等待它的查询失败"""
+        while True:
+            try:
+                reply = conn.recv()
+            except (EOFError, OSError):
+                if not self._closed:
+                    logger.error("向量分片进程已退出", extra={"shard": shard})
+                break
+            with self._pending_lock:
+                pending = self._pending.get(reply[1])
+                if pending is None or shard not in pending.waiting:
+                    continue
+                if reply[0] == "ok":
+                    pending.parts.append((reply[2], reply[3]))
+                else:
+                    pending.errors.append(reply[2])
+                pending.waiting.discard(shard)
+                if not pending.waiting:
+                    pending.done.set()
+        with self._pending_lock:
+            for pending in self._pending.values():
+                if shard in pending.waiting:
+                    pending.errors.append("shard process exited")
+                    pending.waiting.discard(shard)
+                    if not pending.waiting:
+                        pending.done.set()
+
+    def _scatter(self, vec: np.ndarray, top_k: int) -> Tuple[int, _Pending]:
+        pending = _Pending(len(self._conns))
+        with self._pending_lock:
+            if self._closed:
+                raise RuntimeError("sharded vector store is closed")
+            request_id = next(self._ids)
+            self._pending[request_id] = pending
+        for shard, conn in enumerate(self._conns):
+            try:
+                with self._send_locks[shard]:
+                    conn.send((request_id, vec, top_k, self.rerank))
+            except (OSError, ValueError):
+                with self._pending_lock:
+                    if shard in pending.waiting:
+                        pending.errors.append("shard process exited")
+                        pending.waiting.discard(shard)
+                        if not pending.waiting:
+                            pending.done.set()
+        return request_id, pending
+
+    def _gather(self, request_id: int, pending: _Pending, top_k: int) -> List[Tuple[int, float]]:
+        # 调用前 pending.done 已经置位
+        with self._pending_lock:
+            del self._pending[request_id]
+            self._pending_lock.notify_all()
+        if pending.errors:
+            raise RuntimeError(f"vector shard search failed: {pending.errors[0]}")
+        with stage("topk"):
+            return merge_topk(pending.parts, top_k)
+
+    def search_vector(self, vec: np.ndarray, top_k: int = 10) -> List[Tuple[int, float]]:
+        """按查询向量检索，返回 [(行号, 分数)]"""
+        if top_k <= 0:
+            return []
+        with stage("scoring"):
+            request_id, pending = self._scatter(vec, top_k)
+            pending.done.wait()
+        return self._gather(request_id, pending, top_k)
+
+    def search_batch(self, queries: Sequence[str], top_ks: Sequence[int]) -> List[List[Dict[str, Any]]]:
+        """批量检索：整批一次嵌入，各查询同时发给分片后再依次收集"""
+        if not queries:
+            return []
+        with stage("embed"):
+            vecs = self._embed_queries(list(queries))
+        with stage("scoring"):
+            sent = [self._scatter(vec, k) if k > 0 else None for vec, k in zip(vecs, top_ks)]
+            for item in sent:
+                if item is not None:
+                    item[1].done.wait()
+        out: List[List[Dict[str, Any]]] = []
+        errors: List[Exception] = []
+        for item, k in zip(sent, top_ks):
+            if item is None:
+                out.append([])
+                continue
+            try:
+                out.append(self._results(self._gather(item[0], item[1], k)))
+            except RuntimeError as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return out
+
+    def close(self, timeout: float = 30.0) -> None:
+        """
+        通知分片进程退出并回收
+
+        Args:
+            timeout: 等待进行中的查询完成的最长秒数，超时后仍然关闭
+        """
+        with self._pending_lock:
+            self._closed = True
+            self._pending_lock.wait_for(lambda: not self._pending, timeout)
+        for shard, conn in enumerate(self._conns):
+            try:
+                if shard < len(self._send_locks):
+                    with self._send_locks[shard]:
+                        conn.send(None)
+                else:
+                    conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=5)
+        for reader in self._readers:
+            reader.join(timeout=5)
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._procs = []
+        self._readers = []
+        self._send_locks = []
+
+    def __enter__(self) -> "ShardedVectorStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def make_key(*parts: Any) -> str:
+    """把任意可JSON序列化的参数压缩为定长key"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """
+    请求合并（single-flight）
+
+    相同key的请求在计算完成前只执行一次，后到的请求等待同一个结果；
+    计算在独立的任务中运行，首个请求断开不会影响其他等待者。
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """
+        执行或加入一次计算
+
+        Args:
+            key: 请求标识，相同key视为相同请求
+            fn: 返回awaitable的函数
+            args: fn的参数
+
+        Returns:
+            计算结果（所有等待者共享同一个对象）
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        self._inflight.pop(key, None)
+        # 所有等待者都已断开时，避免出现"exception was never retrieved"告警
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+        }
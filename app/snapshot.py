@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional
+
+
+class Snapshot:
+    """一次计算得到的响应快照：原始数据 + 序列化后的字节 + 校验信息"""
+
+    __slots__ = ("data", "body", "etag", "last_modified", "built_at")
+
+    def __init__(self, data: Dict[str, Any], body: bytes, etag: str, last_modified: float, built_at: float):
+        self.data = data
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.built_at = built_at
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def not_modified(self, request_headers: Mapping[str, str]) -> bool:
+        """根据If-None-Match / If-Modified-Since判断是否可以返回304"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # 弱比较：忽略W/前缀
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return self.etag in [t[2:] if t.startswith("W/") else t for t in tags]
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= int(since)
+        return False
+
+
+class SnapshotCache:
+    """
+    共享快照缓存
+
+    每个刷新周期只调用一次builder并序列化一次，所有请求共享同一份字节；
+    内容未变化时ETag与Last-Modified保持不变，客户端可以持续拿到304。
+    """
+
+    def __init__(self, builder: Callable[[], Dict[str, Any]], ttl: float = 30.0):
+        self.builder = builder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, now: float) -> bool:
+        return self._snapshot is not None and now - self._snapshot.built_at < self.ttl
+
+    def get(self) -> Snapshot:
+        now = time.time()
+        if self._fresh(now):
+            self.hits += 1
+            return self._snapshot
+        with self._lock:
+            # 双重检查，并发请求只有一个会重新计算
+            now = time.time()
+            if self._fresh(now):
+                self.hits += 1
+                return self._snapshot
+            self.misses += 1
+            data = self.builder()
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            previous = self._snapshot
+            if previous is not None and previous.etag == etag:
+                last_modified = previous.last_modified
+            else:
+                last_modified = now
+            self._snapshot = Snapshot(data, body, etag, last_modified, now)
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """下次访问时强制重新计算"""
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot.built_at = 0.0
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.fuzzy import pinyin_keys
+from app.synonyms import normalize
+
+# 前缀长度不超过该值时直接查预先计算的结果（短前缀匹配范围最大）
+PRECOMPUTED_PREFIX_CHARS = 2
+# 每个预计算前缀保留的候选数，也是单次返回条数的上限
+MAX_SUGGESTIONS = 20
+# 挂牌中出现的字段（每条挂牌对每个词计1次）
+LISTING_FIELDS = ("title", "category", "seller")
+
+
+def _key(text: str) -> str:
+    """键与前缀统一归一化并去掉空格（steel r、luo wen 与 Steel Rebar、luowen 对齐）"""
+    return normalize(text).replace(" ", "")
+
+
+def listings_of(retriever: Any) -> List[Dict[str, Any]]:
+    """从检索器取挂牌列表（关键词检索器、向量索引或其批处理包装）"""
+    retriever = getattr(retriever, "store", retriever)
+    listings = getattr(retriever, "listings", None)
+    if listings is None:
+        listings = getattr(retriever, "metadata", [])
+    return listings
+
+
+class PrefixSuggester:
+    """
+    前缀输入提示
+
+    所有键排序后存为数组，前缀查询用二分查找定位区间，再按权重取前几条；
+    1~2个字符的短前缀区间最大，构建时预先算好结果。
+    中文词条同时以全拼和首字母作为键，输入 luo / lwg 也能提示 螺纹钢。
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        """
+        Args:
+            weights: 提示文本 -> 热度权重
+        """
+        self._texts: List[str] = list(weights)
+        self._weights: List[float] = [weights[t] for t in self._texts]
+        pairs: List[Tuple[str, int]] = []
+        for i, text in enumerate(self._texts):
+            key = _key(text)
+            for k in dict.fromkeys([key] + pinyin_keys(key)):
+                pairs.append((k, i))
+        pairs.sort()
+        self._keys = [k for k, _ in pairs]
+        self._targets = [i for _, i in pairs]
+
+        # 短前缀 -> 权重最高的提示下标
+        groups: Dict[str, set] = {}
+        for key, i in pairs:
+            for n in range(1, min(PRECOMPUTED_PREFIX_CHARS, len(key)) + 1):
+                groups.setdefault(key[:n], set()).add(i)
+        self._top: Dict[str, List[int]] = {
+            prefix: self._rank(ids, MAX_SUGGESTIONS) for prefix, ids in groups.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _rank(self, ids: Iterable[int], limit: int) -> List[int]:
+        return heapq.nlargest(limit, ids, key=lambda i: (self._weights[i], -len(self._texts[i])))
+
+    @classmethod
+    def build(cls, listings: Sequence[Dict[str, Any]], history: Iterable[Tuple[str, int]] = (),
+              history_weight: float = 3.0) -> "PrefixSuggester":
+        """
+        由挂牌与搜索历史构建
+
+        Args:
+            listings: 挂牌（标题、标签、类别、卖方）
+            history: (查询, 次数)，通常来自 SearchHistory 中有结果的查询
+            history_weight: 每次历史搜索相对于一条挂牌出现的权重
+        """
+        weights: Dict[str, float] = {}
+        for listing in listings:
+            values = [listing.get(field) for field in LISTING_FIELDS] + list(listing.get("tags") or [])
+            for value in dict.fromkeys(str(v).strip() for v in values if v):
+                if value:
+                    weights[value] = weights.get(value, 0.0) + 1.0
+        for query, count in history:
+            query = query.strip()
+            if query:
+                weights[query] = weights.get(query, 0.0) + history_weight * count
+        return cls(weights)
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """返回以prefix开头（或拼音以prefix开头）的提示，按热度降序"""
+        prefix = _key(prefix)
+        limit = max(0, min(limit, MAX_SUGGESTIONS))
+        if not prefix or limit == 0:
+            return []
+        ids: Optional[List[int]] = self._top.get(prefix) if len(prefix) <= PRECOMPUTED_PREFIX_CHARS else None
+        if ids is None:
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+            ids = self._rank(set(self._targets[lo:hi]), limit)
+        return [{"text": self._texts[i], "weight": self._weights[i]} for i in ids[:limit]]
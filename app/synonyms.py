@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import itertools
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_SPACE_RE = re.compile(r"\s+")
+
+# 单个查询展开后的最多变体数（含原查询）
+MAX_VARIANTS = 16
+
+
+def normalize(text: str) -> str:
+    """全角转半角（NFKC）、转小写、合并连续空白"""
+    return _SPACE_RE.sub(" ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class AhoCorasick:
+    """
+    多模式串匹配自动机
+
+    所有别名编译成一个自动机，扫描一遍查询即可找出全部命中，耗时与别名数量无关。
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 每个状态结束的模式下标（含沿失败链可达的）
+        self._out: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+        # 按层构建失败指针
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """所有命中 (起点, 终点, 模式下标)"""
+        matches: List[Tuple[int, int, int]] = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for index in self._out[state]:
+                matches.append((i + 1 - len(self.patterns[index]), i + 1, index))
+        return matches
+
+
+class SynonymExpander:
+    """
+    查询归一化与同义词展开
+
+    同义词组（商品名、中英文、简称）在加载时编译为Aho-Corasick自动机；
+    每个查询归一化后扫描一遍，按最左最长原则取不重叠的命中，
+    把命中的别名替换为同组的其他写法（多处命中时也替换其组合），得到一组等价查询交给检索器一次遍历完成匹配。
+    """
+
+    def __init__(self, groups: Iterable[Sequence[str]]):
+        self.groups: List[List[str]] = []
+        aliases: Dict[str, int] = {}
+        for group in groups:
+            members = list(dict.fromkeys(normalize(t) for t in group if normalize(t)))
+            if len(members) < 2:
+                continue
+            gid = len(self.groups)
+            self.groups.append(members)
+            for alias in members:
+                aliases.setdefault(alias, gid)
+        self._aliases = list(aliases)
+        self._group_of = [aliases[a] for a in self._aliases]
+        self._automaton = AhoCorasick(self._aliases)
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["SynonymExpander"]:
+        """读取同义词JSON（{"groups": [[...], ...]}）；文件不存在时返回None"""
+        file = Path(path)
+        if not file.exists():
+            return None
+        with file.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("groups", []) if isinstance(data, dict) else data)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def matches(self, text: str) -> List[Tuple[int, int, int]]:
+        """不重叠的命中 (起点, 终点, 同义词组)，英文别名要求两侧不是字母数字"""
+        found = []
+        for start, end, index in self._automaton.find_all(text):
+            if _is_word_char(self._aliases[index][0]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(self._aliases[index][-1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            found.append((start, end, index))
+        # 最左最长
+        found.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        chosen: List[Tuple[int, int, int]] = []
+        last_end = 0
+        for start, end, index in found:
+            if start >= last_end:
+                chosen.append((start, end, self._group_of[index]))
+                last_end = end
+        return chosen
+
+    def expand(self, query: str) -> List[str]:
+        """
+        归一化后的查询及其同义变体（第一个为原查询）
+
+        多个命中时同时替换其中几处，按替换处数从少到多生成组合（"copper futures" 可得到 "铜 期货"），
+        总数不超过 MAX_VARIANTS。
+        """
+        text = normalize(query)
+        variants = [text]
+        chosen = self.matches(text)
+        # 每处命中可替换成的其他写法
+        options = [
+            [member for member in self.groups[gid] if member != text[start:end]]
+            for start, end, gid in chosen
+        ]
+        for count in range(1, len(chosen) + 1):
+            for positions in itertools.combinations(range(len(chosen)), count):
+                for members in itertools.product(*(options[p] for p in positions)):
+                    replaced = dict(zip(positions, members))
+                    parts = []
+                    last = 0
+                    for i, (start, end, _) in enumerate(chosen):
+                        if i in replaced:
+                            parts.append(text[last:start])
+                            parts.append(replaced[i])
+                            last = end
+                    parts.append(text[last:])
+                    variant = "".join(parts)
+                    if variant not in variants:
+                        variants.append(variant)
+                    if len(variants) >= MAX_VARIANTS:
+                        return variants
+        return variants
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+
+def _is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF
+        or 0x3400 <= code <= 0x4DBF
+        or 0x3000 <= code <= 0x303F
+        or 0xFF00 <= code <= 0xFFEF
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算token数：中文字符（含全角标点）按1个token计，其余字符约4个计1个token
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def estimate_messages_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """估算消息列表的token数（每条消息额外计4个token的格式开销）"""
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def truncate_to_tokens(text: str, budget: int, suffix: str = "…") -> str:
+    """按token预算截断文本"""
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    used = 0
+    pending_other = 0
+    for i, ch in enumerate(text):
+        if _is_cjk(ch):
+            used += 1
+        else:
+            pending_other += 1
+            if pending_other == 4:
+                used += 1
+                pending_other = 0
+        if used >= budget:
+            return text[:i] + suffix
+    return text
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+import os
+import random
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 日度聚合列
+COLUMNS = ("total", "premium", "discount", "count")
+
+
+def _to_ordinal(value: Any) -> int:
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date().toordinal()
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+class _TailReader:
+    """
+    增量读取追加写入的JSONL/CSV文件，只解析上次读取位置之后的完整行
+
+    记录已读部分的文件标识（设备号+inode）、修改时间与指纹（文件开头和读取位置之前的若干字节），
+    文件被替换或原地重写（即使大小不变或更大）时由 rewritten() 发现并从头导入。
+    """
+
+    # 指纹取文件开头与读取位置之前各多少字节
+    FINGERPRINT_BYTES = 512
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.reset()
+        self.is_csv = path.suffix.lower() == ".csv"
+
+    def reset(self) -> None:
+        self.offset = 0
+        self.header: Optional[List[str]] = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.mtime_ns = 0
+        self.fingerprint = b""
+
+    def _fingerprint(self, f) -> bytes:
+        n = self.FINGERPRINT_BYTES
+        f.seek(0)
+        head = f.read(min(n, self.offset))
+        f.seek(max(0, self.offset - n))
+        return head + f.read(min(n, self.offset))
+
+    def rewritten(self) -> bool:
+        """文件被截断、替换或原地重写后需要重新导入"""
+        if self.offset == 0 or not self.path.exists():
+            return False
+        st = self.path.stat()
+        if (st.st_dev, st.st_ino) != self.identity or st.st_size < self.offset or st.st_mtime_ns < self.mtime_ns:
+            return True
+        with self.path.open("rb") as f:
+            return self._fingerprint(f) != self.fingerprint
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        size = self.path.stat().st_size
+        if size == self.offset:
+            return []
+
+        with self.path.open("rb") as f:
+            st = os.fstat(f.fileno())
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+            end = chunk.rfind(b"\n")
+            if end < 0:
+                return []
+            self.offset += end + 1
+            self.identity = (st.st_dev, st.st_ino)
+            self.mtime_ns = st.st_mtime_ns
+            self.fingerprint = self._fingerprint(f)
+        text = chunk[: end + 1].decode("utf-8", errors="replace")
+
+        if not self.is_csv:
+            records = []
+            bad = 0
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    bad += 1
+            if bad:
+                logger.warning("跳过无法解析的数据行", extra={"file": str(self.path), "rows": bad})
+            return [r for r in records if isinstance(r, dict)]
+
+        rows = list(csv.reader(io.StringIO(text)))
+        if self.header is None and rows:
+            self.header = [h.strip() for h in rows.pop(0)]
+        return [dict(zip(self.header or [], row)) for row in rows if row]
+
+
+class TrendsStore:
+    """
+    大宗交易日度聚合存储
+
+    原始成交记录只在导入时扫描一次，按日累加到NumPy列中（总成交额、溢价/折价成交额、笔数），
+    接口直接读取最近N天的聚合结果，耗时与天数成正比，与成交笔数无关。
+    成交记录字段：date, code, name, price（成交价）, close（当日收盘价）, volume（万股）, amount（万元）
+    """
+
+    def __init__(
+        self,
+        trades_file: Optional[str] = None,
+        index_file: Optional[str] = None,
+        capacity: int = 256,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._days = np.zeros(capacity, dtype=np.int64)
+        self._cols: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=np.float64) for name in COLUMNS}
+        self._index_close = np.full(capacity, np.nan, dtype=np.float64)
+        self._row_of: Dict[int, int] = {}
+        self._size = 0
+        self._order: Optional[np.ndarray] = None
+        self.version = 0
+
+        self._readers: List[_TailReader] = []
+        self._index_reader: Optional[_TailReader] = None
+        if trades_file:
+            self._readers.append(_TailReader(Path(trades_file)))
+        if index_file:
+            self._index_reader = _TailReader(Path(index_file))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        """清空所有聚合数据"""
+        with self._lock:
+            for name in COLUMNS:
+                self._cols[name][:] = 0.0
+            self._index_close[:] = np.nan
+            self._row_of.clear()
+            self._size = 0
+            self._order = None
+            self.version += 1
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._days)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._days = np.resize(self._days, new_capacity)
+        for name in COLUMNS:
+            col = np.zeros(new_capacity, dtype=np.float64)
+            col[: self._size] = self._cols[name][: self._size]
+            self._cols[name] = col
+        index_close = np.full(new_capacity, np.nan, dtype=np.float64)
+        index_close[: self._size] = self._index_close[: self._size]
+        self._index_close = index_close
+
+    def _rows_for(self, ordinals: np.ndarray) -> np.ndarray:
+        """返回每个日期对应的行号，新日期追加到末尾"""
+        unique = np.unique(ordinals)
+        new_days = [int(d) for d in unique if int(d) not in self._row_of]
+        if new_days:
+            self._grow(self._size + len(new_days))
+            for d in new_days:
+                self._days[self._size] = d
+                self._row_of[d] = self._size
+                self._size += 1
+            self._order = None
+        return np.fromiter((self._row_of[int(d)] for d in ordinals), dtype=np.int64, count=len(ordinals))
+
+    def add_trades(self, records: Iterable[Dict[str, Any]]) -> int:
+        """增量导入成交记录，返回导入条数"""
+        ordinals: List[int] = []
+        amounts: List[float] = []
+        signs: List[int] = []
+        bad = 0
+        for r in records:
+            try:
+                price = _to_float(r.get("price"))
+                close = _to_float(r.get("close"))
+                amount = _to_float(r.get("amount"))
+                if amount is None:
+                    volume = _to_float(r.get("volume"))
+                    if price is None or volume is None:
+                        continue
+                    amount = price * volume
+                ordinal = _to_ordinal(r["date"])
+            except (KeyError, TypeError, ValueError):
+                # 缺少日期或字段无法解析的行跳过，不影响同一批的其他记录
+                bad += 1
+                continue
+            ordinals.append(ordinal)
+            amounts.append(amount)
+            if price is None or close is None or price == close:
+                signs.append(0)
+            else:
+                signs.append(1 if price > close else -1)
+        if bad:
+            logger.warning("跳过无效的成交记录", extra={"rows": bad})
+        if not ordinals:
+            return 0
+
+        amount_arr = np.asarray(amounts, dtype=np.float64)
+        sign_arr = np.asarray(signs, dtype=np.int8)
+        with self._lock:
+            rows = self._rows_for(np.asarray(ordinals, dtype=np.int64))
+            np.add.at(self._cols["total"], rows, amount_arr)
+            np.add.at(self._cols["premium"], rows, np.where(sign_arr > 0, amount_arr, 0.0))
+            np.add.at(self._cols["discount"], rows, np.where(sign_arr < 0, amount_arr, 0.0))
+            np.add.at(self._cols["count"], rows, 1.0)
+            self.version += 1
+        return len(ordinals)
+
+    def set_index(self, records: Iterable[Dict[str, Any]]) -> int:
+        """导入指数日收盘价（date, close）"""
+        ordinals: List[int] = []
+        closes: List[float] = []
+        bad = 0
+        for r in records:
+            try:
+                close = _to_float(r.get("close"))
+                if close is None:
+                    continue
+                ordinal = _to_ordinal(r["date"])
+            except (KeyError, TypeError, ValueError):
+                bad += 1
+                continue
+            ordinals.append(ordinal)
+            closes.append(close)
+        if bad:
+            logger.warning("跳过无效的指数记录", extra={"rows": bad})
+        if not ordinals:
+            return 0
+        with self._lock:
+            rows = self._rows_for(np.asarray(ordinals, dtype=np.int64))
+            self._index_close[rows] = closes
+            self.version += 1
+        return len(ordinals)
+
+    def refresh(self) -> int:
+        """读取数据文件中新追加的记录，返回新增条数"""
+        readers = self._readers + ([self._index_reader] if self._index_reader else [])
+        if any(r.rewritten() for r in readers):
+            # 数据文件被重写，全部重新导入
+            self.clear()
+            for r in readers:
+                r.reset()
+
+        added = 0
+        for reader in self._readers:
+            added += self.add_trades(reader.read_new())
+        if self._index_reader is not None:
+            added += self.set_index(self._index_reader.read_new())
+        return added
+
+    def _sorted_rows(self) -> np.ndarray:
+        if self._order is None:
+            self._order = np.argsort(self._days[: self._size], kind="stable")
+        return self._order
+
+    def daily_stats(self, days: int = 30) -> List[Dict[str, Any]]:
+        """最近days天的日度统计"""
+        with self._lock:
+            if self._size == 0 or days <= 0:
+                return []
+            # 多取一天用于计算指数涨跌幅
+            rows = self._sorted_rows()[-(days + 1):]
+            ordinals = self._days[rows]
+            total = self._cols["total"][rows]
+            premium = self._cols["premium"][rows]
+            discount = self._cols["discount"][rows]
+            index_close = self._index_close[rows]
+
+        prev_close = np.concatenate(([np.nan], index_close[:-1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = np.where(prev_close > 0, (index_close / prev_close - 1.0) * 100.0, 0.0)
+            premium_ratio = np.where(total > 0, premium / total * 100.0, 0.0)
+            discount_ratio = np.where(total > 0, discount / total * 100.0, 0.0)
+
+        stats = []
+        start = 1 if len(rows) > days else 0
+        for i in range(start, len(rows)):
+            stats.append({
+                "date": date.fromordinal(int(ordinals[i])).strftime("%Y-%m-%d"),
+                "index": round(float(np.nan_to_num(index_close[i])), 2),
+                "change": round(float(np.nan_to_num(change[i])), 2),
+                "total_volume": round(float(total[i]), 2),
+                "premium_volume": round(float(premium[i]), 2),
+                "premium_ratio": round(float(premium_ratio[i]), 2),
+                "discount_volume": round(float(discount[i]), 2),
+                "discount_ratio": round(float(discount_ratio[i]), 2),
+            })
+        return stats
+
+    def payload(self, days: int = 30) -> Dict[str, Any]:
+        """/api/trends/data 的响应结构：最新一日的市场数据 + 最近days天的统计"""
+        daily_stats = self.daily_stats(days)
+        latest = daily_stats[-1] if daily_stats else {}
+        market_data = {
+            "shanghai_index": latest.get("index", 0.0),
+            "shanghai_change": latest.get("change", 0.0),
+            "total_volume": latest.get("total_volume", 0.0),
+            "premium_volume": latest.get("premium_volume", 0.0),
+            "discount_volume": latest.get("discount_volume", 0.0),
+        }
+        return {
+            "market_data": market_data,
+            "daily_stats": daily_stats,
+        }
+
+
+def mock_payload(days: int = 30) -> Dict[str, Any]:
+    """没有成交数据文件时使用的模拟数据"""
+    market_data = {
+        "shanghai_index": round(3600 + random.uniform(-100, 100), 2),
+        "shanghai_change": round(random.uniform(-2, 2), 2),
+        "total_volume": round(random.uniform(50000, 80000), 2),
+        "premium_volume": round(random.uniform(200, 500), 2),
+        "discount_volume": round(random.uniform(45000, 75000), 2)
+    }
+
+    daily_stats = []
+    for i in range(days):
+        day = datetime.now() - timedelta(days=days - 1 - i)
+        daily_stats.append({
+            "date": day.strftime("%Y-%m-%d"),
+            "index": round(3600 + random.uniform(-150, 150), 2),
+            "change": round(random.uniform(-3, 3), 2),
+            "total_volume": round(random.uniform(40000, 90000), 2),
+            "premium_volume": round(random.uniform(100, 800), 2),
+            "premium_ratio": round(random.uniform(0.5, 2.5), 2),
+            "discount_volume": round(random.uniform(35000, 85000), 2),
+            "discount_ratio": round(random.uniform(97.5, 99.5), 2)
+        })
+
+    return {
+        "market_data": market_data,
+        "daily_stats": daily_stats
+    }
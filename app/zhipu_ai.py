@@ -1,22 +1,52 @@
 import requests
 import json
+import logging
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import datetime
+from app.config import Config
+from app.metrics import stage
+from app.resilience import CircuitBreaker, ConcurrencyLimiter, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = "你是一个专业的金融分析师，专门分析大宗交易数据。请用中文回答，语言要专业、准确。请始终使用中文回复，不要使用英文。"
 
 class ZhipuAI:
     """智谱AI API集成类"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 timeout: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None):
         """
         初始化智谱AI客户端
         
         Args:
             api_key: 智谱AI API密钥，如果不提供则从环境变量获取
+            base_url: 接口地址，默认读取Config（可指向本地模拟服务）
+            timeout: 单次请求超时秒数
+            breaker: 熔断器，默认按Config创建
+            limiter: 并发限制器，默认按Config创建
         """
         self.api_key = api_key or os.getenv('ZHIPU_API_KEY', '')
-        self.base_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+        self.base_url = base_url or Config.ZHIPU_BASE_URL
         self.model = "glm-4.5"
+        self.timeout = timeout or Config.ZHIPU_TIMEOUT
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=Config.ZHIPU_BREAKER_THRESHOLD,
+            reset_timeout=Config.ZHIPU_BREAKER_RESET_SECONDS
+        )
+        self.limiter = limiter or ConcurrencyLimiter(
+            max_concurrent=Config.ZHIPU_MAX_CONCURRENCY,
+            acquire_timeout=Config.ZHIPU_ACQUIRE_TIMEOUT
+        )
+        # 多个请求线程共用一个客户端，计数需要加锁
+        self._lock = threading.Lock()
+        self.total_calls = 0
+        self.total_fallbacks = 0
         
     def call_api(self, messages: List[Dict[str, str]], 
                  temperature: float = 0.6, 
@@ -50,39 +80,59 @@ class ZhipuAI:
             "stream": stream
         }
         
+        # 熔断打开时直接失败，不再等待超时
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("AI服务暂时熔断，请稍后重试")
+        
         try:
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                # 检查响应格式
-                if 'choices' in result and len(result['choices']) > 0:
-                    content = result['choices'][0]['message']['content']
-                    print(f"API返回内容: {content}")  # 调试信息
-                    return content
-                else:
-                    print(f"API响应格式异常: {result}")  # 调试信息
-                    raise Exception("API响应格式异常")
-            elif response.status_code == 401:
-                raise Exception("API Key无效或已过期")
-            elif response.status_code == 429:
-                raise Exception("请求过于频繁，请稍后重试")
-            elif response.status_code == 500:
-                raise Exception("服务器内部错误，请稍后重试")
-            else:
-                raise Exception(f"API调用失败: {response.status_code}, {response.text}")
-                
+            self.limiter.try_acquire()
+        except UpstreamUnavailable:
+            self.breaker.cancel()
+            raise
+        try:
+            with self._lock:
+                self.total_calls += 1
+            with stage("upstream"):
+                response = requests.post(self.base_url, headers=headers, json=data, timeout=self.timeout)
         except requests.exceptions.Timeout:
+            self.breaker.record_failure()
             raise Exception("请求超时，请检查网络连接")
         except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
             raise Exception(f"网络请求错误: {str(e)}")
-        except Exception as e:
-            print(f"API调用异常: {str(e)}")  # 调试信息
-            raise Exception(f"API调用异常: {str(e)}")
+        finally:
+            self.limiter.release()
+        
+        # 限流与服务端错误计入熔断，其余响应说明上游可达
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        
+        if response.status_code == 200:
+            result = response.json()
+            # 检查响应格式
+            if 'choices' in result and len(result['choices']) > 0:
+                content = result['choices'][0]['message']['content']
+                # 高频事件：只采样记录长度，不输出完整内容
+                logger.debug("API返回内容", extra={"content_chars": len(content), "sample": 0.01})
+                return content
+            else:
+                logger.warning("API响应格式异常", extra={"keys": sorted(result)[:10]})
+                raise Exception("API响应格式异常")
+        elif response.status_code == 401:
+            raise Exception("API Key无效或已过期")
+        elif response.status_code == 429:
+            raise Exception("请求过于频繁，请稍后重试")
+        elif response.status_code == 500:
+            raise Exception("服务器内部错误，请稍后重试")
+        else:
+            raise Exception(f"API调用失败: {response.status_code}, {response.text}")
     
     def chat(self, user_message: str, 
-             system_prompt: str = "你是一个专业的金融分析师，专门分析大宗交易数据。请用中文回答，语言要专业、准确。请始终使用中文回复，不要使用英文。",
-             conversation_history: Optional[List[Dict[str, str]]] = None) -> str:
+             system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+             conversation_history: Optional[List[Dict[str, str]]] = None,
+             fallback: Optional[Callable[[], str]] = None) -> str:
         """
         进行对话
         
@@ -90,10 +140,23 @@ class ZhipuAI:
             user_message: 用户消息
             system_prompt: 系统提示词
             conversation_history: 对话历史
+            fallback: 上游不可用时生成本地降级回答的函数
             
         Returns:
             AI回复内容
         """
+        return self.chat_with_status(user_message, system_prompt, conversation_history, fallback)[0]
+    
+    def chat_with_status(self, user_message: str, 
+                         system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+                         conversation_history: Optional[List[Dict[str, str]]] = None,
+                         fallback: Optional[Callable[[], str]] = None) -> Tuple[str, bool]:
+        """
+        进行对话，并返回是否由上游正常回答
+        
+        Returns:
+            (回复内容, 是否成功调用上游)
+        """
         messages = []
         
         # 添加系统提示词
@@ -116,20 +179,35 @@ class ZhipuAI:
         try:
             result = self.call_api(messages)
             if isinstance(result, str):
-                return result
+                return result, True
             elif isinstance(result, dict) and 'choices' in result:
-                return result['choices'][0]['message']['content']
+                return result['choices'][0]['message']['content'], True
             else:
-                return f"抱歉，AI服务响应格式异常: {str(result)}"
+                return f"抱歉，AI服务响应格式异常: {str(result)}", False
         except Exception as e:
-            return f"抱歉，AI服务暂时不可用: {str(e)}"
+            if fallback is not None:
+                with self._lock:
+                    self.total_fallbacks += 1
+                return fallback(), False
+            return f"抱歉，AI服务暂时不可用: {str(e)}", False
+    
+    def stats(self) -> Dict[str, Any]:
+        """上游调用状态（熔断器、并发、降级次数）"""
+        return {
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+            "total_calls": self.total_calls,
+            "total_fallbacks": self.total_fallbacks
+        }
     
-    def analyze_market_data(self, market_data: Dict[str, Any]) -> str:
+    def analyze_market_data(self, market_data: Dict[str, Any],
+                            fallback: Optional[Callable[[], str]] = None) -> str:
         """
         分析市场数据
         
         Args:
             market_data: 市场数据字典
+            fallback: 上游不可用时的降级回答
             
         Returns:
             分析结果
@@ -151,14 +229,16 @@ class ZhipuAI:
 
 请提供详细的市场分析。"""
         
-        return self.chat(user_message, system_prompt)
+        return self.chat(user_message, system_prompt, fallback=fallback)
     
-    def get_investment_advice(self, query: str) -> str:
+    def get_investment_advice(self, query: str,
+                              fallback: Optional[Callable[[], str]] = None) -> str:
         """
         获取投资建议
         
         Args:
             query: 用户查询
+            fallback: 上游不可用时的降级回答
             
         Returns:
             投资建议
@@ -170,7 +250,4 @@ class ZhipuAI:
 3. 提醒投资风险
 4. 不提供具体的投资建议，只提供分析参考"""
         
-        return self.chat(query, system_prompt)
-
-# 创建全局实例
-zhipu_ai = ZhipuAI()
+        return self.chat(query, system_prompt, fallback=fallback)
@@ -0,0 +1,111 @@
+"""
+查询微批处理基准测试
+
+生成合成向量索引（见 benchmarks/sharding.py），用多个客户端线程并发检索，
+对比直接调用 VectorStore.search 与不同等待窗口/批大小的 EmbeddingBatcher 的吞吐量与延迟。
+默认使用模拟嵌入（只体现批量矩阵乘法的收益）；指定 --model 时用真实的 fastembed 模型，
+同时体现批量嵌入的收益。
+
+用法:
+    python -m benchmarks.batching --n 200000 --concurrency 1,8,32 --windows 0,2,5 --batch-sizes 16,64
+    python -m benchmarks.batching --model BAAI/bge-small-en-v1.5 --concurrency 16 --duration 10 --output batch.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.batching import EmbeddingBatcher
+from app.retriever import VectorStore
+from benchmarks.catalog import sample_queries
+from benchmarks.quantization import DIMENSION
+from benchmarks.sharding import write_index
+from benchmarks.utils import latency_summary
+
+
+def run_load(search, queries: List[str], concurrency: int, duration: float, top_k: int) -> Dict[str, Any]:
+    """concurrency个线程在duration秒内循环检索"""
+    deadline = time.perf_counter() + duration
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+
+    def client(slot: int) -> None:
+        i = slot
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            search(queries[i % len(queries)], top_k)
+            latencies[slot].append(time.perf_counter() - start)
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    merged = [x for rows in latencies for x in rows]
+    summary = latency_summary(merged)
+    summary["qps"] = round(len(merged) / elapsed, 2)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput vs latency of the query embedding micro-batcher")
+    parser.add_argument("--n", type=int, default=100_000, help="number of indexed vectors")
+    parser.add_argument("--model", type=str, default=None, help="fastembed model name (default: mock embeddings)")
+    parser.add_argument("--concurrency", type=str, default="1,8,32", help="comma separated client thread counts")
+    parser.add_argument("--windows", type=str, default="0,2,5", help="comma separated batch windows (ms)")
+    parser.add_argument("--batch-sizes", type=str, default="32", help="comma separated max batch sizes")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per configuration")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    concurrency = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    windows = [float(x) for x in args.windows.split(",") if x.strip()]
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",") if x.strip()]
+    queries = sample_queries(500, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        write_index(workdir, args.n, DIMENSION, clusters=1000, noise=0.05, seed=args.seed)
+        if args.model:
+            (workdir / "model_name.txt").write_text(args.model, encoding="utf-8")
+        store = VectorStore.from_directory(workdir)
+
+        results: List[Dict[str, Any]] = []
+        for c in concurrency:
+            results.append({"config": "unbatched", "concurrency": c,
+                            **run_load(store.search, queries, c, args.duration, args.top_k)})
+            for window in windows:
+                for size in batch_sizes:
+                    batcher = EmbeddingBatcher(store, window_ms=window, max_batch=size)
+                    row = run_load(batcher.search, queries, c, args.duration, args.top_k)
+                    row["mean_batch_size"] = batcher.stats()["mean_batch_size"]
+                    results.append({"config": f"window={window}ms batch={size}", "concurrency": c, **row})
+
+    report = {
+        "n": args.n,
+        "model": args.model or "mock-embedding-model",
+        "duration": args.duration,
+        "top_k": args.top_k,
+        "results": results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+合成挂牌数据生成器
+
+生成与 data/sample_listings.jsonl 字段一致的中文挂牌数据
+（id/title/category/region/price/unit/description/tags/seller/date），
+用于 1k ~ 10M 规模的检索性能测试。结果只依赖随机种子，可重复生成。
+"""
+from __future__ import annotations
+
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+# 类别 -> [(品名, 单位, 价格区间, 规格)]
+PRODUCTS: Dict[str, List[Tuple[str, str, Tuple[float, float], List[str]]]] = {
+    "有色金属": [
+        ("铜锭", "元/吨", (60000, 80000), ["99.97%", "A级", "1#"]),
+        ("铝锭", "元/吨", (17000, 21000), ["A00", "99.7%"]),
+        ("锌锭", "元/吨", (20000, 26000), ["0#", "1#"]),
+        ("电解镍", "元/吨", (120000, 150000), ["1#", "金川"]),
+        ("铅锭", "元/吨", (15000, 18000), ["1#"]),
+    ],
+    "钢材": [
+        ("螺纹钢", "元/吨", (3200, 4300), ["HRB400E", "HRB500E", "Φ12-25"]),
+        ("热轧卷板", "元/吨", (3300, 4500), ["Q235B", "Q355B"]),
+        ("冷轧板", "元/吨", (4000, 5200), ["SPCC", "DC01"]),
+        ("线材", "元/吨", (3400, 4200), ["HPB300"]),
+        ("中厚板", "元/吨", (3500, 4600), ["Q345R", "Q235B"]),
+    ],
+    "能源": [
+        ("动力煤", "元/吨", (600, 1000), ["5500大卡", "5000大卡"]),
+        ("焦煤", "元/吨", (1200, 2000), ["主焦煤", "低硫"]),
+        ("焦炭", "元/吨", (1800, 2600), ["准一级", "二级"]),
+        ("燃料油", "元/吨", (3000, 4200), ["180CST", "低硫"]),
+        ("原油", "元/桶", (450, 650), ["布伦特", "阿曼"]),
+    ],
+    "化工": [
+        ("PVC", "元/吨", (5200, 6800), ["SG-5", "电石法"]),
+        ("聚乙烯", "元/吨", (7500, 9000), ["LLDPE", "HDPE"]),
+        ("聚丙烯", "元/吨", (7000, 8500), ["拉丝", "共聚"]),
+        ("甲醇", "元/吨", (2200, 2900), ["工业级", "优等品"]),
+        ("PTA", "元/吨", (5000, 6200), ["优等品"]),
+        ("纯碱", "元/吨", (1600, 2800), ["重质", "轻质"]),
+    ],
+    "农产品": [
+        ("玉米", "元/吨", (2200, 2900), ["二等", "国标"]),
+        ("大豆", "元/吨", (4200, 5200), ["国产", "进口"]),
+        ("豆粕", "元/吨", (3000, 4200), ["43蛋白", "46蛋白"]),
+        ("白糖", "元/吨", (5600, 6800), ["一级", "广西"]),
+        ("棉花", "元/吨", (14000, 17500), ["3128B", "新疆"]),
+    ],
+    "贵金属": [
+        ("黄金", "元/克", (450, 620), ["Au99.99", "Au9995"]),
+        ("白银", "元/千克", (5200, 7800), ["Ag99.99"]),
+    ],
+}
+
+REGIONS = [
+    "上海", "江苏 南京", "江苏 无锡", "山东 青岛", "山东 日照", "河北 唐山", "天津", "浙江 宁波",
+    "广东 广州", "广东 佛山", "山西 太原", "内蒙古 鄂尔多斯", "河南 郑州", "广西 南宁", "新疆 乌鲁木齐",
+    "辽宁 大连", "湖北 武汉", "四川 成都", "福建 厦门", "安徽 合肥",
+]
+
+SELLER_PREFIX = ["鲁商", "华东", "中储", "永盛", "瑞丰", "金通", "恒信", "宏达", "汇丰", "中联", "远大", "新华"]
+SELLER_TRADE = ["金属", "钢铁", "能源", "化工", "贸易", "物产", "供应链", "物流"]
+SELLER_SUFFIX = ["有限公司", "集团", "实业", "商贸"]
+
+TRADE_TAGS = ["现货", "期货", "含税", "自提", "可议价", "长期供应", "大宗交易", "库存充足", "厂提", "仓单"]
+
+DESCRIPTIONS = [
+    "库存{stock}吨，可分批提货，{tax}，支持物流配送",
+    "{spec}规格齐全，{tax}，{region}仓库现货，价格随行就市",
+    "长期稳定供应，月供{stock}吨，{tax}，可签订年度合同",
+    "厂家直供{product}，质量稳定，{tax}，量大从优",
+    "{region}港口库存，{spec}，可开具增值税专用发票",
+]
+
+
+def generate_listing(rng: random.Random, index: int, start: date, days: int) -> Dict[str, Any]:
+    """生成单条挂牌记录"""
+    category = rng.choice(list(PRODUCTS))
+    product, unit, (low, high), specs = rng.choice(PRODUCTS[category])
+    region = rng.choice(REGIONS)
+    spec = rng.choice(specs)
+    province = region.split()[0]
+    tax = rng.choice(["含税出厂", "含税到厂", "不含税", "含税含运"])
+
+    tags = [product, rng.choice(TRADE_TAGS), rng.choice(TRADE_TAGS)]
+    tags = list(dict.fromkeys(tags))
+    description = rng.choice(DESCRIPTIONS).format(
+        stock=rng.randrange(50, 5000, 50), tax=tax, spec=spec, region=province, product=product
+    )
+
+    return {
+        "id": f"S{index:08d}",
+        "title": f"{province} {product} {spec} {rng.choice(['现货', '期货', '长协', '仓单'])}",
+        "category": category,
+        "region": region,
+        "price": round(rng.uniform(low, high), 0 if high >= 1000 else 2),
+        "unit": unit,
+        "description": description,
+        "tags": tags,
+        "seller": f"{rng.choice(SELLER_PREFIX)}{rng.choice(SELLER_TRADE)}{rng.choice(SELLER_SUFFIX)}",
+        "date": (start + timedelta(days=rng.randrange(days))).strftime("%Y-%m-%d"),
+    }
+
+
+def generate_listings(n: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """按种子生成n条挂牌记录"""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    for i in range(n):
+        yield generate_listing(rng, i, start, 240)
+
+
+def write_catalog(path: Path, n: int, seed: int = 42) -> Path:
+    """把n条合成挂牌写入JSONL文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for doc in generate_listings(n, seed):
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    return path
+
+
+def sample_queries(n: int, seed: int = 7) -> List[str]:
+    """生成与目录词表一致的查询（品名、类别、地区+品名、规格等）"""
+    rng = random.Random(seed)
+    products = [(p[0], p[3]) for items in PRODUCTS.values() for p in items]
+    queries: List[str] = []
+    for _ in range(n):
+        product, specs = rng.choice(products)
+        kind = rng.random()
+        if kind < 0.5:
+            queries.append(product)
+        elif kind < 0.65:
+            queries.append(rng.choice(list(PRODUCTS)))
+        elif kind < 0.8:
+            queries.append(f"{rng.choice(REGIONS).split()[0]} {product}")
+        elif kind < 0.9:
+            queries.append(rng.choice(specs))
+        else:
+            queries.append(rng.choice(TRADE_TAGS))
+    return queries
@@ -0,0 +1,104 @@
+"""
+并发写入基准测试
+
+对比默认SQLite配置（rollback journal，无连接池调优）与 WAL + PRAGMA + 连接池 配置，
+多个线程同时写入 search_history 表，统计吞吐量与延迟。
+
+用法:
+    python -m benchmarks.db_writes --threads 8 --writes 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_db_engine
+from app.models import Base, SearchHistory
+from benchmarks.utils import percentile
+
+
+def run_writes(engine, threads: int, writes: int) -> Dict[str, Any]:
+    """多线程写入，每次写入单独提交"""
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id: int) -> None:
+        local: List[float] = []
+        barrier.wait()
+        for i in range(writes):
+            db = SessionLocal()
+            start = time.perf_counter()
+            try:
+                db.add(SearchHistory(user_id=worker_id, query=f"螺纹钢 {worker_id}-{i}", results_count=i))
+                db.commit()
+                local.append(time.perf_counter() - start)
+            except Exception:
+                db.rollback()
+                with lock:
+                    errors[0] += 1
+            finally:
+                db.close()
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    return {
+        "writes": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 4),
+        "writes_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite concurrent write benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread")
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {"threads": args.threads, "writes_per_thread": args.writes}
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_url = f"sqlite:///{os.path.join(tmp, 'baseline.db')}"
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+
+        baseline = create_engine(baseline_url, connect_args={"check_same_thread": False})
+        report["baseline"] = run_writes(baseline, args.threads, args.writes)
+        report["tuned"] = run_writes(create_db_engine(tuned_url), args.threads, args.writes)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+结果多样化基准测试
+
+合成挂牌目录（见 benchmarks/catalog.py）的卖方按Zipf分布重新分配，大卖方同一品名挂很多条相近的挂牌；
+向量 = 品名中心 + 卖方偏移 + 少量噪声，查询向量偏向某个卖方的写法，使一阶段前k条集中在少数卖方。
+对比不做多样化、只加卖方上限、MMR、MMR+上限时前k条的：
+- distinct_sellers：不同卖方数
+- intra_similarity：两两平均余弦相似度（越低越不重复）
+- relevance：与查询的平均余弦相似度（多样化付出的相关度代价）
+- baseline_depth：一阶段顺序下要翻到第几条才能看到同样多的卖方（用户原本需要的结果数）
+- latency：多样化一步（取候选向量 + 贪心挑选）的耗时
+
+用法:
+    python -m benchmarks.diversify --n 50000 --queries 200 --candidates 50
+    python -m benchmarks.diversify --diversity 0.2,0.5 --max-per-seller 2 --output diversify.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.diversify import Diversifier, vectors_of
+from app.retriever import VectorStore
+from benchmarks.catalog import generate_listings
+from benchmarks.quantization import DIMENSION
+from benchmarks.utils import latency_summary
+from scripts.build_mock_index import MODEL_NAME
+
+
+def write_index(workdir: Path, n: int, dim: int, sellers: int, seed: int) -> Dict[Tuple[str, str], np.ndarray]:
+    """写入挂牌与向量，返回 (品名, 卖方) -> 未加噪声的向量，用于构造查询"""
+    rng = np.random.default_rng(seed)
+    listings = list(generate_listings(n, seed))
+    names = sorted({l["seller"] for l in listings})[:sellers]
+    weights = 1.0 / np.arange(1, len(names) + 1)
+    owners = rng.choice(len(names), size=n, p=weights / weights.sum())
+
+    def unit(size):
+        v = rng.standard_normal(size).astype(np.float32)
+        return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+    centers: Dict[str, np.ndarray] = {}
+    offsets: Dict[Tuple[str, str], np.ndarray] = {}
+    embeddings = np.empty((n, dim), dtype=np.float32)
+    for i, listing in enumerate(listings):
+        listing["seller"] = names[owners[i]]
+        product = listing["tags"][0]
+        key = (product, listing["seller"])
+        if product not in centers:
+            centers[product] = unit(dim)
+        if key not in offsets:
+            offsets[key] = centers[product] + 0.7 * unit(dim)
+        embeddings[i] = offsets[key] + 0.1 * unit(dim)
+    np.save(workdir / "embeddings.npy", embeddings)
+    with (workdir / "metadata.jsonl").open("w", encoding="utf-8") as f:
+        for listing in listings:
+            f.write(json.dumps(listing, ensure_ascii=False) + "\n")
+    (workdir / "model_name.txt").write_text(MODEL_NAME, encoding="utf-8")
+    return offsets
+
+
+def generate_queries(offsets: Dict[Tuple[str, str], np.ndarray], n: int, seed: int) -> np.ndarray:
+    rng = random.Random(seed)
+    keys = sorted(offsets)
+    queries = []
+    for _ in range(n):
+        vec = offsets[rng.choice(keys)]
+        queries.append(vec / np.linalg.norm(vec))
+    return np.stack(queries).astype(np.float32)
+
+
+def distinct_depth(results: List[Dict[str, Any]], target: int) -> int:
+    """一阶段顺序下看到target个不同卖方所需的结果数（候选不够时返回候选数+1）"""
+    seen = set()
+    for depth, r in enumerate(results, 1):
+        seen.add(r["listing"]["seller"])
+        if len(seen) >= target:
+            return depth
+    return len(results) + 1
+
+
+def evaluate(store: VectorStore, queries: np.ndarray, diversifier: Diversifier, top_k: int) -> Dict[str, Any]:
+    sellers: List[int] = []
+    similarity: List[float] = []
+    relevance: List[float] = []
+    depth: List[int] = []
+    latencies: List[float] = []
+    for vec in queries:
+        hits = store.search_vector(vec, diversifier.fetch_size(top_k))
+        results = [{"score": score, "listing": store.metadata[i]} for i, score in hits]
+        start = time.perf_counter()
+        page = diversifier.diversify(results, top_k, vectors_of(store, results))
+        latencies.append(time.perf_counter() - start)
+
+        rows = vectors_of(store, page)
+        sim = rows @ rows.T
+        m = len(page)
+        similarity.append(float((sim.sum() - np.trace(sim)) / (m * (m - 1))) if m > 1 else 0.0)
+        relevance.append(float(np.mean(rows @ vec)))
+        distinct = len({r["listing"]["seller"] for r in page})
+        sellers.append(distinct)
+        depth.append(distinct_depth(results, distinct))
+    return {
+        "distinct_sellers": round(float(np.mean(sellers)), 2),
+        "intra_similarity": round(float(np.mean(similarity)), 4),
+        "relevance": round(float(np.mean(relevance)), 4),
+        "baseline_depth": round(float(np.mean(depth)), 2),
+        "latency": latency_summary(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MMR and per-seller caps: diversity vs relevance and latency")
+    parser.add_argument("--n", type=int, default=50_000, help="catalog size")
+    parser.add_argument("--dim", type=int, default=DIMENSION)
+    parser.add_argument("--sellers", type=int, default=200, help="distinct sellers (Zipf distributed)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=50, help="first-stage candidates fed to MMR")
+    parser.add_argument("--diversity", type=str, default="0.3,0.6", help="comma separated MMR weights (1 - lambda)")
+    parser.add_argument("--max-per-seller", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    weights = [float(x) for x in args.diversity.split(",") if x.strip()]
+    configs: List[Tuple[str, Diversifier]] = [
+        ("baseline", Diversifier(candidates=args.candidates)),
+        ("seller_cap", Diversifier(candidates=args.candidates, max_per_seller=args.max_per_seller)),
+    ]
+    for w in weights:
+        configs.append((f"mmr_{w}", Diversifier(w, args.candidates)))
+        configs.append((f"mmr_{w}+seller_cap", Diversifier(w, args.candidates, max_per_seller=args.max_per_seller)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        offsets = write_index(workdir, args.n, args.dim, args.sellers, args.seed)
+        store = VectorStore.from_directory(workdir)
+        queries = generate_queries(offsets, args.queries, args.seed + 1)
+        results = [{"config": name, **evaluate(store, queries, d, args.top_k)} for name, d in configs]
+
+    report = {"n": args.n, "queries": args.queries, "top_k": args.top_k, "candidates": args.candidates,
+              "results": results}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
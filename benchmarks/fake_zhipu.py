@@ -0,0 +1,111 @@
+"""
+本地模拟智谱AI接口
+
+返回与 /api/paas/v4/chat/completions 相同结构的响应，可配置延迟与失败率，
+用于在离线环境下验证并发限制、熔断降级以及压测。
+
+用法:
+    python -m benchmarks.fake_zhipu --port 9100 --delay 0.2 --error-rate 0.1
+    ZHIPU_BASE_URL=http://127.0.0.1:9100/api/paas/v4/chat/completions uvicorn app.main:app
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeZhipuServer:
+    """可在进程内启动的模拟上游（线程模式）"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 500):
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/paas/v4/chat/completions"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+
+                if random.random() < server.error_rate:
+                    body = json.dumps({"error": {"message": "fake upstream error"}}).encode("utf-8")
+                    self.send_response(server.error_status)
+                else:
+                    question = ""
+                    for m in payload.get("messages", []):
+                        if m.get("role") == "user":
+                            question = m.get("content", "")
+                    body = json.dumps({
+                        "model": payload.get("model", "glm-4.5"),
+                        "choices": [{
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": f"模拟回答：{question[:50]}"},
+                        }],
+                    }, ensure_ascii=False).encode("utf-8")
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "FakeZhipuServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Zhipu chat completions upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to sleep per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+
+    server = FakeZhipuServer(args.host, args.port, args.delay, args.error_rate, args.error_status)
+    print(f"Fake Zhipu upstream listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
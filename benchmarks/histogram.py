@@ -0,0 +1,91 @@
+"""
+HDR风格延迟直方图
+
+按"2的幂分段 + 段内线性子桶"划分（log-linear），在固定内存下覆盖微秒到分钟级延迟，
+相对误差不超过 1/sub_buckets。每个线程各自记录，结束时合并，记录路径无需加锁。
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bucket_bits: int = 7, max_value_us: int = 3_600_000_000):
+        """
+        Args:
+            sub_bucket_bits: 每个2的幂区间内的子桶数量（2^bits），7 对应约0.8%精度
+            max_value_us: 可记录的最大值（微秒），超出时截断到该值
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.max_value_us = max_value_us
+        buckets = max(1, max_value_us.bit_length() - sub_bucket_bits + 1)
+        self.counts: List[int] = [0] * (buckets * self.sub_bucket_count)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self.sub_bucket_bits)
+        sub = value >> bucket
+        if bucket:
+            sub -= self.sub_bucket_count >> 1
+            return self.sub_bucket_count + (bucket - 1) * (self.sub_bucket_count >> 1) + sub
+        return sub
+
+    def _value_at(self, index: int) -> int:
+        """桶的上界（包含）"""
+        if index < self.sub_bucket_count:
+            return index
+        half = self.sub_bucket_count >> 1
+        bucket = (index - self.sub_bucket_count) // half + 1
+        sub = (index - self.sub_bucket_count) % half + half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, seconds: float) -> None:
+        value = min(self.max_value_us, max(0, int(seconds * 1_000_000)))
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if other.sub_bucket_bits != self.sub_bucket_bits or len(other.counts) != len(self.counts):
+            raise ValueError("histogram layouts differ")
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentile(self, pct: float) -> float:
+        """百分位延迟（毫秒）"""
+        if not self.total:
+            return 0.0
+        target = max(1, int(round(pct / 100.0 * self.total)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._value_at(i), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.total,
+            "min_ms": round((self.min_us or 0) / 1000.0, 3),
+            "mean_ms": round(self.sum_us / self.total / 1000.0, 3) if self.total else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "p999_ms": round(self.percentile(99.9), 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
@@ -0,0 +1,325 @@
+"""
+HTTP压测工具
+
+按配置的并发与请求比例压测 /api/search、/api/login、/api/trends/data、/api/chat，
+输出每个接口的吞吐量、错误率与HDR风格的延迟百分位。默认在本机启动 uvicorn（临时SQLite库）
+与模拟智谱上游（benchmarks/fake_zhipu.py），整个过程无需外网。
+
+用法:
+    python -m benchmarks.loadtest --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --workers 4 --mix search=6,login=1,trends=2,chat=1 --output load.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --duration 60   # 压测已运行的服务
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.catalog import sample_queries
+from benchmarks.fake_zhipu import FakeZhipuServer
+from benchmarks.histogram import LatencyHistogram
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "search=5,login=1,trends=3,chat=1"
+CHAT_MESSAGES = ["最近螺纹钢价格怎么样？", "铜锭现货哪里有？", "分析一下大宗交易溢价情况", "动力煤有哪些挂牌？"]
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix: Dict[str, int] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown endpoint '{name}', choose from {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("request mix is empty")
+    return mix
+
+
+class Client:
+    """单个压测线程的状态（HTTP会话、登录令牌、ETag缓存）"""
+
+    def __init__(self, base_url: str, username: str, password: str, queries: List[str], seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.username = username
+        self.password = password
+        self.queries = queries
+        self.rng = random.Random(seed)
+        self.token: Optional[str] = None
+        self.etag: Optional[str] = None
+
+    def post(self, path: str, payload: Dict[str, Any], timeout: float) -> requests.Response:
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        return self.session.post(self.base_url + path, json=payload, headers=headers, timeout=timeout)
+
+
+def do_search(client: Client, timeout: float) -> requests.Response:
+    return client.post("/api/search", {
+        "query": client.rng.choice(client.queries),
+        "top_k": 10,
+        "use_llm": client.rng.random() < 0.5,
+    }, timeout)
+
+
+def do_login(client: Client, timeout: float) -> requests.Response:
+    resp = client.post("/api/login", {"username": client.username, "password": client.password}, timeout)
+    if resp.status_code == 200:
+        client.token = resp.json().get("access_token")
+    return resp
+
+
+def do_trends(client: Client, timeout: float) -> requests.Response:
+    # 与浏览器一致携带ETag，未变化时服务端返回304
+    headers = {"If-None-Match": client.etag} if client.etag else {}
+    resp = client.session.get(client.base_url + "/api/trends/data", headers=headers, timeout=timeout)
+    if resp.status_code == 200:
+        client.etag = resp.headers.get("ETag")
+    return resp
+
+
+def do_chat(client: Client, timeout: float) -> requests.Response:
+    return client.post("/api/chat", {"message": client.rng.choice(CHAT_MESSAGES), "use_context": True}, timeout)
+
+
+SCENARIOS: Dict[str, Callable[[Client, float], requests.Response]] = {
+    "search": do_search,
+    "login": do_login,
+    "trends": do_trends,
+    "chat": do_chat,
+}
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.status: Dict[str, int] = {}
+        self.errors = 0
+
+    def merge(self, other: "EndpointStats") -> None:
+        self.histogram.merge(other.histogram)
+        self.errors += other.errors
+        for code, n in other.status.items():
+            self.status[code] = self.status.get(code, 0) + n
+
+
+def run_worker(client: Client, mix: Dict[str, int], deadline: float, warmup_until: float,
+               max_requests: Optional[int], counter: List[int], lock: threading.Lock,
+               timeout: float, out: Dict[str, EndpointStats]) -> None:
+    """循环发起请求直至到时或达到总请求数；统计只写本线程的对象，结束后由主线程合并"""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            return
+        if max_requests is not None:
+            with lock:
+                if counter[0] >= max_requests:
+                    return
+                counter[0] += 1
+        name = client.rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            resp = SCENARIOS[name](client, timeout)
+            code = str(resp.status_code)
+            failed = resp.status_code >= 400
+        except requests.RequestException as e:
+            code = type(e).__name__
+            failed = True
+        elapsed = time.perf_counter() - start
+        if start < warmup_until:
+            continue
+        stats = out.setdefault(name, EndpointStats())
+        stats.histogram.record(elapsed)
+        stats.status[code] = stats.status.get(code, 0) + 1
+        stats.errors += failed
+
+
+def prepare_users(base_url: str, count: int, password: str) -> List[str]:
+    """注册压测账号（已存在时直接复用）"""
+    names = []
+    tag = int(time.time())
+    for i in range(count):
+        name = f"load_{tag}_{i}"
+        resp = requests.post(f"{base_url}/api/register", json={
+            "username": name, "email": f"{name}@example.com", "password": password,
+        }, timeout=30)
+        if resp.status_code not in (200, 400):
+            raise RuntimeError(f"register failed: {resp.status_code} {resp.text[:200]}")
+        names.append(name)
+    return names
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, upstream_url: str, tmpdir: str, log_path: str) -> Tuple[subprocess.Popen, str]:
+    """以子进程启动 uvicorn，使用临时数据库并指向模拟上游"""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'loadtest.db')}",
+        "ZHIPU_BASE_URL": upstream_url,
+        "ZHIPU_API_KEY": env.get("ZHIPU_API_KEY") or "loadtest",
+    })
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}, see {log_path}")
+        try:
+            if requests.get(f"{base_url}/api/status", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"server did not become ready, see {log_path}")
+
+
+def run_load(base_url: str, mix: Dict[str, int], concurrency: int, duration: float, warmup: float,
+             max_requests: Optional[int], timeout: float, users: int, seed: int) -> Dict[str, Any]:
+    password = "loadtest-pass"
+    usernames = prepare_users(base_url, max(1, min(users, concurrency)), password)
+    queries = sample_queries(500, seed)
+
+    # 压测线程启动前全部登录，/api/search 需要令牌；场景中的login只用于衡量登录接口本身
+    clients = []
+    for i in range(concurrency):
+        client = Client(base_url, usernames[i % len(usernames)], password, queries, seed + i)
+        resp = do_login(client, timeout)
+        if resp.status_code != 200:
+            raise RuntimeError(f"login failed: {resp.status_code} {resp.text[:200]}")
+        clients.append(client)
+
+    results: List[Dict[str, EndpointStats]] = [{} for _ in range(concurrency)]
+    counter = [0]
+    lock = threading.Lock()
+    start = time.perf_counter()
+    warmup_until = start + warmup
+    deadline = warmup_until + duration if duration > 0 else float("inf")
+    threads = []
+    for i, client in enumerate(clients):
+        t = threading.Thread(target=run_worker, args=(
+            client, mix, deadline, warmup_until, max_requests, counter, lock, timeout, results[i]
+        ), daemon=True)
+        threads.append(t)
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = max(1e-9, min(time.perf_counter(), deadline) - warmup_until)
+
+    merged: Dict[str, EndpointStats] = {}
+    total = EndpointStats()
+    for per_thread in results:
+        for name, stats in per_thread.items():
+            merged.setdefault(name, EndpointStats()).merge(stats)
+            total.merge(stats)
+
+    def describe(stats: EndpointStats) -> Dict[str, Any]:
+        count = stats.histogram.total
+        return {
+            "requests": count,
+            "rps": round(count / elapsed, 1),
+            "errors": stats.errors,
+            "error_rate": round(stats.errors / count, 4) if count else 0.0,
+            "status": dict(sorted(stats.status.items())),
+            "latency": stats.histogram.summary(),
+        }
+
+    return {
+        "seconds": round(elapsed, 3),
+        "endpoints": {name: describe(merged[name]) for name in sorted(merged)},
+        "total": describe(total),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP load test for app.main:app")
+    parser.add_argument("--url", default=None, help="target an already running server instead of spawning one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning the server")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds excluded from the report")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. search=5,login=1,trends=3,chat=1")
+    parser.add_argument("--users", type=int, default=8, help="distinct accounts used by clients")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per request timeout")
+    parser.add_argument("--upstream-delay", type=float, default=0.3, help="fake Zhipu latency in seconds")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    if args.duration <= 0 and not args.requests:
+        parser.error("--duration 0 requires --requests")
+    mix = parse_mix(args.mix)
+
+    report: Dict[str, Any] = {
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "warmup": args.warmup,
+    }
+    upstream: Optional[FakeZhipuServer] = None
+    proc: Optional[subprocess.Popen] = None
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            upstream = FakeZhipuServer(delay=args.upstream_delay, error_rate=args.upstream_error_rate).start()
+            proc, base_url = start_server(args.workers, upstream.url, tmp.name, os.path.join(tmp.name, "server.log"))
+            report["workers"] = args.workers
+            report["upstream_delay"] = args.upstream_delay
+        report["target"] = base_url
+
+        report.update(run_load(
+            base_url, mix, args.concurrency, args.duration if not args.requests else 0, args.warmup,
+            args.requests, args.timeout, args.users, args.seed,
+        ))
+        if upstream is not None:
+            report["upstream_requests"] = upstream.requests
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if upstream is not None:
+            upstream.stop()
+        tmp.cleanup()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+挂牌内存占用基准测试
+
+生成合成挂牌目录（见 benchmarks/catalog.py），分别以原始 json.loads 字典列表与
+app/listing_store.py 的紧凑记录（__slots__ + 驻留字符串）加载，对比：
+- python_mb / bytes_per_listing：tracemalloc 统计的加载后Python对象占用
+- rss_delta_mb：进程常驻内存增量
+- load_seconds：读取并解析JSONL的耗时
+另外报告关键词检索器（Retriever，分别开启与关闭容错词典）的加载耗时与查询延迟。
+
+用法:
+    python -m benchmarks.memory --n 200000
+    python -m benchmarks.memory --n 1000000 --queries 20 --output memory.json
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.listing_store import load_listings
+from app.retriever import Retriever
+from benchmarks.catalog import sample_queries, write_catalog
+from benchmarks.utils import latency_summary, rss_bytes
+
+
+def load_dicts(path: str) -> List[Dict[str, Any]]:
+    """改造前的加载方式：每行一个 json.loads 字典"""
+    listings = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                listings.append(json.loads(line))
+    return listings
+
+
+def measure_load(load: Callable[[], Any], n: int) -> Dict[str, Any]:
+    # 计时与RSS在不开tracemalloc时测量（追踪会显著拖慢分配），对象占用单独再加载一次统计
+    gc.collect()
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    obj = load()
+    seconds = time.perf_counter() - start
+    rss_delta = rss_bytes() - rss_before
+    del obj
+    gc.collect()
+
+    tracemalloc.start()
+    obj = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    gc.collect()
+    return {
+        "load_seconds": round(seconds, 4),
+        "python_mb": round(current / 2**20, 2),
+        "bytes_per_listing": round(current / max(1, n)),
+        "rss_delta_mb": round(rss_delta / 2**20, 2),
+    }
+
+
+def measure_retriever(catalog: str, queries: List[str], top_k: int, fuzzy: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    retriever = Retriever(catalog, fuzzy=fuzzy)
+    load_seconds = time.perf_counter() - start
+    latencies = []
+    for q in queries:
+        t = time.perf_counter()
+        retriever.search(q, top_k)
+        latencies.append(time.perf_counter() - t)
+    return {"fuzzy": fuzzy, "load_seconds": round(load_seconds, 4), "search": latency_summary(latencies)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resident memory of raw dict listings vs compact slotted records")
+    parser.add_argument("--n", type=int, default=200_000, help="catalog size")
+    parser.add_argument("--queries", type=int, default=50, help="keyword queries per retriever")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = str(write_catalog(Path(tmp) / "listings.jsonl", args.n, args.seed))
+        report: Dict[str, Any] = {
+            "n": args.n,
+            "catalog_mb": round(os.path.getsize(catalog) / 2**20, 2),
+            "dict": measure_load(lambda: load_dicts(catalog), args.n),
+            "listing_store": measure_load(lambda: load_listings(catalog), args.n),
+        }
+        queries = sample_queries(args.queries, args.seed)
+        report["retriever"] = [
+            measure_retriever(catalog, queries, args.top_k, fuzzy) for fuzzy in (False, True)
+        ]
+    report["memory_saved"] = round(1 - report["listing_store"]["python_mb"] / report["dict"]["python_mb"], 3)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+压缩向量基准测试
+
+生成带聚类结构的合成单位向量（比独立随机向量更接近真实嵌入分布），用 app/quantization.py
+构建 int8 与 PQ 压缩文件，以精确的 embeddings_norm @ vec 结果为基准，报告各模式的
+recall@k、常驻内存、每条向量字节数与查询延迟；重排模式额外从内存映射的float矩阵读取候选行。
+
+用法:
+    python -m benchmarks.quantization --n 100000 --queries 200
+    python -m benchmarks.quantization --n 1000000 --pq-m 48,96 --rerank 100,400 --output quant.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app import quantization
+from app.quantization import CompressedIndex, normalize_rows, top_indices
+from benchmarks.utils import latency_summary
+
+DIMENSION = 384
+BATCH = 65_536
+
+
+def generate_vectors(path: Path, n: int, dim: int, clusters: int, noise: float, seed: int) -> np.ndarray:
+    """写入 n×dim 的聚类单位向量（.npy内存映射），返回聚类中心"""
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    arr = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, BATCH):
+        rows = min(BATCH, n - start)
+        block = centers[rng.integers(0, clusters, rows)] + noise * rng.standard_normal((rows, dim)).astype(np.float32)
+        arr[start:start + rows] = normalize_rows(block)
+    arr.flush()
+    del arr
+    return centers
+
+
+def generate_queries(centers: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    """与库向量同分布但不在库中的查询"""
+    rng = np.random.default_rng(seed + 1)
+    block = centers[rng.integers(0, len(centers), n)]
+    return normalize_rows(block + noise * rng.standard_normal(block.shape).astype(np.float32))
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return len(set(found.tolist()) & set(truth.tolist())) / max(1, len(truth))
+
+
+def measure(name: str, search, queries: np.ndarray, truth: List[np.ndarray], top_k: int,
+            nbytes: int, n: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for q, t in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(q)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(recall(found, t))
+    return {
+        "mode": name,
+        f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+        "memory_bytes": int(nbytes),
+        "bytes_per_vector": round(nbytes / max(1, n), 2),
+        "latency": latency_summary(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall@k vs memory for int8 / PQ compressed vectors")
+    parser.add_argument("--n", type=int, default=100_000, help="number of vectors")
+    parser.add_argument("--dim", type=int, default=DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.05, help="per-dimension noise around cluster centers")
+    parser.add_argument("--pq-m", type=str, default="48", help="comma separated PQ sub-quantizer counts")
+    parser.add_argument("--rerank", type=str, default="100", help="comma separated re-rank candidate counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", type=str, default=None, help="keep generated files here")
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    pq_ms = [int(x) for x in args.pq_m.split(",") if x.strip()]
+    reranks = [int(x) for x in args.rerank.split(",") if x.strip()]
+    tmp = None
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = Path(tmp.name)
+
+    try:
+        embeddings_file = workdir / "embeddings.npy"
+        centers = generate_vectors(embeddings_file, args.n, args.dim, args.clusters, args.noise, args.seed)
+        queries = generate_queries(centers, args.queries, args.noise, args.seed)
+
+        # 基准：精确内积（与 VectorStore 的 float 模式相同）
+        exact = np.load(embeddings_file)
+        truth = [top_indices(exact @ q, args.top_k) for q in queries]
+        results = [measure("float", lambda q: top_indices(exact @ q, args.top_k), queries, truth,
+                           args.top_k, exact.nbytes, args.n)]
+        del exact
+
+        builds: Dict[str, float] = {}
+        start = time.perf_counter()
+        quantization.build(workdir, ["int8"], embeddings_file)
+        builds["int8"] = round(time.perf_counter() - start, 3)
+        variants = [("int8", None)]
+        for m in pq_ms:
+            pq_dir = workdir / f"pq{m}"
+            pq_dir.mkdir(exist_ok=True)
+            start = time.perf_counter()
+            quantization.build(pq_dir, ["pq"], embeddings_file, pq_m=m, seed=args.seed)
+            builds[f"pq{m}"] = round(time.perf_counter() - start, 3)
+            variants.append((f"pq{m}", pq_dir))
+
+        for name, directory in variants:
+            mode = "int8" if directory is None else "pq"
+            index = CompressedIndex.load(directory or workdir, mode, embeddings_file)
+            for rerank in [0] + reranks:
+                label = name if not rerank else f"{name}+rerank{rerank}"
+                results.append(measure(
+                    label, lambda q: index.search(q, args.top_k, rerank)[0], queries, truth,
+                    args.top_k, index.nbytes, args.n,
+                ))
+
+        report = {
+            "n": args.n,
+            "dim": args.dim,
+            "queries": args.queries,
+            "top_k": args.top_k,
+            "build_seconds": builds,
+            "results": results,
+        }
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
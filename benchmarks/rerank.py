@@ -0,0 +1,181 @@
+"""
+二阶段重排基准测试
+
+用合成挂牌目录（见 benchmarks/catalog.py）和带结构的查询（品名 + 可选的地区/规格/交易标签）评估重排：
+相关度按命中的结构字段分级（品名不符为0，品名相符为1，地区、规格、交易标签各加1），
+一阶段用字二元组哈希向量的余弦相似度模拟双塔检索，取前M条交给重排。
+报告各重排方式在不同候选数M下的 nDCG@k 与重排增加的延迟：
+- first_stage：一阶段顺序
+- linear：默认权重的线性打分器
+- linear_fitted：在另一批训练查询上拟合权重的线性打分器（--save-weights 可保存，供 RERANK_WEIGHTS_FILE 使用）
+- cross_encoder：本地交叉编码器（指定 --model 时）
+
+用法:
+    python -m benchmarks.rerank --n 20000 --queries 200 --candidates 20,50,100
+    python -m benchmarks.rerank --model Xenova/ms-marco-MiniLM-L-6-v2 --candidates 50 --output rerank.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from typing import Any, Dict, List, Sequence, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.quantization import top_indices
+from app.rerank import CrossEncoderScorer, LinearScorer, Reranker, listing_text
+from app.synonyms import normalize
+from benchmarks.catalog import PRODUCTS, REGIONS, TRADE_TAGS, generate_listings
+from benchmarks.utils import latency_summary
+
+DIMENSION = 384
+
+Intent = Dict[str, Any]
+
+
+def hashed_embedding(text: str, dim: int = DIMENSION) -> np.ndarray:
+    """字二元组哈希到固定维度后归一化（模拟双塔模型：召回尚可、排序粗糙）"""
+    text = normalize(text).replace(" ", "")
+    vec = np.zeros(dim, dtype=np.float32)
+    for i in range(len(text) - 1):
+        vec[zlib.crc32(text[i:i + 2].encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def generate_intents(n: int, seed: int) -> List[Intent]:
+    rng = random.Random(seed)
+    products = [(p[0], p[3]) for items in PRODUCTS.values() for p in items]
+    intents: List[Intent] = []
+    for _ in range(n):
+        product, specs = rng.choice(products)
+        intent: Intent = {"product": product}
+        if rng.random() < 0.6:
+            intent["province"] = rng.choice(REGIONS).split()[0]
+        if rng.random() < 0.4:
+            intent["spec"] = rng.choice(specs)
+        if rng.random() < 0.4:
+            intent["tag"] = rng.choice(TRADE_TAGS)
+        parts = [intent.get("province"), product, intent.get("spec"), intent.get("tag")]
+        intent["query"] = " ".join(p for p in parts if p)
+        intents.append(intent)
+    return intents
+
+
+def relevance(intent: Intent, listing: Dict[str, Any]) -> int:
+    if listing["tags"][0] != intent["product"]:
+        return 0
+    grade = 1
+    if "province" in intent and listing["region"].split()[0] == intent["province"]:
+        grade += 1
+    if "spec" in intent and intent["spec"] in listing["title"]:
+        grade += 1
+    if "tag" in intent and intent["tag"] in listing["tags"][1:]:
+        grade += 1
+    return grade
+
+
+def ndcg(grades: Sequence[int], ideal: Sequence[int], k: int) -> float:
+    def dcg(values: Sequence[int]) -> float:
+        return sum((2 ** g - 1) / math.log2(i + 2) for i, g in enumerate(values[:k]))
+
+    best = dcg(sorted(ideal, reverse=True))
+    return dcg(grades) / best if best > 0 else 0.0
+
+
+class FirstStage:
+    def __init__(self, listings: List[Dict[str, Any]]):
+        self.listings = listings
+        self.matrix = np.stack([hashed_embedding(listing_text(l)) for l in listings])
+        self.by_product: Dict[str, List[int]] = {}
+        for i, listing in enumerate(listings):
+            self.by_product.setdefault(listing["tags"][0], []).append(i)
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        scores = self.matrix @ hashed_embedding(query)
+        return [{"score": float(scores[i]), "listing": self.listings[i]} for i in top_indices(scores, top_k)]
+
+    def ideal(self, intent: Intent) -> List[int]:
+        return [relevance(intent, self.listings[i]) for i in self.by_product.get(intent["product"], [])]
+
+
+def evaluate(stage: FirstStage, intents: List[Intent], scorer: Any, candidates: int, top_k: int) -> Dict[str, Any]:
+    reranker = Reranker(scorer, candidates=candidates, batch_size=candidates, budget_ms=0) if scorer else None
+    values: List[float] = []
+    latencies: List[float] = []
+    for intent in intents:
+        results = stage.search(intent["query"], candidates)
+        if reranker is not None:
+            start = time.perf_counter()
+            results = reranker.rerank(intent["query"], results, top_k)
+            latencies.append(time.perf_counter() - start)
+        grades = [relevance(intent, r["listing"]) for r in results[:top_k]]
+        values.append(ndcg(grades, stage.ideal(intent), top_k))
+    row: Dict[str, Any] = {f"ndcg@{top_k}": round(float(np.mean(values)), 4)}
+    if latencies:
+        row["added_latency"] = latency_summary(latencies)
+    return row
+
+
+def training_samples(stage: FirstStage, intents: List[Intent], candidates: int) -> List[Tuple[str, Dict[str, Any], int]]:
+    samples = []
+    for intent in intents:
+        for r in stage.search(intent["query"], candidates):
+            samples.append((intent["query"], r, relevance(intent, r["listing"])))
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency added vs nDCG gained by second-stage re-ranking")
+    parser.add_argument("--n", type=int, default=20_000, help="catalog size")
+    parser.add_argument("--queries", type=int, default=200, help="evaluation queries")
+    parser.add_argument("--train-queries", type=int, default=200, help="queries used to fit the linear scorer")
+    parser.add_argument("--candidates", type=str, default="20,50,100", help="comma separated top-M sizes")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--model", type=str, default=None, help="fastembed cross-encoder model name")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-weights", type=str, default=None, help="write fitted linear weights (JSON)")
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    candidate_sizes = [int(x) for x in args.candidates.split(",") if x.strip()]
+    listings = list(generate_listings(args.n, args.seed))
+    stage = FirstStage(listings)
+    test = generate_intents(args.queries, args.seed + 1)
+    train = generate_intents(args.train_queries, args.seed + 2)
+
+    fitted = LinearScorer.fit(training_samples(stage, train, max(candidate_sizes)))
+    if args.save_weights:
+        fitted.save(args.save_weights)
+    scorers: List[Tuple[str, Any]] = [("first_stage", None), ("linear", LinearScorer()), ("linear_fitted", fitted)]
+    if args.model:
+        scorers.append(("cross_encoder", CrossEncoderScorer(args.model)))
+
+    results: List[Dict[str, Any]] = []
+    for m in candidate_sizes:
+        for name, scorer in scorers:
+            results.append({"scorer": name, "candidates": m, **evaluate(stage, test, scorer, m, args.top_k)})
+
+    report = {
+        "n": args.n,
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "fitted_weights": dict(zip(LinearScorer.FEATURES, [round(w, 4) for w in fitted.weights])),
+        "results": results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+检索性能基准测试
+
+按指定规模生成合成挂牌目录（见 benchmarks/catalog.py），用与 scripts/build_mock_index.py
+相同的模拟嵌入构建索引，然后分别测量 Retriever.search（关键词）与 VectorStore.search（向量）
+的构建耗时、内存占用、QPS 以及 p50/p95/p99 延迟，结果输出为JSON，可与历史结果对比。
+
+用法:
+    python -m benchmarks.search --sizes 1000,10000,100000 --queries 500
+    python -m benchmarks.search --sizes 10000 --output bench.json
+    python -m benchmarks.search --sizes 10000 --baseline bench.json --tolerance 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.retriever import Retriever, VectorStore
+from benchmarks.catalog import sample_queries, write_catalog
+from benchmarks.utils import latency_summary, rss_bytes
+from scripts.build_mock_index import MODEL_NAME, create_mock_embedding, make_text
+
+DIMENSION = 384
+# 超过该规模时不再逐条计算md5嵌入（单条约数十微秒，千万级需要数小时），改为按批生成随机单位向量
+HASHED_EMBEDDING_LIMIT = 200_000
+BUILD_BATCH = 65_536
+
+
+def build_mock_index(catalog: Path, out_dir: Path, seed: int = 42) -> Dict[str, Any]:
+    """为目录文件构建模拟向量索引，返回构建统计"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with catalog.open("r", encoding="utf-8") as f:
+        n = sum(1 for line in f if line.strip())
+
+    start = time.perf_counter()
+    # 直接写入.npy内存映射，避免大规模时在内存中同时持有列表与数组
+    arr = np.lib.format.open_memmap(out_dir / "embeddings.npy", mode="w+", dtype=np.float32, shape=(n, DIMENSION))
+    if n <= HASHED_EMBEDDING_LIMIT:
+        with catalog.open("r", encoding="utf-8") as f:
+            i = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                arr[i] = create_mock_embedding(make_text(json.loads(line)), DIMENSION)
+                i += 1
+    else:
+        for offset in range(0, n, BUILD_BATCH):
+            rows = min(BUILD_BATCH, n - offset)
+            rng = np.random.default_rng(seed + offset)
+            block = rng.standard_normal((rows, DIMENSION), dtype=np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            arr[offset:offset + rows] = block
+    arr.flush()
+    del arr
+
+    shutil.copyfile(catalog, out_dir / "metadata.jsonl")
+    (out_dir / "model_name.txt").write_text(MODEL_NAME, encoding="utf-8")
+    return {
+        "docs": n,
+        "seconds": round(time.perf_counter() - start, 4),
+        "embeddings_bytes": (out_dir / "embeddings.npy").stat().st_size,
+        "hashed_embeddings": n <= HASHED_EMBEDDING_LIMIT,
+    }
+
+
+def measure_queries(search, queries: List[str], top_k: int, warmup: int = 10) -> Dict[str, Any]:
+    """逐条执行查询并统计延迟"""
+    for q in queries[:warmup]:
+        search(q, top_k)
+    latencies: List[float] = []
+    hits = 0
+    for q in queries:
+        start = time.perf_counter()
+        results = search(q, top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(results)
+    summary = latency_summary(latencies)
+    summary["hit_rate"] = round(hits / len(queries), 4) if queries else 0.0
+    return summary
+
+
+def _load(factory) -> tuple:
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    obj = factory()
+    return obj, {
+        "load_seconds": round(time.perf_counter() - start, 4),
+        "rss_delta_mb": round((rss_bytes() - before) / 1024 / 1024, 2),
+    }
+
+
+def run_size(size: int, queries: List[str], top_k: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """单个规模的完整测试：生成目录 -> 构建索引 -> 加载 -> 查询"""
+    size_dir = workdir / f"n{size}"
+    catalog = size_dir / "listings.jsonl"
+
+    start = time.perf_counter()
+    write_catalog(catalog, size, seed)
+    report: Dict[str, Any] = {
+        "size": size,
+        "catalog_seconds": round(time.perf_counter() - start, 4),
+        "catalog_bytes": catalog.stat().st_size,
+    }
+    report["build"] = build_mock_index(catalog, size_dir / "artifacts", seed)
+
+    retriever, load = _load(lambda: Retriever(str(catalog)))
+    report["retriever"] = {**load, **measure_queries(retriever.search, queries, top_k)}
+    del retriever
+
+    artifacts = size_dir / "artifacts"
+    store, load = _load(lambda: VectorStore(
+        str(artifacts / "embeddings.npy"),
+        str(artifacts / "metadata.jsonl"),
+        str(artifacts / "model_name.txt"),
+    ))
+    report["vector_store"] = {**load, **measure_queries(store.search, queries, top_k)}
+    del store
+    gc.collect()
+
+    shutil.rmtree(size_dir, ignore_errors=True)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """与基线对比，返回p95延迟或QPS退化超过容忍度的条目"""
+    regressions: List[str] = []
+    previous = {r["size"]: r for r in baseline.get("results", [])}
+    for result in report["results"]:
+        base = previous.get(result["size"])
+        if base is None:
+            continue
+        for engine in ("retriever", "vector_store"):
+            cur, old = result[engine], base.get(engine, {})
+            if old.get("p95_ms") and cur["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                regressions.append(f"n={result['size']} {engine} p95 {old['p95_ms']}ms -> {cur['p95_ms']}ms")
+            if old.get("qps") and cur["qps"] < old["qps"] * (1 - tolerance):
+                regressions.append(f"n={result['size']} {engine} qps {old['qps']} -> {cur['qps']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search benchmark on synthetic catalogs")
+    parser.add_argument("--sizes", default="1000,10000", help="comma separated catalog sizes, up to 10000000")
+    parser.add_argument("--queries", type=int, default=500, help="queries per engine")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", type=str, default=None, help="directory for generated catalogs")
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    parser.add_argument("--baseline", type=str, default=None, help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    queries = sample_queries(args.queries, args.seed)
+    report: Dict[str, Any] = {
+        "top_k": args.top_k,
+        "queries": args.queries,
+        "seed": args.seed,
+        "dimension": DIMENSION,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "results": [],
+    }
+
+    tmp: Optional[tempfile.TemporaryDirectory] = None
+    if args.workdir:
+        workdir = Path(args.workdir)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = Path(tmp.name)
+    try:
+        for size in sizes:
+            report["results"].append(run_size(size, queries, args.top_k, args.seed, workdir))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
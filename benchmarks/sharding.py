@@ -0,0 +1,147 @@
+"""
+分片向量检索基准测试
+
+生成合成单位向量索引（与 benchmarks/quantization.py 相同的聚类分布），对比单进程
+VectorStore 的 embeddings_norm @ vec 与不同分片数的 ShardedVectorStore 的查询延迟，
+并核对分片结果与单进程结果一致（recall@k）。--clients 另测多个线程同时查询时的总吞吐量
+（分片间按请求号分发回复，并发查询可同时在各分片上执行）。
+
+用法:
+    python -m benchmarks.sharding --n 1000000 --shards 1,2,4,8 --queries 200
+    python -m benchmarks.sharding --n 200000 --shards 1,4 --clients 1,8
+    python -m benchmarks.sharding --n 200000 --shards 2,4 --mode int8 --rerank 100 --output shard.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app import quantization
+from app.quantization import top_indices
+from app.sharding import ShardedVectorStore
+from benchmarks.quantization import DIMENSION, generate_queries, generate_vectors, recall
+from benchmarks.utils import latency_summary
+from scripts.build_mock_index import MODEL_NAME
+
+
+def write_index(workdir: Path, n: int, dim: int, clusters: int, noise: float, seed: int) -> np.ndarray:
+    """写入 embeddings.npy / metadata.jsonl / model_name.txt，返回聚类中心"""
+    centers = generate_vectors(workdir / "embeddings.npy", n, dim, clusters, noise, seed)
+    with (workdir / "metadata.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": str(i)}) + "\n")
+    (workdir / "model_name.txt").write_text(MODEL_NAME, encoding="utf-8")
+    return centers
+
+
+def measure(search, queries: np.ndarray, truth: List[np.ndarray], top_k: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for q, t in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(q)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(recall(np.asarray(found), t))
+    return {f"recall@{top_k}": round(float(np.mean(recalls)), 4), "latency": latency_summary(latencies)}
+
+
+def measure_concurrent(search, queries: np.ndarray, clients: int) -> Dict[str, Any]:
+    """clients个线程分摊全部查询，返回总吞吐量与延迟"""
+    latencies: List[List[float]] = [[] for _ in range(clients)]
+
+    def client(slot: int) -> None:
+        for q in queries[slot::clients]:
+            start = time.perf_counter()
+            search(q)
+            latencies[slot].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    summary = latency_summary([x for rows in latencies for x in rows])
+    summary["qps"] = round(len(queries) / elapsed, 1)
+    return {"clients": clients, "latency": summary}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scatter-gather sharded vector search benchmark")
+    parser.add_argument("--n", type=int, default=200_000, help="number of vectors")
+    parser.add_argument("--dim", type=int, default=DIMENSION)
+    parser.add_argument("--shards", type=str, default="1,2,4", help="comma separated shard counts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clients", type=str, default="1", help="comma separated concurrent client thread counts")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--mode", choices=quantization.MODES, default="float")
+    parser.add_argument("--rerank", type=int, default=0, help="re-rank candidates per shard (compressed modes)")
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    shard_counts = [int(x) for x in args.shards.split(",") if x.strip()]
+    client_counts = [int(x) for x in args.clients.split(",") if x.strip() and int(x) > 1]
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        centers = write_index(workdir, args.n, args.dim, args.clusters, args.noise, args.seed)
+        queries = generate_queries(centers, args.queries, args.noise, args.seed)
+        if args.mode != "float":
+            quantization.build(workdir, [args.mode], pq_m=args.pq_m, seed=args.seed)
+
+        matrix = np.load(workdir / "embeddings.npy")
+        truth = [top_indices(matrix @ q, args.top_k) for q in queries]
+        results: List[Dict[str, Any]] = [{
+            "shards": 0,
+            "label": "single-process float",
+            **measure(lambda q: top_indices(matrix @ q, args.top_k), queries, truth, args.top_k),
+        }]
+        del matrix
+
+        for count in shard_counts:
+            start = time.perf_counter()
+            with ShardedVectorStore.from_directory(workdir, shards=count, mode=args.mode,
+                                                   rerank=args.rerank) as store:
+                startup = time.perf_counter() - start
+                row = measure(lambda q: [i for i, _ in store.search_vector(q, args.top_k)],
+                              queries, truth, args.top_k)
+                if client_counts:
+                    row["concurrent"] = [
+                        measure_concurrent(lambda q: store.search_vector(q, args.top_k), queries, c)
+                        for c in client_counts
+                    ]
+            results.append({"shards": count, "label": f"{count} shards {args.mode}",
+                            "startup_seconds": round(startup, 3), **row})
+
+    report = {
+        "n": args.n,
+        "dim": args.dim,
+        "mode": args.mode,
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+冷启动基准测试
+
+每轮在全新的Python进程中测量：
+- import：导入应用模块（app.main 或 api.index）耗时
+- first_response：导入完成后第一个请求（/api/status）的耗时
+- first_trends / first_warmup：首次请求趋势数据、预热接口的耗时（触发延迟加载）
+- uvicorn：启动 uvicorn 子进程到第一次成功响应的总耗时（--uvicorn 时）
+
+用法:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --module api.index --runs 5
+    python -m benchmarks.startup --runs 3 --uvicorn --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import importlib
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(module.app)
+result = {"import": imported - start, "heavy_modules": sorted(m for m in ("numpy", "fastembed", "onnxruntime") if m in sys.modules)}
+for name, method, path in (("first_response", "get", "/api/status"), ("first_trends", "get", "/api/trends/data"),
+                           ("first_warmup", "get", "/api/warmup")):
+    t = time.perf_counter()
+    resp = getattr(client, method)(path)
+    result[name] = time.perf_counter() - t
+    result[name + "_status"] = resp.status_code
+result["total"] = time.perf_counter() - start
+print(json.dumps(result))
+"""
+
+
+def _env(tmpdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'startup.db')}",
+        "LOG_REQUEST_SAMPLE_RATE": "0",
+        "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+    return env
+
+
+def run_inprocess(module: str) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, module], cwd=ROOT, env=_env(tmp),
+            capture_output=True, text=True, check=True,
+        )
+    # 应用日志同样写到stdout，取最后一行JSON结果
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_uvicorn(module: str, timeout: float = 60.0) -> float:
+    """启动 uvicorn 到 /api/status 第一次返回200的秒数"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/status"
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=_env(tmp), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+                try:
+                    if requests.get(url, timeout=0.5).status_code == 200:
+                        return time.perf_counter() - start
+                except requests.RequestException:
+                    time.sleep(0.01)
+            raise RuntimeError("uvicorn did not become ready")
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "min_ms": round(min(values) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold start benchmark: import to first response")
+    parser.add_argument("--module", default="app.main", help="application module exposing `app`")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--uvicorn", action="store_true", help="also measure uvicorn spawn to first response")
+    parser.add_argument("--output", type=str, default=None, help="write JSON report to file")
+    args = parser.parse_args()
+
+    runs = [run_inprocess(args.module) for _ in range(args.runs)]
+    report: Dict[str, Any] = {
+        "module": args.module,
+        "runs": args.runs,
+        "heavy_modules_after_import": runs[0]["heavy_modules"],
+    }
+    for key in ("import", "first_response", "first_trends", "first_warmup", "total"):
+        report[key] = summarize([r[key] for r in runs])
+    report["status"] = {k: runs[0][k] for k in runs[0] if k.endswith("_status")}
+    if args.uvicorn:
+        report["uvicorn_first_response"] = summarize([run_uvicorn(args.module) for _ in range(args.runs)])
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
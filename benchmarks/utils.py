@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+import resource
+import sys
+from typing import List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """最近秩法百分位（values无需有序）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    """延迟统计（毫秒）"""
+    ordered = sorted(seconds)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "qps": round(len(ordered) / total, 1) if total else 0.0,
+        "mean_ms": round(total / len(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else 0.0,
+    }
+
+
+def rss_bytes() -> int:
+    """当前进程常驻内存（Linux读取/proc，其他平台退回峰值RSS）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import argparse
 import json
+import sys
 from pathlib import Path
 from typing import List, Dict, Any
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app import artifacts, quantization
+
 import numpy as np
 from fastembed import TextEmbedding
 
@@ -39,25 +45,52 @@ def make_text(doc: Dict[str, Any]) -> str:
     return " \n ".join(parts)
 
 
-def main() -> None:
-    assert DATA_FILE.exists(), f"Data file not found: {DATA_FILE}"
-    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the embedding index")
+    parser.add_argument("--data", default=str(DATA_FILE), help="listings JSONL file")
+    parser.add_argument("--artifacts", default=str(ARTIFACTS_DIR), help="artifacts root directory")
+    parser.add_argument("--versioned", action="store_true",
+                        help="write into artifacts/versions/<version>/ and switch CURRENT when complete")
+    parser.add_argument("--keep", type=int, default=3, help="versions to keep when --versioned")
+    parser.add_argument("--quantize", default="", help="compressed vector files to build, e.g. int8,pq")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide the dimension)")
+    return parser.parse_args()
 
-    docs = load_documents(DATA_FILE)
+
+def main() -> None:
+    args = parse_args()
+    data_file = Path(args.data)
+    root = Path(args.artifacts)
+    assert data_file.exists(), f"Data file not found: {data_file}"
+    # 版本化构建写入新目录，全部写完后才切换CURRENT，运行中的服务不会读到半成品
+    out_dir = artifacts.new_version_dir(root) if args.versioned else root
+    out_dir.mkdir(parents=True, exist_ok=True)
+    embeddings_file, metadata_file, model_name_file = artifacts.index_files(out_dir)
+
+    docs = load_documents(data_file)
     texts = [make_text(d) for d in docs]
 
     embedder = TextEmbedding(MODEL_NAME)
     vectors = list(embedder.embed(texts))
     arr = np.asarray(vectors, dtype=np.float32)
 
-    np.save(EMBEDDINGS_FILE, arr)
-    with METADATA_FILE.open("w", encoding="utf-8") as f:
+    np.save(embeddings_file, arr)
+    with metadata_file.open("w", encoding="utf-8") as f:
         for d in docs:
             f.write(json.dumps(d, ensure_ascii=False) + "\n")
-    with MODEL_NAME_FILE.open("w", encoding="utf-8") as f:
+    with model_name_file.open("w", encoding="utf-8") as f:
         f.write(MODEL_NAME)
+    # 压缩向量与float矩阵写在同一目录，发布前完成
+    modes = [m.strip() for m in args.quantize.split(",") if m.strip()]
+    if modes:
+        sizes = quantization.build(out_dir, modes, embeddings_file, pq_m=args.pq_m)
+        print("Quantized: " + ", ".join(f"{k}={v / 2**20:.1f}MiB" for k, v in sizes.items()))
 
     print(f"Wrote {len(docs)} docs, shape={arr.shape}")
+    if args.versioned:
+        artifacts.publish(root, out_dir.name)
+        removed = artifacts.prune(root, args.keep)
+        print(f"Published version {out_dir.name}" + (f", pruned {', '.join(removed)}" if removed else ""))
 
 
 if __name__ == "__main__":
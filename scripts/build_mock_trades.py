@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import csv
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+TRADES_FILE = Path("data/sample_block_trades.jsonl")
+INDEX_FILE = Path("data/sample_index_daily.csv")
+
+START_DATE = date(2025, 6, 16)
+END_DATE = date(2025, 8, 15)
+
+STOCKS = [
+    ("600519", "贵州茅台", 1450.0),
+    ("601318", "中国平安", 52.0),
+    ("600036", "招商银行", 41.0),
+    ("000858", "五粮液", 128.0),
+    ("300750", "宁德时代", 255.0),
+    ("601899", "紫金矿业", 19.5),
+    ("600900", "长江电力", 29.8),
+    ("000333", "美的集团", 72.0),
+    ("002594", "比亚迪", 330.0),
+    ("601012", "隆基绿能", 16.2),
+]
+
+
+def trading_days(start: date, end: date) -> List[date]:
+    days = []
+    d = start
+    while d <= end:
+        if d.weekday() < 5:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
+
+
+def make_trades(day: date, rng: random.Random) -> List[Dict[str, Any]]:
+    trades = []
+    for code, name, base in rng.sample(STOCKS, rng.randint(5, 9)):
+        close = round(base * rng.uniform(0.95, 1.05), 2)
+        # 大宗交易以折价成交为主，少量溢价
+        premium = rng.random() < 0.12
+        rate = rng.uniform(0.0, 0.03) if premium else -rng.uniform(0.0, 0.1)
+        price = round(close * (1 + rate), 2)
+        volume = round(rng.uniform(5, 300), 2)  # 万股
+        trades.append({
+            "date": day.strftime("%Y-%m-%d"),
+            "code": code,
+            "name": name,
+            "price": price,
+            "close": close,
+            "volume": volume,
+            "amount": round(price * volume, 2),  # 万元
+        })
+    return trades
+
+
+def main() -> None:
+    rng = random.Random(20250815)
+    days = trading_days(START_DATE, END_DATE)
+
+    TRADES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with TRADES_FILE.open("w", encoding="utf-8") as f:
+        for d in days:
+            for t in make_trades(d, rng):
+                f.write(json.dumps(t, ensure_ascii=False) + "\n")
+                count += 1
+
+    index = 3500.0
+    with INDEX_FILE.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "close"])
+        for d in days:
+            index *= 1 + rng.uniform(-0.015, 0.016)
+            writer.writerow([d.strftime("%Y-%m-%d"), round(index, 2)])
+
+    print(f"Wrote {count} trades over {len(days)} days to {TRADES_FILE}, index to {INDEX_FILE}")
+
+
+if __name__ == "__main__":
+    main()